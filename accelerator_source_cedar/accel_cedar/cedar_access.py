@@ -6,8 +6,10 @@ import urllib.parse
 import time
 
 import requests
+from requests.adapters import HTTPAdapter
 
 from accelerator_source_cedar.accel_cedar.cedar_config import CedarConfig
+from accelerator_source_cedar.accel_cedar.cedar_template_processor import CedarTemplateProcessor
 
 logging.basicConfig(
     level=logging.DEBUG,
@@ -18,6 +20,9 @@ logger = logging.getLogger(__name__)
 
 base_url = "https://resource.metadatacenter.org"
 template_prefix = "https%3A%2F%2Frepo.metadatacenter.org%2Ftemplate-instances%2F"
+default_pool_size = 10
+default_page_size = 100
+guid_pattern = re.compile("[a-z0-9]{8}-[a-z0-9]{4}-[a-z0-9]{4}-[a-z0-9]{4}-[a-z0-9]{12}")
 
 
 class CedarFolder():
@@ -48,9 +53,31 @@ class CedarFolder():
 
 class CedarAccess(object):
 
-    def __init__(self, params=None):
+    def __init__(self, params=None, pool_size=default_pool_size):
+        """
+        Access to the CEDAR API
+        :param params: dictionary with cedar properties, see CedarConfig
+        :param pool_size: number of pooled connections kept per host, set this to at least the number of threads
+        sharing this CedarAccess
+        """
 
         self.cedar_config = CedarConfig(params)
+        self.session = CedarAccess.build_session(pool_size)
+        self.cedar_template_processor = CedarTemplateProcessor()
+
+    @staticmethod
+    def build_session(pool_size=default_pool_size) -> requests.Session:
+        """
+        Build a requests session with a connection pool that can be shared by concurrent requests, so that
+        connections (and TLS handshakes) are reused across calls
+        :param pool_size: max number of connections kept per host
+        :return: requests.Session
+        """
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
 
     def retrieve_folder_contents(self, folder_id) -> CedarFolder:
         """
@@ -64,25 +91,83 @@ class CedarAccess(object):
 
         """
 
-        api_url = self.cedar_config.params["cedar_endpoint"] + "/folders/https%3A%2F%2Frepo.metadatacenter.org%2Ffolders%2F" + folder_id +"/contents?limit=500"
+        r_json = self.retrieve_folder_page(folder_id, offset=0, limit=500)
+        return CedarAccess.parse_folder_listing(r_json)
+
+    def iter_folder_contents(self, folder_id, page_size=default_page_size):
+        """
+        Iterate the contents of the folder in CEDAR, reading the listing one page at a time so that items are
+        available as soon as their page is returned, and folders larger than a single listing are fully covered
+        Parameters
+        ----------
+        folder_id - gui only folder id
+        page_size - number of items requested per page
+
+        Returns generator of CedarFolder, one per item in the folder
+        -------
+
+        """
+
+        offset = 0
+        while True:
+            r_json = self.retrieve_folder_page(folder_id, offset=offset, limit=page_size)
+            resources = r_json.get("resources", [])
+            for resource in resources:
+                yield CedarFolder(folder_name=resource["schema:name"], folder_id=resource["@id"],
+                                  item_type=resource["resourceType"])
+
+            offset += len(resources)
+            if len(resources) < page_size or offset >= r_json.get("totalCount", offset):
+                return
+
+    def retrieve_folder_page(self, folder_id, offset=0, limit=default_page_size) -> dict:
+        """
+        Retrieve one page of the folder listing json from CEDAR
+        Parameters
+        ----------
+        folder_id - gui only folder id
+        offset - index of the first item to return
+        limit - max number of items to return
+
+        Returns dict with the folder listing json
+        -------
+
+        """
+
+        api_url = (self.cedar_config.params["cedar_endpoint"] +
+                   "/folders/https%3A%2F%2Frepo.metadatacenter.org%2Ffolders%2F" + folder_id +
+                   "/contents?offset=" + str(offset) + "&limit=" + str(limit))
         headers = {"Content-Type": "application/json", "Accept": "application/json",
                    "Authorization": self.cedar_config.build_request_headers_json()}
-        r = requests.get(api_url, headers=headers)
+        r = self.session.get(api_url, headers=headers)
         r_json = r.json()
         logger.debug("r:%s", r_json)
         if r.status_code not in [200, 201]:
             logger.error("failed to find resource: %s" % r_json["errorMessage"])
             raise Exception(r_json["errorMessage"])
-        return CedarAccess.parse_folder_listing(r_json)
+        return r_json
 
 
     def create_resource(self, resource_json, target_folder):
+        """
+        Create a template instance in a CEDAR folder
+        Parameters
+        ----------
+        resource_json - json-ld of the instance, as a string (e.g. from CedarTemplateProcessor) or a dict
+        target_folder - id of the folder
+
+        Returns dict with the created instance json, including its @id
+        -------
+
+        """
         logger.info("creating resource")
         cedar_folder = target_folder
-        api_url = self.cedar_config.cedar_properties["cedar_endpoint"] + "/template-instances?folder_id=" + cedar_folder
+        api_url = self.cedar_config.params["cedar_endpoint"] + "/template-instances?folder_id=" + cedar_folder
         headers = {"Content-Type": "application/json", "Accept": "application/json",
                    "Authorization": self.cedar_config.build_request_headers_json()}
-        r = requests.post(api_url, headers=headers, json=json.loads(resource_json))
+        if isinstance(resource_json, str):
+            resource_json = json.loads(resource_json)
+        r = self.session.post(api_url, headers=headers, json=resource_json)
         logger.debug("r:%s", r)
         r_json = r.json()
         if r.status_code not in [200, 201]:
@@ -92,17 +177,28 @@ class CedarAccess(object):
 
 
     def rename_resource(self, resource_id, name):
+        """
+        Rename a template instance
+        Parameters
+        ----------
+        resource_id - guid of the instance
+        name - new name
+
+        Returns dict with the response json
+        -------
+
+        """
         logger.info("renaming resource to: %s" % name)
-        api_url = self.cedar_config.cedar_properties["cedar_endpoint"] + "/command/rename-resource"
+        api_url = self.cedar_config.params["cedar_endpoint"] + "/command/rename-resource"
         headers = {"Content-Type": "application/json", "Accept": "application/json",
                    "Authorization": self.cedar_config.build_request_headers_json()}
         rename_json = self.cedar_template_processor.produce_rename_resource(resource_id, name)
 
-        r = requests.post(api_url, headers=headers, json=json.loads(rename_json))
+        r = self.session.post(api_url, headers=headers, json=json.loads(rename_json))
         r_json = r.json()
 
         if r.status_code not in [200, 201]:
-            logger.error("failed to create resource: %s" % r_json["errorMessage"])
+            logger.error("failed to rename resource: %s" % r_json["errorMessage"])
             raise Exception(r_json["errorMessage"])
         return r_json
 
@@ -120,18 +216,7 @@ class CedarAccess(object):
         JSON object that is the retrieved resource
 
         """
-        logger.info("retrieving resource: %s" % resource_id)
-        api_url = ("https://repo.metadatacenter.org/template-instances/" +
-                   urllib.parse.quote_plus(resource_id))
-        headers = {"Content-Type": "application/json", "Accept": "application/json",
-                   "Authorization": self.cedar_config.build_request_headers_json()}
-
-        try:
-            r = requests.get(api_url, headers=headers)
-        except:
-            time.sleep(30)
-            return self.retrieve_resource(resource_id)
-
+        r = self._get_resource(resource_id)
         r_json = r.json()
 
         try:
@@ -144,6 +229,40 @@ class CedarAccess(object):
         logger.debug("r:%s", r_json)
         return r_json
 
+    def retrieve_resource_content(self, resource_id) -> bytes:
+        """
+        Retrieve the resource as the undecoded json-ld, so a pipeline can decode it apart from the request
+        Parameters
+        ----------
+        resource_id the GUID of the resource
+
+        Returns
+        -------
+        bytes of the json-ld document
+
+        """
+        r = self._get_resource(resource_id)
+        if r.status_code != 200:
+            r_json = r.json()
+            logger.error("failed to retrieve resource: %s" % r_json.get("errorMessage"))
+            raise Exception(r_json.get("errorMessage", "status code %s" % r.status_code))
+        return r.content
+
+    def _get_resource(self, resource_id):
+        logger.info("retrieving resource: %s" % resource_id)
+        api_url = ("https://repo.metadatacenter.org/template-instances/" +
+                   urllib.parse.quote_plus(resource_id))
+        headers = {"Content-Type": "application/json", "Accept": "application/json",
+                   "Authorization": self.cedar_config.build_request_headers_json()}
+
+        # retry in a loop rather than by recursion, so a long outage can't end the run with a RecursionError
+        while True:
+            try:
+                return self.session.get(api_url, headers=headers)
+            except Exception as err:
+                logger.warning("error retrieving resource %s, retrying: %s" % (resource_id, err))
+                time.sleep(30)
+
 
     @staticmethod
     def parse_folder_listing(folder_listing_json):
@@ -153,7 +272,15 @@ class CedarAccess(object):
 
     @staticmethod
     def extract_guid(text_to_extract):
-        re_text = "[a-z0-9]{8}-[a-z0-9]{4}-[a-z0-9]{4}-[a-z0-9]{4}-[a-z0-9]{12}"
-        x = re.search(re_text, text_to_extract)
+        x = guid_pattern.search(text_to_extract)
         return x.group()
 
+    @staticmethod
+    def guid_or_identity(identifier) -> str:
+        """
+        :param identifier: a CEDAR id, either the guid or the full @id url
+        :return: the guid in the id, or the id itself if it holds no guid
+        """
+        match = guid_pattern.search(identifier)
+        return match.group() if match else identifier
+
@@ -0,0 +1,190 @@
+"""
+Archives (zip, tar, tar.gz) of exported CEDAR template instances, read in place without extracting them to disk.
+
+Each json member of the archive is a CEDAR instance, identified by its file name without the .json extension (as
+for an exported file ingested from disk). Two members with the same file name in different directories would share an
+id, so such an archive is rejected rather than one of them being silently lost. An archive can be read sequentially,
+streaming the members in archive order, or a single instance can be read by its id.
+
+Random access is cheap for a zip, which has a central directory. A tar.gz has no index, so the first lookup reads
+through the archive once to find the members, and reading a member that lies before the previous one decompresses
+the archive again from the start; prefer a zip, or sequential reading, for large tar.gz archives.
+"""
+
+import fnmatch
+import json
+import logging
+import os
+import tarfile
+import threading
+import zipfile
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_SUFFIXES = (".zip", ".tar", ".tar.gz", ".tgz")
+
+
+def is_archive_path(path) -> bool:
+    return str(path).endswith(ARCHIVE_SUFFIXES)
+
+
+class CedarArchive:
+    """
+    Reads CEDAR instances from a zip or tar archive, sequentially or by id
+    """
+
+    def __init__(self, path, pattern="*.json"):
+        """
+        :param path: path of the archive, a .zip is read as a zip file and anything else as a (compressed) tar file
+        :param pattern: file name pattern of the instance members, other members are ignored
+        """
+        self.path = str(path)
+        self.pattern = pattern
+        self.is_zip = self.path.endswith(".zip")
+        self._index = None
+        self._archive = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def member_id(member_name: str) -> str:
+        """
+        :param member_name: path of a member in the archive
+        :return: the id of the instance, its file name without the .json extension
+        """
+        file_name = os.path.basename(member_name)
+        if file_name.endswith(".json"):
+            return file_name[:-len(".json")]
+        return file_name
+
+    def _is_instance(self, member_name: str) -> bool:
+        return fnmatch.fnmatch(os.path.basename(member_name), self.pattern)
+
+    def _unique_id(self, member_name: str, members: dict) -> str:
+        """
+        :param member_name: path of a member in the archive
+        :param members: dict of the ids seen so far to their member paths, the id of this member is added
+        :return: the id of the member
+        """
+        item_id = self.member_id(member_name)
+        if item_id in members:
+            raise Exception(f"archive {self.path} has more than one instance with id {item_id}: "
+                            f"{members[item_id]} and {member_name}")
+        members[item_id] = member_name
+        return item_id
+
+    def __iter__(self):
+        for item_id, document in self.items():
+            yield document
+
+    def items(self):
+        """
+        Read the archive sequentially, each member is decoded straight from the archive stream
+        :return: generator of (id, document) tuples, in archive order
+        """
+        members = {}
+        if self.is_zip:
+            with zipfile.ZipFile(self.path) as archive:
+                for info in archive.infolist():
+                    if not info.is_dir() and self._is_instance(info.filename):
+                        item_id = self._unique_id(info.filename, members)
+                        with archive.open(info) as member:
+                            yield item_id, json.load(member)
+        else:
+            # stream mode, the members are read in a single forward pass without seeking
+            with tarfile.open(self.path, "r|*") as archive:
+                for info in archive:
+                    if info.isfile() and self._is_instance(info.name):
+                        item_id = self._unique_id(info.name, members)
+                        member = archive.extractfile(info)
+                        yield item_id, json.load(member)
+
+    def _open_archive(self):
+        if self._archive is None:
+            self._archive = zipfile.ZipFile(self.path) if self.is_zip else tarfile.open(self.path, "r:*")
+        return self._archive
+
+    @property
+    def index(self) -> dict:
+        """
+        The member index, built on first use
+        :return: dict of id to the zip or tar member info
+        """
+        with self._lock:
+            if self._index is None:
+                archive = self._open_archive()
+                index = {}
+                members = {}
+                if self.is_zip:
+                    for info in archive.infolist():
+                        if not info.is_dir() and self._is_instance(info.filename):
+                            index[self._unique_id(info.filename, members)] = info
+                else:
+                    for info in archive.getmembers():
+                        if info.isfile() and self._is_instance(info.name):
+                            index[self._unique_id(info.name, members)] = info
+                logger.info(f"archive {self.path} has {len(index)} instances")
+                self._index = index
+            return self._index
+
+    def ids(self):
+        return list(self.index.keys())
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, item_id):
+        return item_id in self.index
+
+    def get(self, item_id: str) -> dict:
+        """
+        Random access to an instance by id
+        :param item_id: id of the instance
+        :return: dict with the json-ld
+        """
+        return json.loads(self.get_content(item_id))
+
+    def get_content(self, item_id: str) -> bytes:
+        """
+        Random access to an instance by id, without decoding it
+        :param item_id: id of the instance
+        :return: bytes of the json-ld
+        """
+        try:
+            info = self.index[item_id]
+        except KeyError:
+            raise KeyError(f"{item_id} not found in archive {self.path}")
+
+        with self._lock:
+            archive = self._open_archive()
+            if self.is_zip:
+                with archive.open(info) as member:
+                    return member.read()
+            return archive.extractfile(info).read()
+
+    def retrieve_resource(self, resource_id) -> dict:
+        """
+        Retrieve a CEDAR instance from the archive, so that an archive can stand in for CedarAccess when ingesting
+        :param resource_id: id of the instance
+        :return: dict with the json-ld
+        """
+        logger.info("retrieving resource from archive: %s" % resource_id)
+        return self.get(resource_id)
+
+    def retrieve_resource_content(self, resource_id) -> bytes:
+        """
+        :param resource_id: id of the instance
+        :return: bytes of the json-ld, as CedarAccess.retrieve_resource_content
+        """
+        return self.get_content(resource_id)
+
+    def close(self):
+        with self._lock:
+            if self._archive is not None:
+                self._archive.close()
+                self._archive = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
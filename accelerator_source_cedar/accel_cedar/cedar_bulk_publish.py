@@ -0,0 +1,148 @@
+"""
+Bulk publish of resources to CEDAR.
+
+Each resource, given as the intermediate models of a parsed template, is rendered into a CEDAR template instance
+with CedarTemplateProcessor, created in the target folder with CedarAccess.create_resource, and then renamed to the
+resource name. Resources are published concurrently by a pool of threads sharing one CedarAccess, with a RateLimiter
+spacing out the requests so a large batch stays within what the CEDAR API accepts.
+"""
+
+import logging
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from accelerator_source_cedar.accel_cedar.cedar_access import CedarAccess
+from accelerator_source_cedar.accel_cedar.cedar_template_processor import CedarTemplateProcessor
+from accelerator_source_cedar.accel_cedar.process_result import ProcessResult
+from accelerator_source_cedar.accel_cedar.rate_limiter import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_REQUESTS_PER_SECOND = 5.0
+
+
+class PublishSummary:
+    """
+    Outcome of a bulk publish, with the result for each resource and throughput information
+    """
+
+    def __init__(self):
+        self.total = 0
+        self.succeeded = 0
+        self.results = []  # ProcessResult for each resource, in the order they completed
+        self.failures = []  # ProcessResult for each resource that failed
+        self.elapsed_seconds = 0.0
+
+    @property
+    def resources_per_second(self) -> float:
+        if self.elapsed_seconds <= 0:
+            return 0.0
+        return self.total / self.elapsed_seconds
+
+    def add(self, result: ProcessResult):
+        self.total += 1
+        self.results.append(result)
+        if result.success:
+            self.succeeded += 1
+        else:
+            self.failures.append(result)
+
+    def report(self) -> str:
+        lines = [f"published {self.total} resources in {self.elapsed_seconds:.2f}s "
+                 f"({self.resources_per_second:.1f} resources/s), {self.succeeded} succeeded, "
+                 f"{len(self.failures)} failed"]
+        for failure in self.failures:
+            lines.append(f"  failed: {failure.template_source}: {failure.message}")
+        return "\n".join(lines)
+
+
+def publish_resource(cedar_access: CedarAccess, model_data: dict, target_folder: str,
+                     template_processor: CedarTemplateProcessor = None, rate_limiter: RateLimiter = None,
+                     rename: bool = True, source: str = "") -> ProcessResult:
+    """
+    Render, create and rename one resource in CEDAR
+    :param cedar_access: CedarAccess used for the requests
+    :param model_data: dict of intermediate models, as in the model_data of a parsed template
+    :param target_folder: id of the CEDAR folder the resource is created in
+    :param template_processor: CedarTemplateProcessor, defaults to the one of cedar_access
+    :param rate_limiter: optional RateLimiter acquired before each request
+    :param rename: rename the created instance to the resource name
+    :param source: where the resource came from (e.g. the template path), recorded in the result
+    :return: ProcessResult with the CEDAR id of the instance in id and its @id in endpoint, or the error information
+    """
+    template_processor = template_processor or cedar_access.cedar_template_processor
+    result = ProcessResult()
+    result.template_source = source
+    result.model_data = model_data
+
+    try:
+        result.resource_name = model_data["resource"].name
+        resource_json = template_processor.produce_resource(model_data)
+
+        if rate_limiter:
+            rate_limiter.acquire()
+        created = cedar_access.create_resource(resource_json, target_folder)
+        result.endpoint = created["@id"]
+        result.id = CedarAccess.extract_guid(created["@id"])
+
+        if rename and result.resource_name:
+            if rate_limiter:
+                rate_limiter.acquire()
+            cedar_access.rename_resource(result.id, result.resource_name)
+    except Exception as err:
+        logger.error(f"exception publishing {source}: {err}")
+        result.success = False
+        result.message = str(err)
+        result.errors.append(f"error publishing {source}: {err}")
+        result.traceback = traceback.format_exc()
+
+    return result
+
+
+def publish_resources(cedar_access: CedarAccess, parse_results, target_folder: str,
+                      max_workers: int = DEFAULT_MAX_WORKERS,
+                      requests_per_second: float = DEFAULT_REQUESTS_PER_SECOND,
+                      rename: bool = True) -> PublishSummary:
+    """
+    Publish parsed templates to CEDAR concurrently, with a bounded number of resources in flight
+    :param cedar_access: CedarAccess shared by the threads, it should have a pool_size of at least max_workers
+    :param parse_results: iterable of ProcessResult from PcorTemplateParser (e.g. iter_parse_templates), results
+    that failed to parse are reported as failures without being published
+    :param target_folder: id of the CEDAR folder the resources are created in
+    :param max_workers: number of concurrent requests
+    :param requests_per_second: rate limit across all of the threads, counting creates and renames
+    :param rename: rename each created instance to its resource name
+    :return: PublishSummary
+    """
+    summary = PublishSummary()
+    rate_limiter = RateLimiter(requests_per_second, burst=max_workers)
+    template_processor = cedar_access.cedar_template_processor
+    max_in_flight = max_workers * 4
+    start = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        in_flight = set()
+        for parse_result in parse_results:
+            if not parse_result.success:
+                summary.add(parse_result)
+                continue
+            if len(in_flight) >= max_in_flight:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                _completed(done, summary)
+            in_flight.add(executor.submit(publish_resource, cedar_access, parse_result.model_data, target_folder,
+                                          template_processor, rate_limiter, rename, parse_result.template_source))
+
+        while in_flight:
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            _completed(done, summary)
+
+    summary.elapsed_seconds = time.perf_counter() - start
+    logger.info(summary.report())
+    return summary
+
+
+def _completed(done, summary: PublishSummary):
+    for future in done:
+        summary.add(future.result())
@@ -5,11 +5,29 @@ ENV_CONFIG_LOCATION = 'PCOR_GEN3_CONFIG_LOCATION'
 logger = logging.getLogger(__name__)
 
 
-class MeasuresArrays:
+class PcorModel:
+    """
+    Base of the intermediate models, which declare their attributes in __slots__ to keep the per-instance footprint
+    small when many parsed documents are held in memory
+    """
+
+    __slots__ = ()
+
+    def as_dict(self) -> dict:
+        """
+        :return: dict of attribute name to value, in place of vars() which slotted instances don't support
+        """
+        return {name: getattr(self, name) for cls in type(self).__mro__
+                for name in getattr(cls, "__slots__", ()) if hasattr(self, name)}
+
+
+class MeasuresArrays(PcorModel):
     """
     contains a set of measures and the associated rollups
     """
 
+    __slots__ = ("measures", "measures_subcategories_major", "measures_subcategories_minor", "measures_parents")
+
     def __init__(self):
         self.measures = []
         self.measures_subcategories_major = []
@@ -17,22 +35,27 @@ class MeasuresArrays:
         self.measures_parents = []
 
 
-class PcorIntermediateProgramModel:
+class PcorIntermediateProgramModel(PcorModel):
     """
     Represents a program
     """
 
+    __slots__ = ("id", "name", "dbgap_accession_number")
+
     def __init__(self):
         self.id = None
         self.name = None
         self.dbgap_accession_number = None
 
 
-class PcorSubmissionInfoModel:
+class PcorSubmissionInfoModel(PcorModel):
     """
     Represents administrative information about a template (source, curator info and email)
     """
 
+    __slots__ = ("curation_comment", "curator_email", "curator_name", "template_source", "submit_location",
+                 "submit_final_location", "project_code")
+
     def __init__(self):
         # props in CEDAR template
         self.curation_comment = ""
@@ -48,7 +71,12 @@ class PcorSubmissionInfoModel:
         self.project_code = ""
 
 
-class PcorIntermediateProjectModel:
+class PcorIntermediateProjectModel(PcorModel):
+
+    __slots__ = ("program", "program_id", "availability_mechanism", "availability_type", "code", "complete",
+                 "date_collected", "dbgap_accession_number", "description", "id", "name", "project_sponsor",
+                 "project_sponsor_other", "project_sponsor_type", "project_sponsor_type_other", "project_url",
+                 "short_name", "submitter_id")
 
     def __init__(self):
         self.program = None
@@ -60,6 +88,7 @@ class PcorIntermediateProjectModel:
         self.complete = ""
         self.date_collected = ""
         self.dbgap_accession_number = ""
+        self.description = ""
         self.id = ""
         self.name = ""
         self.project_sponsor = []
@@ -71,12 +100,19 @@ class PcorIntermediateProjectModel:
         self.submitter_id = ""
 
 
-class PcorIntermediateResourceModel:
+class PcorIntermediateResourceModel(PcorModel):
     """
     Represents an intermediate data model from some source (e.g. spreadsheet or CEDAR) that is to be ingested into Gen3
     This allows introduction of new curation tools that will follow the same pipeline on the Gen3 side
     """
 
+    __slots__ = ("project", "access_type", "created_datetime", "description", "domain", "domain_other",
+                 "example_applications", "id", "is_static", "keywords", "limitations", "name", "payment_required",
+                 "project_sponsor", "project_sponsor_type", "publication_links", "publications", "resource_reference",
+                 "resource_guid", "resource_reference_link", "resource_type", "resource_url", "resource_version",
+                 "resource_use_agreement", "resource_use_agreement_link", "short_name", "strengths", "submitter_id",
+                 "tools_supporting_uses", "updated_datetime", "verification_datetime")
+
     def __init__(self):
         self.project = ""
         # resource
@@ -97,6 +133,7 @@ class PcorIntermediateResourceModel:
         self.publication_links = []
         self.publications = []
         self.resource_reference = ""
+        self.resource_guid = ""
         self.resource_reference_link = ""
         self.resource_type = ""
         self.resource_url = ""
@@ -111,12 +148,14 @@ class PcorIntermediateResourceModel:
         self.verification_datetime = ""
 
 
-class SubmitResponse:
+class SubmitResponse(PcorModel):
     """
     Represents the data about an object after submission, showing
     the result
     """
 
+    __slots__ = ("project_id", "type", "id", "submitter_id")
+
     def __init__(self):
         self.project_id = ""
         self.type = ""
@@ -124,11 +163,13 @@ class SubmitResponse:
         self.submitter_id = ""
 
 
-class PcorProgramModel:
+class PcorProgramModel(PcorModel):
     """
     A program in Gen3
     """
 
+    __slots__ = ("name", "dbgap_accession_number")
+
     def __init__(self):
         # props in CEDAR template
         self.name = ""
@@ -137,11 +178,22 @@ class PcorProgramModel:
         self.dbgap_accession_number = ""
 
 
-class PcorGeospatialDataResourceModel:
+class PcorGeospatialDataResourceModel(PcorModel):
     """
     Represents a geospatial data resource subtype
     """
 
+    __slots__ = ("comments", "display_type", "has_api", "has_visualization_tool", "includes_citizen_collected",
+                 "intended_use", "source_name", "update_frequency", "update_frequency_other", "data_formats",
+                 "data_link", "data_location_text", "exposure_media", "geographic_feature", "geographic_feature_other",
+                 "geometry_source", "geometry_source_other", "geometry_type", "measurement_method",
+                 "measurement_method_other", "measures", "measures_other", "measures_parent",
+                 "measures_subcategory_major", "measures_subcategory_minor", "model_methods", "model_methods_other",
+                 "project_id", "project_submitter_id", "resource_submitter_id", "spatial_bounding_box",
+                 "spatial_coverage", "spatial_coverage_other", "spatial_coverage_specific_regions",
+                 "spatial_resolution", "spatial_resolution_other", "temporal_resolution", "temporal_resolution_other",
+                 "time_available_comment", "time_extent_end_yyyy", "time_extent_start_yyyy")
+
     def __init__(self):
         # data resc props are common
         self.comments = ""
@@ -190,11 +242,23 @@ class PcorGeospatialDataResourceModel:
         self.time_extent_start_yyyy = None
 
 
-class PcorDiscoveryMetadata:
+class PcorDiscoveryMetadata(PcorModel):
     """
     Represents data for Discovery presentation of a resource
     """
 
+    __slots__ = ("access_type", "adv_search_filters", "comment", "data_formats", "data_location_1", "data_location_2",
+                 "data_location_3", "description", "domain", "exposure_media", "geometry_type", "has_api",
+                 "has_visualization_tool", "is_citizen_collected", "intended_use", "measures", "measures_parent",
+                 "measures_subcategory_major", "name", "payment_required", "program_name", "project_code",
+                 "project_description", "project_name", "project_short_name", "project_sponsor", "project_sponsor_type",
+                 "project_url", "publication_link_1", "publication_link_2", "publication_link_3", "publication_links",
+                 "publications", "publications_1", "publications_2", "publications_3", "resource_id",
+                 "resource_reference_1", "resource_reference_2", "resource_url", "resource_use_agreement",
+                 "source_name", "spatial_coverage", "spatial_resolution", "tags", "temporal_resolution",
+                 "time_available_comment", "time_extent_end_yyyy", "time_extent_start_yyyy", "tool_type", "type",
+                 "update_frequency", "variables", "verification_datetime")
+
     def __init__(self):
         self.access_type = ""
         self.adv_search_filters = []
@@ -253,31 +317,49 @@ class PcorDiscoveryMetadata:
         self.verification_datetime = ""
 
 
-class Tag:
+class Tag(PcorModel):
     """
     Tag struct in discovery metadata
     """
 
+    __slots__ = ("name", "category")
+
     def __init__(self):
         self.name = ""
         self.category = ""
 
 
-class AdvSearchFilter:
+class AdvSearchFilter(PcorModel):
     """
     advSearchFilters struct for discovery metadata
     """
 
+    __slots__ = ("key", "value")
+
     def __init__(self):
         self.key = ""
         self.value = ""
 
 
-class PcorPopDataResourceModel:
+class PcorPopDataResourceModel(PcorModel):
     """
     Represents a pop data resource subtype
     """
 
+    __slots__ = ("comments", "display_type", "has_api", "has_visualization_tool", "includes_citizen_collected",
+                 "intended_use", "source_name", "update_frequency", "update_frequency_other", "biospecimens",
+                 "biospecimens_type", "created_datetime", "data_formats", "data_link", "data_location_text",
+                 "exposure_media", "exposures", "geometry_source", "geometry_source_other", "geometry_type",
+                 "individual_level", "linkable_encounters", "measures", "measures_other", "measures_parent",
+                 "measures_subcategory_major", "measures_subcategory_minor", "model_methods", "model_methods_other",
+                 "pcor_intermediate_resource_model", "population_studied", "population_studied_other", "project_id",
+                 "project_submitter_id", "resource_id", "resource_submitter_id", "spatial_coverage",
+                 "spatial_coverage_other", "spatial_resolution", "spatial_resolution_other", "state",
+                 "suggested_audience", "submitter_id", "temporal_resolution", "temporal_resolution_other",
+                 "time_available_comment", "time_extent_end_yyyy", "time_extent_start_yyyy", "updated_datetime",
+                 "use_tool_link", "use_tools_text", "use_example_application_link", "Use_example_application_text",
+                 "use_key_variables", "vulnerable_population")
+
     def __init__(self):
         # data resc props are common
         self.comments = ""
@@ -341,11 +423,17 @@ class PcorPopDataResourceModel:
         self.vulnerable_population = []
 
 
-class PcorGeoToolModel:
+class PcorGeoToolModel(PcorModel):
     """
     Represents a geospatial tool resource subtype
     """
 
+    __slots__ = ("created_datetime", "display_type", "intended_use", "is_open", "languages", "languages_other",
+                 "license_type", "license_type_other", "operating_system", "operating_system_other",
+                 "pcor_intermediate_resource_model", "project_id", "project_submitter_id", "resource_id",
+                 "resource_submitter_id", "submitter_id", "suggested_audience", "tool_type", "tool_type_other",
+                 "updated_datetime")
+
     def __init__(self):
         self.created_datetime = ""
         self.display_type = ""
@@ -369,11 +457,28 @@ class PcorGeoToolModel:
         self.updated_datetime = ""
 
 
-class PcorKeyDatasetModel:
+class PcorKeyDatasetModel(PcorModel):
     """
     Represents a key dataset subtype
     """
 
+    __slots__ = ("comments", "display_type", "has_api", "has_visualization_tool", "includes_citizen_collected",
+                 "intended_use", "source_name", "update_frequency", "update_frequency_other", "created_datetime",
+                 "data_formats", "data_link", "data_location_text", "exposure_media", "geographic_feature",
+                 "geographic_feature_other", "geometry_source", "geometry_source_other", "geometry_type",
+                 "license_type", "license_type_other", "measurement_method", "measurement_method_other", "measures",
+                 "measures_other", "measures_parent", "measures_subcategory_major", "measures_subcategory_minor",
+                 "model_methods", "model_methods_other", "pcor_intermediate_resource_model", "resource_id",
+                 "resource_submitter_id", "spatial_bounding_box", "spatial_coverage", "spatial_coverage_other",
+                 "spatial_resolution", "spatial_resolution_other", "spatial_resolution_all_available",
+                 "spatial_resolution_all_other_available", "spatial_resolution_comment", "submitter_id",
+                 "temporal_resolution", "temporal_resolution_other", "temporal_resolution_all_available",
+                 "temporal_resolution_all_other_available", "temporal_resolution_comment", "time_available_comment",
+                 "time_extent_end_yyyy", "time_extent_start_yyyy", "updated_datetime", "use_suggested",
+                 "use_suggested_other", "use_key_variables", "use_example_application_link",
+                 "use_example_application_text", "use_tool_link", "use_tools_text", "use_strengths", "use_limitations",
+                 "use_example_metrics", "suggested_audience")
+
     def __init__(self):
         # data resc props are common
         self.comments = "" #d
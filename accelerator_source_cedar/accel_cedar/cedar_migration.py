@@ -0,0 +1,332 @@
+"""
+Migration of PCOR spreadsheet templates to CEDAR template instances.
+
+Templates are run through a StagedPipeline:
+
+    parse (worker processes) -> render (CedarTemplateProcessor) -> create (CedarAccess.create_resource)
+        -> rename (CedarAccess.rename_resource)
+
+with bounded queues between the stages, so parsing runs ahead of the uploads only as far as the queues allow. The
+create and rename stages share one RateLimiter. Each template is recorded in a CheckpointJournal keyed by its path as
+soon as its instance is created, with the @id and name of the instance and whether it has been renamed yet. A migration
+run again with the same journal skips the templates that were published, and only renames (never creates again) the
+instances that were created but not renamed.
+
+usage: python -m accelerator_source_cedar.accel_cedar.cedar_migration <directory or glob> <folder guid>
+    --journal migration.jsonl
+"""
+
+import argparse
+import logging
+import os
+import time
+import traceback
+
+from accelerator_source_cedar.accel_cedar.cedar_access import CedarAccess, base_url
+from accelerator_source_cedar.accel_cedar.cedar_intermediate_model import PcorGeospatialDataResourceModel, \
+    PcorGeoToolModel, PcorKeyDatasetModel, PcorPopDataResourceModel
+from accelerator_source_cedar.accel_cedar.cedar_template_processor import RESOURCE_TEMPLATES
+from accelerator_source_cedar.accel_cedar.checkpoint_journal import CheckpointJournal
+from accelerator_source_cedar.accel_cedar.file_discovery import discover_files
+from accelerator_source_cedar.accel_cedar.process_result import ProcessResult
+from accelerator_source_cedar.accel_cedar.rate_limiter import RateLimiter
+from accelerator_source_cedar.accel_cedar.staged_pipeline import Stage, StagedPipeline
+from accelerator_source_cedar.accel_cedar.template_bulk_parse import init_worker, parse_template
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PUBLISH_WORKERS = 8
+DEFAULT_REQUESTS_PER_SECOND = 5.0
+
+# data type specific model for each resource template, used for templates that only have the common sections
+RESOURCE_DETAIL_MODELS = {
+    "key_dataset": PcorKeyDatasetModel,
+    "geospatial_data_resource": PcorGeospatialDataResourceModel,
+    "geospatial_tool_resource": PcorGeoToolModel,
+    "population_data_resource": PcorPopDataResourceModel,
+}
+
+
+class MigrationSummary:
+    """
+    Outcome of a migration, with the failures and the stats of each stage
+    """
+
+    def __init__(self):
+        self.total = 0
+        self.succeeded = 0
+        self.skipped = 0  # templates already in the journal
+        self.resumed = 0  # templates created by an earlier run, only renamed by this one
+        self.failures = []  # ProcessResult for each template that failed
+        self.elapsed_seconds = 0.0
+        self.stage_stats = []  # StageStats for each stage of the pipeline
+
+    @property
+    def templates_per_second(self) -> float:
+        if self.elapsed_seconds <= 0:
+            return 0.0
+        return self.total / self.elapsed_seconds
+
+    def add(self, result: ProcessResult):
+        self.total += 1
+        if result.success:
+            self.succeeded += 1
+        else:
+            self.failures.append(result)
+
+    def report(self) -> str:
+        lines = [f"migrated {self.total} templates in {self.elapsed_seconds:.2f}s "
+                 f"({self.templates_per_second:.1f} templates/s), {self.succeeded} succeeded, "
+                 f"{len(self.failures)} failed, {self.skipped} already migrated, {self.resumed} resumed at rename"]
+        for stats in self.stage_stats:
+            lines.append(f"  {stats.report()}")
+        for failure in self.failures:
+            lines.append(f"  failed: {failure.template_source}: {failure.message}")
+        return "\n".join(lines)
+
+
+class CedarMigration:
+    """
+    Publishes spreadsheet templates to a CEDAR folder, holding what the stages of the pipeline share
+    """
+
+    def __init__(self, cedar_access: CedarAccess, target_folder: str, journal: CheckpointJournal = None,
+                 requests_per_second: float = DEFAULT_REQUESTS_PER_SECOND, burst: int = 1, rename: bool = True,
+                 detail_key: str = None):
+        """
+        :param cedar_access: CedarAccess shared by the create and rename threads
+        :param target_folder: id of the CEDAR folder the instances are created in
+        :param journal: optional CheckpointJournal of the templates already created or published
+        :param requests_per_second: rate limit across the create and rename stages
+        :param burst: number of requests allowed at once after an idle period
+        :param rename: rename each created instance to its resource name
+        :param detail_key: type of resource (a key of RESOURCE_TEMPLATES) for templates without a data type specific
+        model, the spreadsheet parser only reads the submission, program, project and resource sections. If None,
+        such templates fail rather than being published as a type they may not be
+        """
+        if detail_key is not None and detail_key not in RESOURCE_DETAIL_MODELS:
+            raise Exception(f"unknown resource type {detail_key}, expected one of: "
+                            f"{', '.join(RESOURCE_DETAIL_MODELS)}")
+        self.cedar_access = cedar_access
+        self.target_folder = target_folder
+        self.journal = journal
+        self.rate_limiter = RateLimiter(requests_per_second, burst=burst)
+        self.rename = rename
+        self.detail_key = detail_key
+        self.template_processor = cedar_access.cedar_template_processor
+
+    def render(self, parsed) -> ProcessResult:
+        """
+        Render stage, produce the json-ld of the instance into request_content
+        :param parsed: tuple of ProcessResult and parse seconds from template_bulk_parse.parse_template
+        :return: ProcessResult
+        """
+        result, parse_seconds = parsed
+        if not result.success or result.endpoint:
+            return result
+        try:
+            model_data = result.model_data
+            if not any(model_data.get(key) is not None for key in RESOURCE_TEMPLATES):
+                if self.detail_key is None:
+                    raise Exception("template has no data type section, give the resource type to publish it as")
+                model_data[self.detail_key] = RESOURCE_DETAIL_MODELS[self.detail_key]()
+            result.request_content = self.template_processor.produce_resource(model_data)
+        except Exception as err:
+            self._failed(result, "rendering", err)
+        return result
+
+    def create(self, result: ProcessResult) -> ProcessResult:
+        """
+        Create stage, create the instance in the target folder, with its @id in endpoint and guid in id. The instance is
+        journaled straight away, so a later run never creates it again
+        """
+        if not result.success or result.endpoint:
+            return result
+        try:
+            self.rate_limiter.acquire()
+            created = self.cedar_access.create_resource(result.request_content, self.target_folder)
+            result.endpoint = created["@id"]
+            result.id = CedarAccess.extract_guid(created["@id"])
+            # the instance is in CEDAR, the rendered json is not needed past here
+            result.request_content = ""
+            self._journal(result, renamed=False)
+        except Exception as err:
+            self._failed(result, "creating", err)
+        return result
+
+    def rename_resource(self, result: ProcessResult) -> ProcessResult:
+        """
+        Rename stage, rename the created instance to the resource name
+        """
+        if not result.success or not self.rename:
+            return result
+        try:
+            if result.resource_name:
+                self.rate_limiter.acquire()
+                self.cedar_access.rename_resource(result.id, result.resource_name)
+            self._journal(result, renamed=True)
+        except Exception as err:
+            # the instance was created and is journaled as not renamed, a run with the same journal renames it
+            self._failed(result, f"renaming {result.endpoint}", err)
+        return result
+
+    def _journal(self, result: ProcessResult, renamed: bool):
+        if self.journal is not None:
+            self.journal.record(result.template_source,
+                                {"@id": result.endpoint, "name": result.resource_name, "renamed": renamed})
+
+    @staticmethod
+    def _created(template_source: str, entry: dict) -> ProcessResult:
+        """
+        :param template_source: path of a template created by an earlier run
+        :param entry: journal location of the template
+        :return: ProcessResult of the created instance, which the parse, render and create stages pass through
+        """
+        result = ProcessResult()
+        result.template_source = template_source
+        result.endpoint = entry["@id"]
+        result.id = CedarAccess.extract_guid(entry["@id"])
+        result.resource_name = entry.get("name") or ""
+        return result
+
+    @staticmethod
+    def _failed(result: ProcessResult, step: str, err: Exception):
+        logger.error(f"exception {step} {result.template_source}: {err}")
+        result.success = False
+        result.message = str(err)
+        result.errors.append(f"error {step} {result.template_source}: {err}")
+        result.traceback = traceback.format_exc()
+
+    def migrate(self, location, parse_workers: int = None, publish_workers: int = DEFAULT_PUBLISH_WORKERS,
+                pattern: str = "*.xlsx", cache_dir: str = None, log_level: int = logging.WARNING,
+                queue_size: int = None) -> MigrationSummary:
+        """
+        Run templates through the pipeline
+        :param location: directory or glob pattern of templates, or a list of template paths
+        :param parse_workers: number of parse worker processes, defaults to the number of cores
+        :param publish_workers: number of concurrent create requests, and of concurrent rename requests
+        :param pattern: file name pattern used when location is a directory
+        :param cache_dir: optional directory of a TemplateParseCache shared by the parse workers
+        :param log_level: logging level in the parse worker processes
+        :param queue_size: size of the queue in front of each stage, defaults to twice the workers of the stage
+        :return: MigrationSummary
+        """
+        summary = MigrationSummary()
+        paths = discover_files(location, pattern) if isinstance(location, str) else iter(location)
+        pipeline = StagedPipeline([
+            Stage("parse", parse_or_resume, workers=parse_workers or os.cpu_count() or 1, processes=True,
+                  initializer=init_worker, initargs=(True, log_level, cache_dir), queue_size=queue_size),
+            Stage("render", self.render, queue_size=queue_size),
+            Stage("create", self.create, workers=publish_workers, queue_size=queue_size),
+            Stage("rename", self.rename_resource, workers=publish_workers, queue_size=queue_size),
+        ])
+
+        start = time.perf_counter()
+        for result in pipeline.run(self._pending(paths, summary)):
+            summary.add(result)
+        summary.elapsed_seconds = time.perf_counter() - start
+        summary.stage_stats = pipeline.stats
+        for error in pipeline.errors:
+            # failures outside of the stage functions, such as a parse worker process that died
+            result = ProcessResult()
+            result.template_source = error.item if isinstance(error.item, str) else \
+                getattr(error.item, "template_source", "")
+            result.success = False
+            result.message = error.message
+            result.traceback = error.traceback
+            summary.add(result)
+
+        logger.info(summary.report())
+        return summary
+
+    def _pending(self, paths, summary: MigrationSummary):
+        for path in paths:
+            if self.journal is not None and path in self.journal:
+                entry = self.journal.location(path)
+                if self.rename and isinstance(entry, dict) and not entry.get("renamed"):
+                    summary.resumed += 1
+                    yield self._created(path, entry)
+                    continue
+                summary.skipped += 1
+                continue
+            yield path
+
+
+def parse_or_resume(item):
+    """
+    Parse stage, a template path is parsed, a ProcessResult of an instance created by an earlier run goes on as is
+    :param item: template path, or ProcessResult
+    :return: tuple of ProcessResult and parse seconds, as template_bulk_parse.parse_template
+    """
+    if isinstance(item, ProcessResult):
+        return item, 0.0
+    return parse_template(item)
+
+
+def migrate_templates(cedar_access: CedarAccess, location, target_folder: str, journal_path: str = None,
+                      parse_workers: int = None, publish_workers: int = DEFAULT_PUBLISH_WORKERS,
+                      requests_per_second: float = DEFAULT_REQUESTS_PER_SECOND, rename: bool = True,
+                      detail_key: str = None, pattern: str = "*.xlsx",
+                      cache_dir: str = None) -> MigrationSummary:
+    """
+    Publish spreadsheet templates to a CEDAR folder
+    :param cedar_access: CedarAccess, it should have a pool_size of at least twice publish_workers
+    :param location: directory or glob pattern of templates, or a list of template paths
+    :param target_folder: id of the CEDAR folder the instances are created in
+    :param journal_path: optional journal of the created templates, a migration with the same journal resumes
+    :param parse_workers: number of parse worker processes, defaults to the number of cores
+    :param publish_workers: number of concurrent create requests, and of concurrent rename requests
+    :param requests_per_second: rate limit across all of the requests
+    :param rename: rename each created instance to its resource name
+    :param detail_key: type of resource for templates without a data type specific model, see CedarMigration
+    :param pattern: file name pattern used when location is a directory
+    :param cache_dir: optional directory of a TemplateParseCache shared by the parse workers
+    :return: MigrationSummary
+    """
+    journal = CheckpointJournal(journal_path) if journal_path else None
+    try:
+        migration = CedarMigration(cedar_access, target_folder, journal, requests_per_second,
+                                   burst=publish_workers, rename=rename, detail_key=detail_key)
+        return migration.migrate(location, parse_workers=parse_workers, publish_workers=publish_workers,
+                                 pattern=pattern, cache_dir=cache_dir)
+    finally:
+        if journal is not None:
+            journal.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Publish PCOR spreadsheet templates to a CEDAR folder")
+    parser.add_argument("location", help="directory (walked recursively) or glob pattern of templates")
+    parser.add_argument("folder_id", help="guid of the CEDAR folder the instances are created in")
+    parser.add_argument("--journal", default=None, help="journal of published templates, an existing one is resumed")
+    parser.add_argument("--parse-workers", type=int, default=None, help="number of parse processes (default: cores)")
+    parser.add_argument("--publish-workers", type=int, default=DEFAULT_PUBLISH_WORKERS,
+                        help="number of concurrent requests")
+    parser.add_argument("--requests-per-second", type=float, default=DEFAULT_REQUESTS_PER_SECOND)
+    parser.add_argument("--resource-type", default=None, choices=list(RESOURCE_DETAIL_MODELS),
+                        help="type of resource for templates without a data type specific section, without it "
+                             "those templates fail")
+    parser.add_argument("--no-rename", action="store_true", help="do not rename the instances to the resource name")
+    parser.add_argument("--pattern", default="*.xlsx", help="file name pattern when walking a directory")
+    parser.add_argument("--cache-dir", default=None, help="parse cache directory")
+    parser.add_argument("--api-key", default=None, help="CEDAR api key, by default read from CEDAR_API_KEY")
+    parser.add_argument("--endpoint", default=base_url)
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args(argv)
+
+    logging.getLogger().setLevel(logging.getLevelName(args.log_level.upper()))
+
+    params = {"cedar_endpoint": args.endpoint}
+    if args.api_key:
+        params["api_key"] = args.api_key
+    cedar_access = CedarAccess(params, pool_size=args.publish_workers * 2)
+    summary = migrate_templates(cedar_access, args.location, args.folder_id, journal_path=args.journal,
+                                parse_workers=args.parse_workers, publish_workers=args.publish_workers,
+                                requests_per_second=args.requests_per_second, rename=not args.no_rename,
+                                detail_key=args.resource_type, pattern=args.pattern, cache_dir=args.cache_dir)
+    print(summary.report())
+    return 0 if not summary.failures else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,321 @@
+"""
+Offline mirror of a CEDAR folder tree.
+
+A folder (and by default its subfolders) is downloaded into a local directory, holding the folder listings and every
+template instance, with a manifest that maps instance ids to their files:
+
+    <mirror>/manifest.json          folder listings and the instance index
+    <mirror>/instances/<guid>.json  template instance json-ld, as returned by CEDAR
+    <mirror>/journal.jsonl          CheckpointJournal of the instances downloaded so far
+
+Instances are fetched concurrently by a pool of threads sharing one CedarAccess. A mirror that is interrupted resumes
+where it stopped when run again, instances already in the journal are not downloaded again. The manifest lists every
+instance in the folders, an instance that could not be downloaded is marked as not downloaded and is not in the mirror.
+
+CedarMirror also reads the mirror back, with the retrieve_resource / iter_folder_contents methods of CedarAccess, so
+it can stand in for CedarAccess in CedarAccelSource (see the MIRROR parameter) and development or backfill runs read
+from local disk rather than the CEDAR API.
+
+usage: python -m accelerator_source_cedar.accel_cedar.cedar_mirror <folder id> <mirror directory> [--workers n]
+"""
+
+import argparse
+import datetime
+import json
+import logging
+import os
+import threading
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from accelerator_source_cedar.accel_cedar.cedar_access import CedarAccess, CedarFolder, base_url, \
+    default_page_size
+from accelerator_source_cedar.accel_cedar.checkpoint_journal import CheckpointJournal
+from accelerator_source_cedar.accel_cedar.process_result import ProcessResult
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = "manifest.json"
+JOURNAL_FILE = "journal.jsonl"
+INSTANCES_DIR = "instances"
+DEFAULT_MAX_WORKERS = 8
+
+
+class CedarMirrorSummary:
+    """
+    Outcome of a mirror run
+    """
+
+    def __init__(self):
+        self.folders = 0
+        self.total = 0
+        self.downloaded = 0
+        self.skipped = 0  # already in the mirror
+        self.failures = []  # ProcessResult for each instance that could not be downloaded
+        self.elapsed_seconds = 0.0
+
+    def report(self) -> str:
+        lines = [f"mirrored {self.folders} folders and {self.total} instances in {self.elapsed_seconds:.2f}s, "
+                 f"{self.downloaded} downloaded, {self.skipped} already in the mirror, {len(self.failures)} failed"]
+        for failure in self.failures:
+            lines.append(f"  failed: {failure.id}: {failure.message}")
+        return "\n".join(lines)
+
+
+class CedarMirror:
+    """
+    Local mirror of a CEDAR folder tree
+    """
+
+    def __init__(self, mirror_dir):
+        """
+        :param mirror_dir: directory of the mirror, created when mirroring if it does not exist
+        """
+        self.mirror_dir = str(mirror_dir)
+        self._manifest = None
+        self._lock = threading.Lock()
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.mirror_dir, MANIFEST_FILE)
+
+    @property
+    def manifest(self) -> dict:
+        """
+        :return: the manifest, loaded once from the mirror directory
+        """
+        if self._manifest is None:
+            if not os.path.exists(self.manifest_path):
+                raise Exception(f"no CEDAR mirror manifest at {self.manifest_path}")
+            with open(self.manifest_path, "r", encoding="utf-8") as manifest_file:
+                self._manifest = json.load(manifest_file)
+        return self._manifest
+
+    def write_manifest(self, manifest: dict):
+        manifest["updated"] = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        self._write_json(self.manifest_path, manifest)
+        self._manifest = manifest
+
+    @staticmethod
+    def _write_json(path: str, contents: dict):
+        # write to the side and replace, so an interrupted write never leaves a truncated file in the mirror
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as json_file:
+            json.dump(contents, json_file)
+        os.replace(temp_path, path)
+
+    # reading the mirror, with the same methods as CedarAccess
+
+    def retrieve_resource(self, resource_id) -> dict:
+        """
+        Retrieve a template instance from the mirror
+        :param resource_id: guid or @id of the instance
+        :return: dict with the json-ld of the instance
+        """
+        with open(self.instance_path(resource_id), "r", encoding="utf-8") as json_data:
+            return json.load(json_data)
+
+    def retrieve_resource_content(self, resource_id) -> bytes:
+        """
+        Retrieve a template instance from the mirror without decoding it
+        :param resource_id: guid or @id of the instance
+        :return: bytes of the json-ld of the instance
+        """
+        with open(self.instance_path(resource_id), "rb") as json_data:
+            return json_data.read()
+
+    def instance_path(self, resource_id) -> str:
+        """
+        :param resource_id: guid or @id of a mirrored instance
+        :return: path of the json file of the instance
+        """
+        instance = self.manifest["instances"].get(CedarAccess.guid_or_identity(resource_id))
+        path = os.path.join(self.mirror_dir, instance["path"]) if self._is_downloaded(instance) else None
+        if path is None or not os.path.exists(path):
+            raise Exception(f"resource {resource_id} is not in the CEDAR mirror at {self.mirror_dir}")
+        return path
+
+    @staticmethod
+    def _is_downloaded(instance) -> bool:
+        # manifests written before the downloaded flag was added only list the instances by their files
+        return instance is not None and instance.get("downloaded", True)
+
+    def retrieve_folder_contents(self, folder_id) -> CedarFolder:
+        """
+        :param folder_id: guid or @id of a mirrored folder
+        :return: CedarFolder with the folder's items as subfolders
+        """
+        folder_guid = CedarAccess.guid_or_identity(folder_id)
+        folder = CedarFolder(folder_name=self._folder(folder_guid).get("name"), folder_id=folder_guid)
+        folder.subfolders = list(self.iter_folder_contents(folder_guid))
+        return folder
+
+    def iter_folder_contents(self, folder_id, page_size=None):
+        """
+        Iterate the items of a mirrored folder
+        :param folder_id: guid or @id of a mirrored folder
+        :param page_size: not used, accepted for compatibility with CedarAccess
+        :return: generator of CedarFolder, one per item in the folder
+        """
+        for resource in self._folder(CedarAccess.guid_or_identity(folder_id))["resources"]:
+            yield CedarFolder(folder_name=resource["schema:name"], folder_id=resource["@id"],
+                              item_type=resource["resourceType"])
+
+    def _folder(self, folder_guid) -> dict:
+        folder = self.manifest["folders"].get(folder_guid)
+        if folder is None:
+            raise Exception(f"folder {folder_guid} is not in the CEDAR mirror at {self.mirror_dir}")
+        return folder
+
+    def __contains__(self, resource_id):
+        return self._is_downloaded(self.manifest["instances"].get(CedarAccess.guid_or_identity(resource_id)))
+
+    def __len__(self):
+        return sum(1 for instance in self.manifest["instances"].values() if self._is_downloaded(instance))
+
+    # building the mirror
+
+    def mirror(self, cedar_access: CedarAccess, folder_id: str, recurse: bool = True,
+               max_workers: int = DEFAULT_MAX_WORKERS, page_size: int = default_page_size) -> CedarMirrorSummary:
+        """
+        Download a CEDAR folder tree into the mirror, resuming an earlier run of the same mirror
+        :param cedar_access: CedarAccess used to read CEDAR, it should have a pool_size of at least max_workers
+        :param folder_id: guid of the folder
+        :param recurse: also mirror the subfolders
+        :param max_workers: number of concurrent downloads
+        :param page_size: number of items read per folder listing request
+        :return: CedarMirrorSummary
+        """
+        start = time.perf_counter()
+        summary = CedarMirrorSummary()
+        os.makedirs(os.path.join(self.mirror_dir, INSTANCES_DIR), exist_ok=True)
+
+        manifest = {"root_folder_id": CedarAccess.guid_or_identity(folder_id), "folders": {}, "instances": {}}
+        self.list_folders(cedar_access, manifest, recurse, page_size)
+        summary.folders = len(manifest["folders"])
+        summary.total = len(manifest["instances"])
+        # the listing is kept even if the downloads are interrupted
+        self.write_manifest(manifest)
+
+        with CheckpointJournal(os.path.join(self.mirror_dir, JOURNAL_FILE)) as journal:
+            pending = []
+            for instance_guid, instance in manifest["instances"].items():
+                if journal.is_complete(instance_guid) and os.path.exists(
+                        os.path.join(self.mirror_dir, instance["path"])):
+                    summary.skipped += 1
+                else:
+                    pending.append(instance_guid)
+
+            logger.info(f"mirroring {len(pending)} instances, {summary.skipped} already in the mirror")
+            max_in_flight = max_workers * 4
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                in_flight = set()
+                for instance_guid in pending:
+                    if len(in_flight) >= max_in_flight:
+                        done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                        self._completed(done, summary)
+                    in_flight.add(executor.submit(self.download_instance, cedar_access, instance_guid,
+                                                  manifest["instances"][instance_guid]["path"], journal))
+                while in_flight:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    self._completed(done, summary)
+
+            # mark the instances now in the mirror, the ones that failed stay listed but not downloaded
+            for instance_guid, instance in manifest["instances"].items():
+                instance["downloaded"] = journal.is_complete(instance_guid) and os.path.exists(
+                    os.path.join(self.mirror_dir, instance["path"]))
+            self.write_manifest(manifest)
+
+        summary.elapsed_seconds = time.perf_counter() - start
+        logger.info(summary.report())
+        return summary
+
+    @staticmethod
+    def _completed(done, summary: CedarMirrorSummary):
+        for future in done:
+            failure = future.result()
+            if failure is None:
+                summary.downloaded += 1
+            else:
+                summary.failures.append(failure)
+
+    def list_folders(self, cedar_access: CedarAccess, manifest: dict, recurse: bool = True,
+                     page_size: int = default_page_size):
+        """
+        Read the listing of the root folder of the manifest, and of its subfolders when recursing, into the manifest
+        """
+        folder_names = {manifest["root_folder_id"]: None}
+        to_list = [manifest["root_folder_id"]]
+        while to_list:
+            folder_guid = to_list.pop(0)
+            if folder_guid in manifest["folders"]:
+                continue
+            logger.info(f"listing folder {folder_guid}")
+            resources = []
+            for item in cedar_access.iter_folder_contents(folder_guid, page_size=page_size):
+                resources.append({"schema:name": item.folder_name, "@id": item.folder_id,
+                                  "resourceType": item.item_type})
+                item_guid = CedarAccess.guid_or_identity(item.folder_id)
+                if item.item_type == "folder":
+                    if recurse:
+                        folder_names[item_guid] = item.folder_name
+                        to_list.append(item_guid)
+                else:
+                    manifest["instances"][item_guid] = {
+                        "@id": item.folder_id,
+                        "name": item.folder_name,
+                        "folder_id": folder_guid,
+                        "path": f"{INSTANCES_DIR}/{item_guid}.json",
+                        "downloaded": False,
+                    }
+            manifest["folders"][folder_guid] = {"name": folder_names.get(folder_guid), "resources": resources}
+
+    def download_instance(self, cedar_access: CedarAccess, instance_guid: str, path: str,
+                          journal: CheckpointJournal):
+        """
+        Download one template instance into the mirror, runs in a worker thread
+        :return: None when downloaded, or a ProcessResult describing the failure
+        """
+        try:
+            json_dict = cedar_access.retrieve_resource(instance_guid)
+            self._write_json(os.path.join(self.mirror_dir, path), json_dict)
+            journal.record(instance_guid, path)
+            return None
+        except Exception as err:
+            logger.error(f"exception mirroring {instance_guid}: {err}")
+            failure = ProcessResult()
+            failure.success = False
+            failure.id = instance_guid
+            failure.message = str(err)
+            failure.errors.append(f"error mirroring {instance_guid}: {err}")
+            failure.traceback = traceback.format_exc()
+            return failure
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mirror a CEDAR folder tree to local disk")
+    parser.add_argument("folder_id", help="guid of the CEDAR folder")
+    parser.add_argument("mirror_dir", help="directory of the mirror, an existing mirror is resumed")
+    parser.add_argument("--workers", type=int, default=DEFAULT_MAX_WORKERS, help="number of concurrent downloads")
+    parser.add_argument("--page-size", type=int, default=default_page_size)
+    parser.add_argument("--no-recurse", action="store_true", help="do not mirror the subfolders")
+    parser.add_argument("--api-key", default=None, help="CEDAR api key, by default read from CEDAR_API_KEY")
+    parser.add_argument("--endpoint", default=base_url)
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args(argv)
+
+    logging.getLogger().setLevel(logging.getLevelName(args.log_level.upper()))
+
+    params = {"cedar_endpoint": args.endpoint}
+    if args.api_key:
+        params["api_key"] = args.api_key
+    cedar_access = CedarAccess(params, pool_size=args.workers)
+    summary = CedarMirror(args.mirror_dir).mirror(cedar_access, args.folder_id, recurse=not args.no_recurse,
+                                                  max_workers=args.workers, page_size=args.page_size)
+    print(summary.report())
+    return 0 if not summary.failures else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
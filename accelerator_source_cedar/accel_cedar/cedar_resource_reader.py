@@ -4,7 +4,6 @@ import traceback
 import uuid
 import warnings
 
-import importlib.resources as pkg_resources
 import validators
 from accelerator_core.utils.resource_utils import determine_resource_path
 
@@ -31,9 +30,8 @@ class CedarResourceReader:
 
     def __init__(self):
         #self.cedar_config = CedarConfig()
-        resources_path = pkg_resources.files("accelerator_source_cedar.accel_cedar") / 'resources'
-        measures_file = resources_path.joinpath("MeasuresTermsv4.xlsx")
-        self.pcor_measures_rollup = MeasuresRollup(measures_file)
+        # shared so the measures spreadsheet is read once per process, not once per reader
+        self.pcor_measures_rollup = MeasuresRollup.shared()
         self.yyyy_pattern = r"\b(\d{4})\b"
 
     def parse(self, cedar_data:dict, cedar_id:str, result:ProcessResult):
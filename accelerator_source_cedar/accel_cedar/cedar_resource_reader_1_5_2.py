@@ -90,9 +90,9 @@ class CedarResourceReader_1_5_2(CedarResourceReader_1_5_1):
 
     @classmethod
     def _append_values(cls, target, value):
-        for item in cls._iter_nodes(value):
-            if isinstance(item, dict) and item.get("@value") is not None:
-                target.append(PcorTemplateParser.sanitize_column(item["@value"]))
+        target.extend(PcorTemplateParser.sanitize_columns(
+            item["@value"] for item in cls._iter_nodes(value)
+            if isinstance(item, dict) and item.get("@value") is not None))
 
     @classmethod
     def _append_ids(cls, target, value):
@@ -0,0 +1,99 @@
+"""
+Rendering of CEDAR template instances (json-ld) from the intermediate models, with the bundled Jinja templates.
+"""
+
+import json
+import logging
+import os
+from functools import lru_cache
+
+from jinja2 import Environment, FileSystemLoader
+
+logger = logging.getLogger(__name__)
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
+RENAME_TEMPLATE = "resource_rename.jinja"
+
+# template for each type of resource, by the model data key of its data type specific model
+RESOURCE_TEMPLATES = {
+    "key_dataset": "key_dataset_1_5_1.jinja",
+    "geospatial_data_resource": "cedar_geoexposure_resource_1_5_1.jinja",
+    "geospatial_tool_resource": "cedar_geoexposure_tool_resource_1_5_1.jinja",
+    "population_data_resource": "population_data_resource_1_5_1.jinja",
+}
+
+
+def finalize_json_value(value):
+    """
+    Render a value into a json string literal of a template, escaping quotes, backslashes and control characters,
+    with None rendered as an empty string
+    """
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return json.dumps(value)[1:-1]
+    return value
+
+
+def build_environment(templates_dir: str = TEMPLATES_DIR) -> Environment:
+    """
+    The Jinja environment for a templates directory, built once per process with every template compiled up front,
+    so rendering a batch of resources does not re-read or re-compile the templates
+    :param templates_dir: directory of the .jinja templates
+    :return: Environment
+    """
+    return _build_environment(os.path.abspath(templates_dir))
+
+
+@lru_cache(maxsize=None)
+def _build_environment(templates_dir: str) -> Environment:
+    environment = Environment(loader=FileSystemLoader(templates_dir), auto_reload=False, cache_size=-1,
+                              finalize=finalize_json_value)
+    for template_name in environment.list_templates(extensions=["jinja"]):
+        environment.get_template(template_name)
+    logger.info(f"compiled templates in {templates_dir}")
+    return environment
+
+
+class CedarTemplateProcessor:
+    """
+    Renders CEDAR template instances, and the rename command, from the intermediate models
+    """
+
+    def __init__(self, templates_dir: str = TEMPLATES_DIR):
+        """
+        :param templates_dir: directory of the .jinja templates, defaults to the bundled templates
+        """
+        self.environment = build_environment(templates_dir)
+
+    @staticmethod
+    def template_for(model_data: dict) -> str:
+        """
+        :param model_data: dict of intermediate models, as in the model_data of a ProcessResult
+        :return: name of the template for the data type of the resource
+        """
+        for key, template_name in RESOURCE_TEMPLATES.items():
+            if model_data.get(key) is not None:
+                return template_name
+        raise Exception("no CEDAR template for model data with keys: %s" % ", ".join(model_data.keys()))
+
+    def render(self, template_name: str, **context) -> str:
+        return self.environment.get_template(template_name).render(**context)
+
+    def produce_resource(self, model_data: dict) -> str:
+        """
+        Render a CEDAR template instance
+        :param model_data: dict of intermediate models with the submission, project, resource and the data type
+        specific model (e.g. key_dataset)
+        :return: json-ld of the template instance
+        """
+        return self.render(self.template_for(model_data), **model_data)
+
+    def produce_rename_resource(self, resource_id: str, name: str) -> str:
+        """
+        Render the body of a CEDAR rename-resource command
+        :param resource_id: guid of the template instance
+        :param name: new name
+        :return: json of the command
+        """
+        return self.render(RENAME_TEMPLATE, id=resource_id, name=name)
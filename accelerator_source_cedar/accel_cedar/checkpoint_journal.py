@@ -0,0 +1,98 @@
+"""
+Checkpoint journal for long-running synch and crosswalk batches.
+
+The journal is an append-only JSON-lines file with one record per completed item, holding the item id and where its
+output was written. A run that is restarted with the same journal skips the items already recorded and continues from
+where it stopped. A record that was only partially written when a run died is ignored when the journal is loaded.
+"""
+
+import json
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class CheckpointJournal:
+    """
+    Append-only record of completed work items
+    """
+
+    def __init__(self, path, sync=False):
+        """
+        :param path: path of the journal file, created if it does not exist
+        :param sync: fsync after each record, so records also survive a machine (not just a process) failure
+        """
+        self.path = str(path)
+        self.sync = sync
+        self.completed = {}
+        self._lock = threading.Lock()
+        self._load()
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._terminate_partial_record()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+
+        with open(self.path, "r", encoding="utf-8") as journal_file:
+            for line in journal_file:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    logger.warning(f"ignoring incomplete journal record in {self.path}")
+                    continue
+                self.completed[record["id"]] = record.get("location")
+
+        logger.info(f"journal {self.path} has {len(self.completed)} completed items")
+
+    def _terminate_partial_record(self):
+        # a run that died mid-write leaves a record without its newline, end it so new records start on their own line
+        if self._file.tell() == 0:
+            return
+        with open(self.path, "rb") as journal_file:
+            journal_file.seek(-1, os.SEEK_END)
+            if journal_file.read(1) != b"\n":
+                self._file.write("\n")
+                self._file.flush()
+
+    def is_complete(self, item_id) -> bool:
+        return item_id in self.completed
+
+    def __contains__(self, item_id):
+        return item_id in self.completed
+
+    def __len__(self):
+        return len(self.completed)
+
+    def location(self, item_id):
+        """
+        :param item_id: id of a completed item
+        :return: output location recorded for the item, or None
+        """
+        return self.completed.get(item_id)
+
+    def record(self, item_id, location=None):
+        """
+        Record an item as completed
+        :param item_id: id of the item
+        :param location: where the output for the item was written
+        """
+        line = json.dumps({"id": item_id, "location": location}) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            if self.sync:
+                os.fsync(self._file.fileno())
+            self.completed[item_id] = location
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,26 @@
+"""
+Lazy discovery of the input files of a bulk run, from a directory or a glob pattern.
+"""
+
+import fnmatch
+import glob
+import os
+
+
+def discover_files(location: str, pattern: str):
+    """
+    Lazily discover files
+    :param location: a directory, which is walked recursively, or a glob pattern (** is supported)
+    :param pattern: file name pattern used when walking a directory
+    :return: generator of file paths
+    """
+    if os.path.isdir(location):
+        for dir_path, dir_names, file_names in os.walk(location):
+            dir_names.sort()
+            for file_name in sorted(file_names):
+                if fnmatch.fnmatch(file_name, pattern):
+                    yield os.path.join(dir_path, file_name)
+    else:
+        for path in glob.iglob(location, recursive=True):
+            if os.path.isfile(path):
+                yield path
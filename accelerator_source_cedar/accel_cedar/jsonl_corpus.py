@@ -0,0 +1,340 @@
+"""
+JSON-lines corpus files, holding a batch of documents (CEDAR instances or crosswalked accelerator documents) in
+one sequential file rather than a file per document. A corpus may be gzip compressed, and is written with a sidecar
+offset index (<corpus>.idx) that gives random access to a document by its id. Index entries are only written once
+the documents they point at have been flushed to the corpus, so after a crash the index may be short of the corpus
+but never points past it, and reading checks each index entry against the offset of its document. A writer that opens
+such a corpus to append to it first indexes the complete documents past the end of the index, by their @id, and cuts
+off any document that was only partly written, so new documents follow on from an indexed corpus.
+
+In a compressed corpus each document is written as its own gzip member, the file is still a valid gzip stream for
+sequential reading, and a single document can be decompressed from its offset without reading what is in front of
+it.
+"""
+
+import gzip
+import json
+import logging
+import os
+import threading
+import zlib
+
+logger = logging.getLogger(__name__)
+
+INDEX_SUFFIX = ".idx"
+
+
+def is_jsonl_path(path) -> bool:
+    return str(path).endswith((".jsonl", ".jsonl.gz"))
+
+
+def index_path_for(path) -> str:
+    return str(path) + INDEX_SUFFIX
+
+
+INDEX_BATCH_SIZE = 1000  # index entries held until the corpus is flushed and they are written
+
+
+class JsonLinesWriter:
+    """
+    Writes documents to a JSON-lines corpus along with its offset index. An existing corpus is appended to, once
+    the documents a writer that died left past the end of its index are indexed (see recover)
+    """
+
+    def __init__(self, path, compress=None):
+        """
+        :param path: path of the corpus file
+        :param compress: True to gzip each document, by default a path ending in .gz is compressed
+        """
+        self.path = str(path)
+        self.compress = self.path.endswith(".gz") if compress is None else compress
+        self.count = 0
+        self._lock = threading.Lock()
+        self.recover()
+        self._file = open(self.path, "ab")
+        self._index = open(index_path_for(self.path), "a", encoding="utf-8")
+        self._pending_index = []  # entries of documents not yet flushed to the corpus
+
+    def recover(self):
+        """
+        Bring an existing corpus and its index back in line after a writer died. A partly written index entry is
+        dropped, the complete documents past the last index entry are indexed by their @id (or line number), and a
+        partly written document at the end of the corpus is cut off
+        """
+        if not os.path.exists(self.path):
+            return
+
+        index_path = index_path_for(self.path)
+        end = 0
+        entries = 0
+        if os.path.exists(index_path):
+            with open(index_path, "rb") as index_file:
+                index_data = index_file.read()
+            complete = index_data[:index_data.rfind(b"\n") + 1]
+            if len(complete) != len(index_data):
+                logger.warning(f"dropping a partly written entry from the index of corpus {self.path}")
+                with open(index_path, "r+b") as index_file:
+                    index_file.truncate(len(complete))
+            for line in complete.decode("utf-8").splitlines():
+                item_id, offset, length = line.rsplit("\t", 2)
+                end = max(end, int(offset) + int(length))
+                entries += 1
+
+        if os.path.getsize(self.path) <= end:
+            return
+
+        with open(self.path, "rb") as corpus_file:
+            corpus_file.seek(end)
+            tail = corpus_file.read()
+        if self.compress:
+            tail_entries, kept = self._compressed_tail_entries(tail, end, entries)
+        else:
+            tail_entries, kept = self._tail_entries(tail, end, entries)
+
+        logger.warning(f"corpus {self.path} has {len(tail_entries)} documents past the end of its index, "
+                       f"indexing them by @id")
+        if kept < len(tail):
+            logger.warning(f"cutting {len(tail) - kept} bytes of a partly written document from corpus {self.path}")
+            with open(self.path, "r+b") as corpus_file:
+                corpus_file.truncate(end + kept)
+        with open(index_path, "a", encoding="utf-8") as index_file:
+            index_file.write("".join(tail_entries))
+
+    @staticmethod
+    def _tail_entries(tail: bytes, offset: int, line_number: int):
+        # index entries for the complete lines of an uncompressed tail, and the length of the tail they cover
+        entries = []
+        position = 0
+        while position < len(tail):
+            end_of_line = tail.find(b"\n", position)
+            if end_of_line < 0:
+                break
+            line = tail[position:end_of_line + 1]
+            if line.strip():
+                try:
+                    document = json.loads(line)
+                except ValueError:
+                    break
+                entries.append(f"{document.get('@id', str(line_number))}\t{offset + position}\t{len(line)}\n")
+            line_number += 1
+            position = end_of_line + 1
+        return entries, position
+
+    @staticmethod
+    def _compressed_tail_entries(tail: bytes, offset: int, line_number: int):
+        # as _tail_entries, for a tail of gzip members of one document each
+        entries = []
+        position = 0
+        while position < len(tail):
+            decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            try:
+                data = decompressor.decompress(tail[position:])
+                document = json.loads(data)
+            except (zlib.error, ValueError):
+                break
+            if not decompressor.eof:
+                break
+            length = len(tail) - position - len(decompressor.unused_data)
+            entries.append(f"{document.get('@id', str(line_number))}\t{offset + position}\t{length}\n")
+            line_number += 1
+            position += length
+        return entries, position
+
+    def write(self, item_id: str, document: dict) -> int:
+        """
+        Append a document to the corpus
+        :param item_id: id used to look the document up in the index
+        :param document: dict to write
+        :return: byte offset of the document in the corpus file
+        """
+        data = json.dumps(document, separators=(",", ":")).encode("utf-8") + b"\n"
+        if self.compress:
+            data = gzip.compress(data)
+
+        with self._lock:
+            offset = self._file.tell()
+            self._file.write(data)
+            self._pending_index.append(f"{item_id}\t{offset}\t{len(data)}\n")
+            self.count += 1
+            if len(self._pending_index) >= INDEX_BATCH_SIZE:
+                self._flush()
+        return offset
+
+    def _flush(self):
+        # the corpus goes first, so the index never has an entry for a document that is not on disk
+        self._file.flush()
+        if self._pending_index:
+            self._index.write("".join(self._pending_index))
+            self._pending_index = []
+        self._index.flush()
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def close(self):
+        with self._lock:
+            self._flush()
+            self._file.close()
+            self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class JsonLinesCorpus:
+    """
+    Reads documents from a JSON-lines corpus, sequentially or by id using the sidecar offset index
+    """
+
+    def __init__(self, path):
+        """
+        :param path: path of the corpus file, a .gz file is treated as gzip compressed
+        """
+        self.path = str(path)
+        self.compressed = self.path.endswith(".gz")
+        self._index = None
+        self._lock = threading.Lock()
+        self._file = None
+
+    def __iter__(self):
+        for item_id, document in self.items():
+            yield document
+
+    def items(self):
+        """
+        Read the corpus sequentially
+        :return: generator of (id, document) tuples, the id is taken from the index when there is one, otherwise
+        from the document @id, or the line number. Documents written after the last index entry (a writer that
+        died before writing the index) are read with the @id or line number, and an index entry that does not
+        match the offset and length of its document raises an Exception
+        """
+        if not os.path.exists(index_path_for(self.path)):
+            opener = gzip.open if self.compressed else open
+            with opener(self.path, "rt", encoding="utf-8") as corpus_file:
+                for line_number, line in enumerate(corpus_file):
+                    if line.strip():
+                        document = json.loads(line)
+                        yield document.get("@id", str(line_number)), document
+            return
+
+        with open(self.path, "rb") as corpus_file:
+            offset = 0
+            line_number = 0
+            for item_id, entry_offset, length in self._iter_index():
+                if entry_offset > offset and not self.compressed:
+                    # blank lines are left out of a rebuilt index
+                    gap = corpus_file.read(entry_offset - offset)
+                    if not gap.strip():
+                        offset += len(gap)
+                data = corpus_file.read(length) if entry_offset == offset else b""
+                if entry_offset != offset or len(data) != length:
+                    raise Exception(f"index of corpus {self.path} does not match the corpus at {item_id}, "
+                                    f"offset {entry_offset} length {length}")
+                if self.compressed:
+                    data = gzip.decompress(data)
+                elif not data.endswith(b"\n"):
+                    raise Exception(f"index of corpus {self.path} does not match the corpus at {item_id}, "
+                                    f"the entry does not end on a line")
+                offset += length
+                line_number += 1
+                yield item_id, json.loads(data)
+
+            remainder = corpus_file.read()
+        if remainder:
+            logger.warning(f"corpus {self.path} has documents past the end of its index, reading them by @id")
+            if self.compressed:
+                remainder = gzip.decompress(remainder)
+            for line in remainder.splitlines():
+                if line.strip():
+                    document = json.loads(line)
+                    yield document.get("@id", str(line_number)), document
+                line_number += 1
+
+    def _iter_index(self):
+        with open(index_path_for(self.path), "r", encoding="utf-8") as index_file:
+            for line in index_file:
+                item_id, offset, length = line.rstrip("\n").rsplit("\t", 2)
+                yield item_id, int(offset), int(length)
+
+    @property
+    def index(self) -> dict:
+        """
+        The offset index, loaded on first use
+        :return: dict of id to (offset, length)
+        """
+        if self._index is None:
+            self._index = {item_id: (offset, length) for item_id, offset, length in self._iter_index()}
+        return self._index
+
+    def ids(self):
+        return list(self.index.keys())
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, item_id):
+        return item_id in self.index
+
+    def get(self, item_id: str) -> dict:
+        """
+        Random access to a document by id
+        :param item_id: id of the document in the index
+        :return: dict with the document
+        """
+        try:
+            offset, length = self.index[item_id]
+        except KeyError:
+            raise KeyError(f"{item_id} not found in corpus {self.path}")
+
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, "rb")
+            self._file.seek(offset)
+            data = self._file.read(length)
+
+        if self.compressed:
+            data = gzip.decompress(data)
+        return json.loads(data)
+
+    def retrieve_resource(self, resource_id) -> dict:
+        """
+        Retrieve a CEDAR instance from the corpus, so that a corpus can stand in for CedarAccess when ingesting
+        :param resource_id: id of the instance
+        :return: dict with the json-ld
+        """
+        logger.info("retrieving resource from corpus: %s" % resource_id)
+        return self.get(resource_id)
+
+    def build_index(self):
+        """
+        Write the offset index for an uncompressed corpus that does not have one, using each document's @id
+        (or line number) as its id
+        """
+        if self.compressed:
+            raise Exception("an index can only be rebuilt for an uncompressed corpus")
+
+        with open(self.path, "rb") as corpus_file, \
+                open(index_path_for(self.path), "w", encoding="utf-8") as index_file:
+            offset = 0
+            for line_number, line in enumerate(corpus_file):
+                if line.strip():
+                    item_id = json.loads(line).get("@id", str(line_number))
+                    index_file.write(f"{item_id}\t{offset}\t{len(line)}\n")
+                offset += len(line)
+        self._index = None
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
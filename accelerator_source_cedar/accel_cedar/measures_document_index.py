@@ -0,0 +1,126 @@
+"""
+Local SQLite index of measure -> document ids, recorded as documents are crosswalked, so that when the measures
+vocabulary changes only the documents that use a changed term need to be crosswalked again.
+
+Measures are stored as given and in their normalized form (see measures_rollup.normalize_measure), and lookups match on
+the normalized form, so a change to "Claims Data" also finds documents that said "claims data".
+"""
+
+import logging
+import sqlite3
+import threading
+
+from accelerator_source_cedar.accel_cedar.measures_rollup import normalize_measure
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS document_measure (
+    document_id TEXT NOT NULL,
+    measure TEXT NOT NULL,
+    normalized_measure TEXT NOT NULL,
+    PRIMARY KEY (document_id, measure)
+);
+CREATE INDEX IF NOT EXISTS document_measure_normalized ON document_measure (normalized_measure);
+CREATE TABLE IF NOT EXISTS document (
+    document_id TEXT PRIMARY KEY,
+    measures_version TEXT
+);
+"""
+
+
+class MeasuresDocumentIndex:
+    """
+    Inverted index of measure to the documents that use it, kept in SQLite. Safe to share between threads.
+    """
+
+    def __init__(self, db_path=":memory:"):
+        """
+        :param db_path: path of the SQLite database, created if it does not exist, by default an in-memory database
+        """
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._connection.executescript(_SCHEMA)
+
+    def record(self, document_id, measures, measures_version=None):
+        """
+        Record the measures used by a document, replacing what was recorded for it before
+        :param document_id: id of the document
+        :param measures: iterable of measures (including 'other' measures) that the document uses
+        :param measures_version: optional version of the measures vocabulary used to crosswalk the document
+        """
+        rows = {(document_id, measure, normalize_measure(measure)) for measure in measures
+                if isinstance(measure, str) and measure.strip()}
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM document_measure WHERE document_id = ?", (document_id,))
+            self._connection.executemany(
+                "INSERT INTO document_measure (document_id, measure, normalized_measure) VALUES (?, ?, ?)", rows)
+            self._connection.execute(
+                "INSERT OR REPLACE INTO document (document_id, measures_version) VALUES (?, ?)",
+                (document_id, measures_version))
+
+    def remove(self, document_id):
+        """
+        Remove a document from the index
+        :param document_id: id of the document
+        """
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM document_measure WHERE document_id = ?", (document_id,))
+            self._connection.execute("DELETE FROM document WHERE document_id = ?", (document_id,))
+
+    def measures_for_document(self, document_id):
+        """
+        :param document_id: id of the document
+        :return: set of measures recorded for the document
+        """
+        with self._lock:
+            cursor = self._connection.execute(
+                "SELECT measure FROM document_measure WHERE document_id = ?", (document_id,))
+            return {row[0] for row in cursor}
+
+    def documents_for_measures(self, measures):
+        """
+        :param measures: iterable of measures
+        :return: set of ids of documents using any of the measures, matched on their normalized form
+        """
+        normalized = list({normalize_measure(measure) for measure in measures if isinstance(measure, str)})
+        documents = set()
+        with self._lock:
+            # stay well under the SQLite host parameter limit
+            for start in range(0, len(normalized), 500):
+                chunk = normalized[start:start + 500]
+                cursor = self._connection.execute(
+                    "SELECT DISTINCT document_id FROM document_measure WHERE normalized_measure IN "
+                    f"({','.join('?' * len(chunk))})", chunk)
+                documents.update(row[0] for row in cursor)
+        return documents
+
+    def documents_to_recompute(self, old_index, new_index):
+        """
+        Given two versions of the measures vocabulary, the minimal set of documents to crosswalk again, those that use
+        a measure that was added, removed, or rolls up differently in the new version
+        :param old_index: MeasuresIndex that documents were crosswalked with
+        :param new_index: MeasuresIndex of the changed vocabulary
+        :return: set of document ids
+        """
+        changed = new_index.diff(old_index)
+        logger.info(f"{len(changed)} measures changed between versions {old_index.version} and {new_index.version}")
+        return self.documents_for_measures(changed)
+
+    def document_count(self):
+        """
+        :return: number of documents in the index
+        """
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM document").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -1,4 +1,14 @@
+import functools
+import hashlib
+import importlib.resources as pkg_resources
+import io
 import logging
+import os
+import re
+import threading
+import time
+from types import MappingProxyType
+
 import pandas as pd
 
 from accelerator_source_cedar.accel_cedar.cedar_intermediate_model import MeasuresArrays
@@ -10,6 +20,66 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+OTHER_ROLLUP = ("Other", "Other", "Other")
+SYNONYMS_SHEET = "Synonyms"
+ROLLUP_COLUMNS = ["parent", "subcategory_major", "subcategory_minor"]
+ENV_MEASURES_FILE = "CEDAR_MEASURES_FILE"
+
+_punctuation_pattern = re.compile(r"[^\w\s]+")
+_whitespace_pattern = re.compile(r"\s+")
+
+
+def default_measures_file():
+    """
+    The measures spreadsheet to use when none is given, the path in the CEDAR_MEASURES_FILE environment variable if
+    set, otherwise the MeasuresTermsv4.xlsx bundled with this package
+    """
+    measures_file = os.environ.get(ENV_MEASURES_FILE)
+    if measures_file:
+        return measures_file
+    resources_path = pkg_resources.files("accelerator_source_cedar.accel_cedar") / 'resources'
+    return resources_path.joinpath("MeasuresTermsv4.xlsx")
+
+
+@functools.lru_cache(maxsize=8192)
+def normalize_measure(measure):
+    """
+    Normalize a measure for matching, ignoring case, punctuation (including bullets) and whitespace differences,
+    e.g. '• Reproductive / birth ' and 'Reproductive/Birth' both normalize to 'reproductive birth'
+    :param measure: str with the measure
+    :return: normalized str
+    """
+    if not isinstance(measure, str):
+        return measure
+    measure = _punctuation_pattern.sub(" ", measure)
+    return _whitespace_pattern.sub(" ", measure).strip().casefold()
+
+
+class MeasuresLookupStats:
+    """
+    Hit and miss counts for measure lookups over a batch
+    """
+
+    def __init__(self):
+        self.exact_hits = 0
+        self.normalized_hits = 0
+        self.misses = 0
+
+    @property
+    def hits(self):
+        return self.exact_hits + self.normalized_hits
+
+    @property
+    def hit_ratio(self):
+        total = self.hits + self.misses
+        if total == 0:
+            return 1.0
+        return self.hits / total
+
+    def __str__(self):
+        return (f"hit ratio {self.hit_ratio:.3f} ({self.exact_hits} exact, {self.normalized_hits} normalized, "
+                f"{self.misses} missed)")
+
 
 class PcorMeasuresRollupStructure:
 
@@ -20,32 +90,221 @@ class PcorMeasuresRollupStructure:
         self.measure = measure
 
 
+class MeasuresIndex:
+    """
+    Immutable snapshot of the measures rollup as loaded from one version of the measures spreadsheet. A reload builds
+    a new index and swaps it in whole, so readers holding an index always see a consistent set of tables.
+    """
+
+    def __init__(self, measures, normalized_table, version, mtime):
+        """
+
+        Parameters
+        ----------
+        measures - dict of measure to PcorMeasuresRollupStructure
+        normalized_table - dict of normalized measure (or synonym) to measure
+        version - sha256 of the measures spreadsheet contents
+        mtime - modification time of the measures spreadsheet when it was read
+        """
+        rollup_table = MeasuresRollup.build_rollup_table(measures)
+        self.measures = MappingProxyType(measures)
+        self.rollup_table = MappingProxyType(rollup_table)
+        self.normalized_table = MappingProxyType(normalized_table)
+        self.rollup_frame = MeasuresRollup.build_rollup_frame(rollup_table)
+        self.version = version
+        self.mtime = mtime
+
+    def diff(self, other):
+        """
+        Compare this index with another version of the vocabulary
+
+        Parameters
+        ----------
+        other - MeasuresIndex to compare with
+
+        Returns set of measures that were added, removed, or whose rollup changed between the two indexes, along with
+        any normalized measures or synonyms that now resolve differently
+        -------
+        """
+        changed = set(self.rollup_table.keys() ^ other.rollup_table.keys())
+        for measure, rollup in self.rollup_table.items():
+            if measure in other.rollup_table and other.rollup_table[measure] != rollup:
+                changed.add(measure)
+        for normalized in self.normalized_table.keys() | other.normalized_table.keys():
+            measure = self.normalized_table.get(normalized)
+            if measure != other.normalized_table.get(normalized) or measure in changed:
+                changed.add(normalized)
+        return changed
+
+
 class MeasuresRollup:
 
-    def __init__(self, measures_file):
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, measures_file=None, check_interval=None):
+        """
+
+        Parameters
+        ----------
+        measures_file - path of the measures spreadsheet, by default see default_measures_file()
+        check_interval - seconds between checks for a changed measures spreadsheet when looking up measures, None
+        (the default) to only reload when reload_if_changed() is called
+        """
+        self.measures_file = measures_file if measures_file is not None else default_measures_file()
+        self.check_interval = check_interval
+        self._reload_lock = threading.Lock()
+        self._last_check = time.monotonic()
+        self.index = self.load_index()
+        self._checked_mtime = self.index.mtime
+
+    @classmethod
+    def shared(cls, measures_file=None, check_interval=None):
+        """
+        A MeasuresRollup shared within the process for a measures spreadsheet, so that the spreadsheet is read once
+        rather than by every reader
+
+        Parameters
+        ----------
+        measures_file - path of the measures spreadsheet, by default see default_measures_file()
+        check_interval - see __init__, used when the shared instance is first created
+
+        Returns MeasuresRollup
+        -------
+        """
+        if measures_file is None:
+            measures_file = default_measures_file()
+        key = str(measures_file)
+        with cls._shared_lock:
+            measures_rollup = cls._shared.get(key)
+            if measures_rollup is None:
+                measures_rollup = cls(measures_file, check_interval)
+                cls._shared[key] = measures_rollup
+            return measures_rollup
+
+    @property
+    def index_version(self):
+        """
+        Version of the vocabulary currently in use (a hash of the spreadsheet contents), which changes only when the
+        contents of the measures spreadsheet change
+        """
+        return self.index.version
+
+    @property
+    def measures(self):
+        return self.index.measures
+
+    @property
+    def rollup_table(self):
+        return self.index.rollup_table
+
+    @property
+    def normalized_table(self):
+        return self.index.normalized_table
+
+    @property
+    def rollup_frame(self):
+        return self.index.rollup_frame
+
+    def read_measures_file(self):
+        """
+        Read the contents of the measures spreadsheet
+
+        Returns tuple of (content bytes, sha256 of the content, modification time)
+        -------
+        """
+        mtime = os.stat(self.measures_file).st_mtime
+        with open(self.measures_file, "rb") as f:
+            content = f.read()
+        return content, hashlib.sha256(content).hexdigest(), mtime
+
+    def load_index(self, measures_content=None):
+        """
+        Read the measures spreadsheet and build a new index from it. The contents are read once, and the same bytes
+        are hashed and parsed, so the version always matches the tables
+
+        Parameters
+        ----------
+        measures_content - tuple from read_measures_file() if already read
+
+        Returns MeasuresIndex
+        -------
+        """
+        content, version, mtime = measures_content or self.read_measures_file()
+
+        measures = self.build_measures_structure(io.BytesIO(content))
+        rollup_table = MeasuresRollup.build_rollup_table(measures)
+        normalized_table = self.build_normalized_table(rollup_table, io.BytesIO(content))
+        logger.info(f"loaded measures index version {version} from {self.measures_file}")
+        return MeasuresIndex(measures, normalized_table, version, mtime)
+
+    def reload_if_changed(self, blocking=True):
         """
+        Check the measures spreadsheet for changes, by modification time and then by content hash, and if it has
+        changed, load it and swap in the new index. Readers are never blocked, they keep using the index they already
+        hold until the swap. If the new spreadsheet can't be read (e.g. it is part way through being written), the
+        current index is kept.
 
         Parameters
         ----------
-        pcor_ingest_configuration PcorIngestConfiguration that contains configuration from properties file
+        blocking - wait for a reload already running on another thread, if False return straight away instead
+
+        Returns True if a new version of the vocabulary was loaded
+        -------
+        """
+        if not self._reload_lock.acquire(blocking=blocking):
+            return False
+        try:
+            self._last_check = time.monotonic()
+            current = self.index
+            try:
+                if os.stat(self.measures_file).st_mtime == self._checked_mtime:
+                    return False
+                measures_content = self.read_measures_file()
+                if measures_content[1] == current.version:
+                    # touched but not changed, the vocabulary (and its version) stays the same
+                    self._checked_mtime = measures_content[2]
+                    return False
+                new_index = self.load_index(measures_content)
+            except Exception as err:
+                logger.error(f"unable to reload measures from {self.measures_file}, keeping version "
+                             f"{current.version}: {err}")
+                return False
+
+            self._checked_mtime = new_index.mtime
+            logger.info(f"measures changed from version {current.version} to {new_index.version}")
+            self.index = new_index
+            return True
+        finally:
+            self._reload_lock.release()
+
+    def maybe_reload(self):
         """
-        self.measures_file = measures_file
-        self.measures = self.build_measures_structure()
+        Reload if check_interval is set and has passed since the last check. A caller that finds another thread
+        already reloading carries on with the current index rather than waiting for the reload
+        """
+        if self.check_interval is not None and time.monotonic() - self._last_check >= self.check_interval:
+            self.reload_if_changed(blocking=False)
 
-    def measures_rollup_as_dataframe(self):
+    def measures_rollup_as_dataframe(self, source=None):
         """
         Get the data frame (pandas) from the measures spreadsheet
 
+        Parameters
+        ----------
+        source - path or file-like object with the spreadsheet, by default the measures file
+
         Returns
         -------
         pandas.DataFrame representing the contents of the measures rollup
 
         """
         logger.info("measures_rollup_as_dataframe")
-        df = pd.read_excel(self.measures_file, sheet_name='Measures', engine='openpyxl')
+        df = pd.read_excel(self.measures_file if source is None else source, sheet_name='Measures',
+                           engine='openpyxl')
         return df
 
-    def build_measures_structure(self):
+    def build_measures_structure(self, source=None):
 
         """
         create a structure by measure that contains the rollup information
@@ -56,7 +315,7 @@ class MeasuresRollup:
         """
 
         logger.info("init_measures_structure()")
-        df = self.measures_rollup_as_dataframe()
+        df = self.measures_rollup_as_dataframe(source)
         measures_dict = {}
 
         ss_rows = df.shape[0]
@@ -72,6 +331,107 @@ class MeasuresRollup:
 
         return measures_dict
 
+    @staticmethod
+    def build_rollup_table(measures):
+        """
+        Precompute the rollup of each measure as a tuple, for fast lookup when processing batches of measures
+
+        Parameters
+        ----------
+        measures - dict of measure to PcorMeasuresRollupStructure
+
+        Returns Dictionary with key of measure and value of (parent, subcategory_major, subcategory_minor)
+        -------
+        """
+        return {measure: (rollup.parent, rollup.subcategory_major, rollup.subcategory_minor)
+                for measure, rollup in measures.items()}
+
+    def synonyms_as_dataframe(self, source=None):
+        """
+        Get the data frame (pandas) from the optional synonyms sheet of the measures spreadsheet, which has a synonym
+        in the first column and the measure it stands for in the second
+
+        Parameters
+        ----------
+        source - path or file-like object with the spreadsheet, by default the measures file
+
+        Returns
+        -------
+        pandas.DataFrame with the synonyms, or None if the spreadsheet has no synonyms sheet
+
+        """
+        with pd.ExcelFile(self.measures_file if source is None else source, engine='openpyxl') as measures_workbook:
+            if SYNONYMS_SHEET not in measures_workbook.sheet_names:
+                return None
+            logger.info("synonyms_as_dataframe")
+            return measures_workbook.parse(sheet_name=SYNONYMS_SHEET)
+
+    def build_normalized_table(self, rollup_table, source=None):
+        """
+        Precompute an index of normalized measure (and synonym) to the measure as it appears in the rollup, so that
+        measures that differ in case, whitespace or punctuation still match in a single dict lookup
+
+        Parameters
+        ----------
+        rollup_table - dict of measure to rollup tuple, see build_rollup_table
+        source - path or file-like object with the spreadsheet, by default the measures file
+
+        Returns Dictionary with key of normalized measure or synonym and value of measure
+        -------
+        """
+        normalized_table = {}
+        for measure in rollup_table:
+            normalized_table.setdefault(normalize_measure(measure), measure)
+
+        synonyms_df = self.synonyms_as_dataframe(source)
+        if synonyms_df is not None:
+            for i in range(synonyms_df.shape[0]):
+                synonym = synonyms_df.iat[i, 0]
+                measure = synonyms_df.iat[i, 1]
+                if not isinstance(synonym, str) or measure not in rollup_table:
+                    logger.warning(f"ignoring synonym {synonym} for unknown measure {measure}")
+                    continue
+                normalized_table.setdefault(normalize_measure(synonym), measure)
+
+        return normalized_table
+
+    @staticmethod
+    def build_rollup_frame(rollup_table):
+        """
+        Precompute the rollup table as a data frame, for joining against a batch of measures
+
+        Parameters
+        ----------
+        rollup_table - dict of measure to rollup tuple, see build_rollup_table
+
+        Returns
+        -------
+        pandas.DataFrame with a row per measure and columns of resolved_measure, parent, subcategory_major and
+        subcategory_minor
+
+        """
+        return pd.DataFrame([(measure,) + rollup for measure, rollup in rollup_table.items()],
+                            columns=["resolved_measure"] + ROLLUP_COLUMNS)
+
+    def resolve_measure(self, measure):
+        """
+        Find the measure as it appears in the rollup for a given measure, matching exactly, or when normalized,
+        or as a synonym
+        Parameters
+        ----------
+        measure - str with the measure
+
+        Returns str with the measure in the rollup, or None if there is no match
+        -------
+        """
+        return MeasuresRollup._resolve(self.index, measure)
+
+    @staticmethod
+    def _resolve(index, measure):
+        if measure in index.rollup_table:
+            return measure
+        return index.normalized_table.get(normalize_measure(measure))
+
     @staticmethod
     def filter_blank_measure(measure):
         if isinstance(measure, str):
@@ -90,7 +450,9 @@ class MeasuresRollup:
         -------
         """
 
-        rollup = self.measures.get(measure)
+        self.maybe_reload()
+        index = self.index
+        rollup = index.measures.get(MeasuresRollup._resolve(index, measure))
 
         if rollup:
             return rollup
@@ -110,21 +472,136 @@ class MeasuresRollup:
         -------
         """
 
-        measures_arrays = MeasuresArrays()
+        self.maybe_reload()
+        index = self.index
+        return MeasuresRollup.rollup_measures(measures, index.rollup_table, index.normalized_table)
 
-        for measure in measures:
+    def process_measures_batch(self, measures_lists, stats=None):
+        """
+        for a batch of documents, each with an array of measures, return the rollup of each document's measures,
+        making one pass over the batch using the precomputed rollup table
+
+        Parameters
+        ----------
+        measures_lists - iterable of str[], the measures of each document
+        stats - MeasuresLookupStats that receives the hit/miss counts for the batch, optional
+
+        Returns list of MeasuresArrays, one per document and in the same order
+        -------
+        """
+
+        if stats is None:
+            stats = MeasuresLookupStats()
+        self.maybe_reload()
+        index = self.index
+        rollup_table = index.rollup_table
+        normalized_table = index.normalized_table
+        results = [MeasuresRollup.rollup_measures(measures, rollup_table, normalized_table, stats)
+                   for measures in measures_lists]
+        logger.info(f"measures batch of {len(results)} documents, {stats}")
+        return results
+
+    @staticmethod
+    def rollup_measures(measures, rollup_table, normalized_table=None, stats=None):
+        """
+        roll up an array of measures with duplicates filtered, keeping the order in which measures (and their
+        rollups) are first seen. dicts are used as ordered sets so each membership test is O(1). A measure that
+        matches only when normalized is reported as it appears in the rollup
 
-            if measure not in measures_arrays.measures:
-                measures_arrays.measures.append(measure)
-                measure_rollup = self.lookup_measure(measure)
+        Parameters
+        ----------
+        measures - str[] with the measures
+        rollup_table - dict of measure to (parent, subcategory_major, subcategory_minor)
+        normalized_table - dict of normalized measure to measure, optional
+        stats - MeasuresLookupStats that receives the hit/miss counts, optional
 
-                if measure_rollup.parent not in measures_arrays.measures_parents:
-                    measures_arrays.measures_parents.append(measure_rollup.parent)
+        Returns MeasuresArrays with the complete rollup of each measure
+        -------
+        """
 
-                if measure_rollup.subcategory_major not in measures_arrays.measures_subcategories_major:
-                    measures_arrays.measures_subcategories_major.append(measure_rollup.subcategory_major)
+        seen_measures = {}
+        parents = {}
+        subcategories_major = {}
+        subcategories_minor = {}
 
-                if measure_rollup.subcategory_minor not in measures_arrays.measures_subcategories_minor:
-                    measures_arrays.measures_subcategories_minor.append(measure_rollup.subcategory_minor)
+        for measure in measures:
+            if measure in seen_measures:
+                continue
+            rollup = rollup_table.get(measure)
+            if rollup is not None:
+                if stats is not None:
+                    stats.exact_hits += 1
+            else:
+                resolved = normalized_table.get(normalize_measure(measure)) if normalized_table else None
+                if resolved is not None:
+                    rollup = rollup_table[resolved]
+                    measure = resolved
+                    if stats is not None:
+                        stats.normalized_hits += 1
+                else:
+                    rollup = OTHER_ROLLUP
+                    if stats is not None:
+                        stats.misses += 1
+
+            seen_measures[measure] = None
+            parent, subcategory_major, subcategory_minor = rollup
+            parents[parent] = None
+            subcategories_major[subcategory_major] = None
+            subcategories_minor[subcategory_minor] = None
 
+        measures_arrays = MeasuresArrays()
+        measures_arrays.measures = list(seen_measures)
+        measures_arrays.measures_parents = list(parents)
+        measures_arrays.measures_subcategories_major = list(subcategories_major)
+        measures_arrays.measures_subcategories_minor = list(subcategories_minor)
         return measures_arrays
+
+    def rollup_measures_frame(self, measures_df, document_column="document_id", measure_column="measure",
+                              as_dataframe=False):
+        """
+        Vectorized rollup of the measures of a whole batch of documents. The batch is given in long format, a row per
+        (document, measure), and is joined against the rollup table in a single merge rather than looking up each
+        measure in turn. Only the distinct measures in the batch are normalized.
+
+        Parameters
+        ----------
+        measures_df - pandas.DataFrame with a document column and a measure column
+        document_column - name of the document id column
+        measure_column - name of the measure column
+        as_dataframe - return the joined data frame rather than MeasuresArrays
+
+        Returns dict of document id to MeasuresArrays (duplicates filtered, in order of first appearance, as
+        process_measures), or when as_dataframe is True a pandas.DataFrame with columns of document id, measure,
+        parent, subcategory_major and subcategory_minor, with measures reported as they appear in the rollup
+        -------
+        """
+
+        self.maybe_reload()
+        index = self.index
+        measures = measures_df[measure_column]
+        resolved = {measure: MeasuresRollup._resolve(index, measure) for measure in measures.unique()}
+
+        joined = pd.DataFrame({document_column: measures_df[document_column].to_numpy(),
+                               "resolved_measure": measures.map(resolved).to_numpy(),
+                               "measure": measures.to_numpy()})
+        joined = joined.merge(index.rollup_frame, how="left", on="resolved_measure", sort=False)
+        joined["measure"] = joined["resolved_measure"].fillna(joined["measure"])
+        joined = joined.drop(columns="resolved_measure")
+        joined[ROLLUP_COLUMNS] = joined[ROLLUP_COLUMNS].fillna("Other")
+
+        if as_dataframe:
+            return joined
+
+        grouped = joined.groupby(document_column, sort=False)
+        unique_values = {column: grouped[column].unique() for column in ["measure"] + ROLLUP_COLUMNS}
+
+        results = {}
+        for document_id in unique_values["measure"].index:
+            measures_arrays = MeasuresArrays()
+            measures_arrays.measures = unique_values["measure"][document_id].tolist()
+            measures_arrays.measures_parents = unique_values["parent"][document_id].tolist()
+            measures_arrays.measures_subcategories_major = unique_values["subcategory_major"][document_id].tolist()
+            measures_arrays.measures_subcategories_minor = unique_values["subcategory_minor"][document_id].tolist()
+            results[document_id] = measures_arrays
+
+        return results
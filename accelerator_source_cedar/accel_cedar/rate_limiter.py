@@ -0,0 +1,54 @@
+"""
+Rate limiting of requests to the CEDAR API, shared by the threads of a bulk operation.
+"""
+
+import threading
+import time
+
+
+class RateLimiter:
+    """
+    Token bucket limiting the rate of calls across threads. Up to burst calls may go through at once, after which
+    callers are spaced out to the given rate, in the order they asked.
+    """
+
+    def __init__(self, rate_per_second: float, burst: int = 1, clock=time.monotonic, sleep=time.sleep):
+        """
+        :param rate_per_second: sustained number of calls allowed per second
+        :param burst: number of calls allowed without waiting after an idle period
+        :param clock: monotonic clock, for testing
+        :param sleep: sleep function, for testing
+        """
+        if rate_per_second <= 0:
+            raise Exception(f"rate_per_second={rate_per_second} must be positive")
+        self.rate_per_second = rate_per_second
+        self.burst = max(1, burst)
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = float(self.burst)
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """
+        Wait until a call is allowed
+        :return: seconds waited
+        """
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate_per_second)
+            self._updated = now
+            # take the token even when there is none yet, so later callers queue up behind this one
+            self._tokens -= 1
+            wait = -self._tokens / self.rate_per_second if self._tokens < 0 else 0.0
+
+        if wait > 0:
+            self._sleep(wait)
+        return wait
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
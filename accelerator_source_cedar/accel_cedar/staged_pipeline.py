@@ -0,0 +1,272 @@
+"""
+In-process pipeline of stages connected by bounded queues.
+
+Each stage runs its function on a pool of worker threads, or for CPU bound work threads feeding a pool of worker
+processes, taking items from the queue of the stage before it and putting results on the queue of the stage after
+it. The queues are bounded, so a slow stage holds back the stages feeding it rather than letting items pile up in
+memory, while stages waiting on the network overlap with stages that are parsing. Per stage counts and timings show
+where the pipeline spends its time.
+
+A stage function that raises is counted as a failure of that stage, and the item is dropped and handed to the
+on_error callback of the pipeline. A stage function that returns None drops the item without a failure.
+"""
+
+import logging
+import queue
+import threading
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+_END = object()  # end of the items, passed down the queues once every worker of a stage has finished
+_POLL_SECONDS = 0.1
+
+
+class Stage:
+    """
+    One step of a StagedPipeline
+    """
+
+    def __init__(self, name: str, func, workers: int = 1, processes: bool = False, initializer=None,
+                 initargs=(), queue_size: int = None):
+        """
+        :param name: name of the stage, used in the stats
+        :param func: function of one item returning the item for the next stage, it must be picklable when
+        processes is True
+        :param workers: number of concurrent calls of func
+        :param processes: run func in a pool of worker processes rather than in the threads of the stage
+        :param initializer: function called once in each worker process, when processes is True
+        :param initargs: arguments of initializer
+        :param queue_size: size of the queue feeding this stage, defaults to twice the number of workers
+        """
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+        self.processes = processes
+        self.initializer = initializer
+        self.initargs = initargs
+        self.queue_size = queue_size or self.workers * 2
+
+
+class StageStats:
+    """
+    Counts and timings for one stage of a pipeline run
+    """
+
+    def __init__(self, name: str, workers: int):
+        self.name = name
+        self.workers = workers
+        self.items_in = 0
+        self.items_out = 0
+        self.failed = 0
+        self.busy_seconds = 0.0  # time in the stage function, summed across the workers
+        self.idle_seconds = 0.0  # time waiting for an item from the stage before, summed across the workers
+        self.blocked_seconds = 0.0  # time waiting for room on the queue of the stage after, summed across the workers
+        self.elapsed_seconds = 0.0  # wall clock time from the start of the run until the last worker finished
+        self._lock = threading.Lock()
+
+    @property
+    def items_per_second(self) -> float:
+        if self.elapsed_seconds <= 0:
+            return 0.0
+        return self.items_in / self.elapsed_seconds
+
+    @property
+    def utilization(self) -> float:
+        """
+        :return: fraction of the worker time spent in the stage function
+        """
+        if self.elapsed_seconds <= 0:
+            return 0.0
+        return self.busy_seconds / (self.elapsed_seconds * self.workers)
+
+    def report(self) -> str:
+        return (f"{self.name}: {self.items_in} in, {self.items_out} out, {self.failed} failed, "
+                f"{self.items_per_second:.1f} items/s, {self.workers} workers {self.utilization:.0%} busy, "
+                f"idle {self.idle_seconds:.2f}s, blocked {self.blocked_seconds:.2f}s")
+
+
+class PipelineError:
+    """
+    An item that failed in a stage
+    """
+
+    def __init__(self, stage: str, item, message: str, traceback_text: str):
+        self.stage = stage
+        self.item = item
+        self.message = message
+        self.traceback = traceback_text
+
+
+class StagedPipeline:
+    """
+    Runs items through a sequence of stages, with a bounded queue in front of each stage
+    """
+
+    def __init__(self, stages, on_error=None):
+        """
+        :param stages: list of Stage, in order
+        :param on_error: optional function called with a PipelineError for each item that fails, from the worker
+        thread of the stage, failures are also collected in errors
+        """
+        if not stages:
+            raise Exception("a pipeline needs at least one stage")
+        self.stages = list(stages)
+        self.on_error = on_error
+        self.stats = [StageStats(stage.name, stage.workers) for stage in self.stages]
+        self.errors = []
+        self.elapsed_seconds = 0.0
+        self._errors_lock = threading.Lock()
+
+    def run(self, items):
+        """
+        Run items through the stages, yielding the output of the last stage as it completes. Output is not in the
+        order of the items when a stage has more than one worker. Closing the generator early stops the pipeline.
+        :param items: iterable of items for the first stage, it is read on its own thread as the first queue has room
+        :return: generator of the results of the last stage
+        """
+        stop = threading.Event()
+        source_errors = []
+        queues = [queue.Queue(maxsize=stage.queue_size) for stage in self.stages]
+        output = queue.Queue(maxsize=self.stages[-1].queue_size)
+        queues.append(output)
+        executors = [ProcessPoolExecutor(max_workers=stage.workers, initializer=stage.initializer,
+                                         initargs=stage.initargs) if stage.processes else None
+                     for stage in self.stages]
+        start = time.perf_counter()
+        threads = [threading.Thread(target=self._feed, args=(items, queues[0], self.stages[0].workers, stop,
+                                                             source_errors),
+                                    name="pipeline-source", daemon=True)]
+        for index, stage in enumerate(self.stages):
+            remaining = [stage.workers]
+            remaining_lock = threading.Lock()
+            for worker in range(stage.workers):
+                threads.append(threading.Thread(
+                    target=self._work,
+                    args=(index, queues[index], queues[index + 1], executors[index], remaining, remaining_lock,
+                          stop, start),
+                    name=f"pipeline-{stage.name}-{worker}", daemon=True))
+
+        for thread in threads:
+            thread.start()
+
+        try:
+            while True:
+                item = _get(output, stop)
+                if item is _END:
+                    break
+                yield item
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+            for executor in executors:
+                if executor is not None:
+                    executor.shutdown(cancel_futures=True)
+            self.elapsed_seconds = time.perf_counter() - start
+
+        if source_errors:
+            raise source_errors[0]
+
+    def _feed(self, items, first_queue, workers, stop, source_errors):
+        try:
+            for item in items:
+                if not _put(first_queue, item, stop):
+                    return
+        except Exception as err:
+            # the items themselves could not be read, stop the run and raise from run()
+            logger.error(f"exception reading pipeline items: {err}")
+            source_errors.append(err)
+            stop.set()
+            return
+        for _ in range(workers):
+            _put(first_queue, _END, stop)
+
+    def _work(self, index, in_queue, out_queue, executor, remaining, remaining_lock, stop, start):
+        stage = self.stages[index]
+        stats = self.stats[index]
+        busy = idle = blocked = 0.0
+        items_in = items_out = failed = 0
+
+        try:
+            while True:
+                wait_start = time.perf_counter()
+                item = _get(in_queue, stop)
+                idle += time.perf_counter() - wait_start
+                if item is _END:
+                    break
+
+                items_in += 1
+                call_start = time.perf_counter()
+                try:
+                    if executor is not None:
+                        result = executor.submit(stage.func, item).result()
+                    else:
+                        result = stage.func(item)
+                except Exception as err:
+                    busy += time.perf_counter() - call_start
+                    failed += 1
+                    self._failed(PipelineError(stage.name, item, str(err), traceback.format_exc()))
+                    continue
+                busy += time.perf_counter() - call_start
+
+                if result is None:
+                    continue
+                wait_start = time.perf_counter()
+                if not _put(out_queue, result, stop):
+                    break
+                blocked += time.perf_counter() - wait_start
+                items_out += 1
+        finally:
+            with stats._lock:
+                stats.items_in += items_in
+                stats.items_out += items_out
+                stats.failed += failed
+                stats.busy_seconds += busy
+                stats.idle_seconds += idle
+                stats.blocked_seconds += blocked
+            with remaining_lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last:
+                stats.elapsed_seconds = time.perf_counter() - start
+                # the next stage finishes once each of its workers sees the end
+                next_workers = self.stages[index + 1].workers if index + 1 < len(self.stages) else 1
+                for _ in range(next_workers):
+                    _put(out_queue, _END, stop)
+
+    def _failed(self, error: PipelineError):
+        logger.error(f"pipeline stage {error.stage} failed: {error.message}")
+        with self._errors_lock:
+            self.errors.append(error)
+        if self.on_error is not None:
+            self.on_error(error)
+
+    def report(self) -> str:
+        lines = [f"pipeline ran in {self.elapsed_seconds:.2f}s, {len(self.errors)} failed"]
+        for stats in self.stats:
+            lines.append(f"  {stats.report()}")
+        return "\n".join(lines)
+
+
+def _put(target: queue.Queue, item, stop: threading.Event) -> bool:
+    # put that gives up when the pipeline is stopped, so a worker never blocks forever on a queue nobody reads
+    while not stop.is_set():
+        try:
+            target.put(item, timeout=_POLL_SECONDS)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _get(source: queue.Queue, stop: threading.Event):
+    # get that returns the end of the items when the pipeline is stopped
+    while not stop.is_set():
+        try:
+            return source.get(timeout=_POLL_SECONDS)
+        except queue.Empty:
+            continue
+    return _END
@@ -0,0 +1,182 @@
+"""
+Bulk parse of PCOR spreadsheet templates, such as a folder of xlsx submissions.
+
+Templates are discovered under a directory (or by a glob pattern) and parsed by PcorTemplateParser in a pool of
+worker processes, giving a ProcessResult per file with the parsed model data, or the errors and traceback if the
+template could not be parsed. Results can be streamed as they complete, or collected with aggregate timing.
+
+usage: python -m accelerator_source_cedar.accel_cedar.template_bulk_parse <directory or glob> [--workers n]
+"""
+
+import argparse
+import logging
+import os
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from accelerator_source_cedar.accel_cedar.file_discovery import discover_files
+from accelerator_source_cedar.accel_cedar.process_result import ProcessResult
+from accelerator_source_cedar.accel_cedar.template_parse_cache import TemplateParseCache
+from accelerator_source_cedar.accel_cedar.template_parser import PcorTemplateParser
+
+logger = logging.getLogger(__name__)
+
+# per worker process state, set up by init_worker
+_worker_parser = None
+
+
+class TemplateParseSummary:
+    """
+    Outcome of a bulk parse, with the result for each template and timing information
+    """
+
+    def __init__(self):
+        self.total = 0
+        self.succeeded = 0
+        self.results = []  # ProcessResult for each template, in the order they completed
+        self.failures = []  # ProcessResult for each template that failed
+        self.elapsed_seconds = 0.0  # wall clock time of the bulk parse
+        self.parse_seconds = 0.0  # time spent parsing, summed across the workers
+
+    @property
+    def templates_per_second(self) -> float:
+        if self.elapsed_seconds <= 0:
+            return 0.0
+        return self.total / self.elapsed_seconds
+
+    def add(self, result: ProcessResult, parse_seconds: float):
+        self.total += 1
+        self.parse_seconds += parse_seconds
+        if result.success:
+            self.succeeded += 1
+        else:
+            self.failures.append(result)
+
+    def report(self) -> str:
+        lines = [f"parsed {self.total} templates in {self.elapsed_seconds:.2f}s "
+                 f"({self.templates_per_second:.1f} templates/s, {self.parse_seconds:.2f}s of parsing), "
+                 f"{self.succeeded} succeeded, {len(self.failures)} failed"]
+        for failure in self.failures:
+            lines.append(f"  failed: {failure.template_source}: {failure.message}")
+        return "\n".join(lines)
+
+
+def init_worker(streaming: bool = True, log_level: int = logging.WARNING, cache_dir: str = None):
+    """
+    Set up the template parser once per worker process
+    """
+    global _worker_parser
+
+    logging.getLogger().setLevel(log_level)
+    parse_cache = TemplateParseCache(cache_dir) if cache_dir else None
+    _worker_parser = PcorTemplateParser(None, streaming=streaming, parse_cache=parse_cache)
+
+
+def parse_template(path: str):
+    """
+    Parse one template in a worker process
+    :param path: path to the template
+    :return: tuple of the ProcessResult and the seconds spent parsing
+    """
+    start = time.perf_counter()
+    result = ProcessResult()
+    result.template_source = path
+    result.id = os.path.splitext(os.path.basename(path))[0]
+    try:
+        _worker_parser.parse(path, result)
+    except Exception as err:
+        # failures outside of the sections, such as a file that is not a spreadsheet
+        logger.error(f"exception parsing {path}: {err}")
+        result.success = False
+        result.errors.append(f"error parsing {path}: {err}")
+        result.message = str(err)
+        result.traceback = traceback.format_exc()
+    return result, time.perf_counter() - start
+
+
+def iter_parse_templates(location, max_workers: int = None, pattern: str = "*.xlsx", streaming: bool = True,
+                         log_level: int = logging.WARNING, summary: TemplateParseSummary = None,
+                         cache_dir: str = None):
+    """
+    Parse templates across a pool of worker processes, yielding each result as it completes. Only a bounded number
+    of templates are in flight at any time.
+    :param location: directory or glob pattern of templates, or a list of template paths
+    :param max_workers: number of worker processes, defaults to the number of cores
+    :param pattern: file name pattern used when location is a directory
+    :param streaming: see PcorTemplateParser
+    :param log_level: logging level in the worker processes
+    :param summary: optional TemplateParseSummary that is updated as results complete
+    :param cache_dir: optional directory of a TemplateParseCache shared by the workers
+    :return: generator of ProcessResult
+    """
+    paths = discover_files(location, pattern) if isinstance(location, str) else iter(location)
+    max_workers = max_workers or os.cpu_count() or 1
+    max_in_flight = max_workers * 4
+    start = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=init_worker,
+                             initargs=(streaming, log_level, cache_dir)) as executor:
+        in_flight = set()
+        for path in paths:
+            if len(in_flight) >= max_in_flight:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                yield from _completed(done, summary, start)
+            in_flight.add(executor.submit(parse_template, path))
+
+        while in_flight:
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            yield from _completed(done, summary, start)
+
+
+def _completed(done, summary: TemplateParseSummary, start: float):
+    for future in done:
+        result, parse_seconds = future.result()
+        if not result.success:
+            logger.error(f"failed to parse {result.template_source}: {result.message}")
+        if summary is not None:
+            summary.add(result, parse_seconds)
+            summary.elapsed_seconds = time.perf_counter() - start
+        yield result
+
+
+def parse_templates(location, max_workers: int = None, pattern: str = "*.xlsx", streaming: bool = True,
+                    log_level: int = logging.WARNING, cache_dir: str = None) -> TemplateParseSummary:
+    """
+    Parse templates across a pool of worker processes, collecting all of the results
+    :param location: directory or glob pattern of templates, or a list of template paths
+    :param max_workers: number of worker processes, defaults to the number of cores
+    :param pattern: file name pattern used when location is a directory
+    :param streaming: see PcorTemplateParser
+    :param log_level: logging level in the worker processes
+    :param cache_dir: optional directory of a TemplateParseCache shared by the workers
+    :return: TemplateParseSummary with a ProcessResult per template
+    """
+    summary = TemplateParseSummary()
+    for result in iter_parse_templates(location, max_workers, pattern, streaming, log_level, summary, cache_dir):
+        summary.results.append(result)
+    logger.info(summary.report())
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk parse of PCOR spreadsheet templates")
+    parser.add_argument("location", help="directory (walked recursively) or glob pattern of templates")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes (default: cores)")
+    parser.add_argument("--pattern", default="*.xlsx", help="file name pattern when walking a directory")
+    parser.add_argument("--cache-dir", default=None,
+                        help="parse cache directory, templates identical to ones already parsed are not re-parsed")
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args(argv)
+
+    log_level = logging.getLevelName(args.log_level.upper())
+    logging.getLogger().setLevel(log_level)
+
+    summary = parse_templates(args.location, max_workers=args.workers, pattern=args.pattern, log_level=log_level,
+                              cache_dir=args.cache_dir)
+    print(summary.report())
+    return 0 if not summary.failures else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,79 @@
+"""
+On-disk cache of parsed spreadsheet templates.
+
+Entries hold the pickled ProcessResult.model_data of a successful parse, keyed by the sha256 of the template contents
+and the parser version, so re-submissions of an identical spreadsheet are served without opening the workbook, and a
+change to the parser (a new PARSER_VERSION) never serves stale results.
+"""
+
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+
+class TemplateParseCache:
+    """
+    Cache of template model data in a directory, one pickle file per entry. Safe to share between processes, entries
+    are written to a temp file and renamed into place.
+    """
+
+    def __init__(self, cache_dir):
+        """
+        :param cache_dir: directory that holds the cache entries, created if needed
+        """
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def cache_key(content: bytes, parser_version: str) -> str:
+        """
+        :param content: bytes of the template
+        :param parser_version: version of the parser that produces the model data
+        :return: str key of the content hash and parser version
+        """
+        return f"{hashlib.sha256(content).hexdigest()}-{parser_version}"
+
+    def entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key + ".pickle")
+
+    def get(self, key: str):
+        """
+        :param key: cache key, see cache_key()
+        :return: cached model data dict, or None if not cached (or the entry can't be read)
+        """
+        try:
+            with open(self.entry_path(key), "rb") as f:
+                model_data = pickle.load(f)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except Exception as err:
+            logger.warning(f"ignoring unreadable template cache entry {key}: {err}")
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return model_data
+
+    def put(self, key: str, model_data: dict):
+        """
+        Store model data in the cache
+        :param key: cache key, see cache_key()
+        :param model_data: ProcessResult.model_data of a successful parse
+        """
+        path = self.entry_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(model_data, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, path)
+        except Exception:
+            os.unlink(temp_path)
+            raise
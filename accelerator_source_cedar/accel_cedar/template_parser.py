@@ -1,3 +1,6 @@
+import calendar
+import functools
+import io
 import logging
 import re
 import traceback
@@ -6,7 +9,7 @@ import warnings
 from datetime import datetime
 
 import math
-import pandas as pd
+import openpyxl
 import validators
 
 from accelerator_source_cedar.accel_cedar.cedar_intermediate_model import PcorIntermediateProgramModel, \
@@ -19,14 +22,127 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# a bullet and the whitespace after it, removed from field values
+_bullet_pattern = re.compile(r'[•●]\s+')
+# whitespace that is replaced by a space in field values, tabs and newlines are not valid in json strings
+_escape_new_line_table = str.maketrans({'\n': ' ', '\t': ' ', '\xa0': ' '})
+_keep_new_line_table = str.maketrans({'\t': ' ', '\xa0': ' '})
+# date formats accepted by format_date_time, in the order they are tried, each with a pattern that recognizes it
+DATE_FORMATS = ("%Y", "%m/%Y", "%d/%m/%Y")
+_year_pattern = re.compile(r'([1-9][0-9]{3})')
+_month_year_pattern = re.compile(r'(1[0-2]|0[1-9]|[1-9])/([1-9][0-9]{3})')
+_day_month_year_pattern = re.compile(r'(3[01]|[12][0-9]|0[1-9]|[1-9])/(1[0-2]|0[1-9]|[1-9])/([1-9][0-9]{3})')
+
+# values up to this length (controlled vocabulary terms, names, ids) are memoized by sanitize_column
+SANITIZE_MEMO_MAX_LENGTH = 128
+
+# version of the parsed model data, change it when the parser changes what it produces so cached parses are not reused
+PARSER_VERSION = "3"
+
+# marker that starts each section of a template and the markers that end it
+SECTION_TERMINATORS = {
+    "Submitter": ("Program",),
+    "Program": ("Project",),
+    "Project": ("Resource",),
+    "Resource": ("Data_Resource", "Tool_Resource"),
+}
+
+# sections whose field names are stripped of surrounding whitespace before matching
+STRIPPED_SECTIONS = ("Resource",)
+
+# cell text that pandas.read_excel reads as NaN, treated as empty when streaming a template
+NA_VALUES = frozenset(['', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+                       '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null'])
+
+
+class TemplateSectionIndex:
+    """
+    Index of the sections of a template, built in one pass down the first column. Each section runs from the first
+    occurrence of its marker to the first of its terminators after it, and within a section each field name maps to
+    the row it is on (the last one, if a field is repeated), so extracting a section is a set of direct lookups rather
+    than a scan of the sheet.
+    """
+
+    def __init__(self, rows):
+        """
+        :param rows: iterable of (field name, value) pairs, the first two columns of the template
+        """
+        self.values = []
+        self.section_ranges = {}
+        self.field_rows = {}
+
+        open_sections = []
+        for row, (field_name, value) in enumerate(rows):
+            self.values.append(value)
+            if not isinstance(field_name, str):
+                continue
+            stripped_name = field_name.strip()
+
+            for section in list(open_sections):
+                name = stripped_name if section in STRIPPED_SECTIONS else field_name
+                if name in SECTION_TERMINATORS[section]:
+                    self.section_ranges[section] = (self.section_ranges[section][0], row)
+                    open_sections.remove(section)
+                else:
+                    self.field_rows[section][name] = row
+
+            if field_name in SECTION_TERMINATORS and field_name not in self.section_ranges:
+                self.section_ranges[field_name] = (row, None)
+                self.field_rows[field_name] = {}
+                open_sections.append(field_name)
+
+    @classmethod
+    def from_dataframe(cls, template_df):
+        """
+        :param template_df: pandas df of the spreadsheet
+        :return: TemplateSectionIndex over the first two columns
+        """
+        return cls(zip(template_df.iloc[:, 0].tolist(), template_df.iloc[:, 1].tolist()))
+
+    @staticmethod
+    def of(template):
+        """
+        :param template: pandas df of the spreadsheet, or a TemplateSectionIndex already built for it
+        :return: TemplateSectionIndex
+        """
+        if isinstance(template, TemplateSectionIndex):
+            return template
+        return TemplateSectionIndex.from_dataframe(template)
+
+    def has_section(self, section):
+        """
+        :param section: section marker, e.g. 'Program'
+        :return: True if the section is present and ended by one of its terminators
+        """
+        section_range = self.section_ranges.get(section)
+        return section_range is not None and section_range[1] is not None
+
+    def section_fields(self, section):
+        """
+        :param section: section marker, e.g. 'Program'
+        :return: dict of field name to value for a complete section, or None if the section is missing or never ends
+        """
+        if not self.has_section(section):
+            return None
+        return {field_name: self.values[row] for field_name, row in self.field_rows[section].items()}
+
 
 class PcorTemplateParser:
     """
     A parent class for a parser of a PCOR spreadsheet template for a type
     """
 
-    def __init__(self, pcor_ingest_configuration):
+    def __init__(self, pcor_ingest_configuration, streaming=True, parse_cache=None):
+        """
+        :param pcor_ingest_configuration: ingest configuration
+        :param streaming: True (the default) to stream the first two columns of the template with openpyxl, False
+        to read the whole sheet into a pandas DataFrame
+        :param parse_cache: optional TemplateParseCache, templates with the same contents as one already parsed are
+        served from the cache without reading the workbook
+        """
         self.yyyy_pattern = r"\b(\d{4})\b"
+        self.streaming = streaming
+        self.parse_cache = parse_cache
 
     def parse(self, template_absolute_path, result):
 
@@ -39,10 +155,49 @@ class PcorTemplateParser:
         :param result: PcorTemplateParseResult with the outcome
         """
         warnings.simplefilter(action='ignore', category=UserWarning)
-        df = pd.read_excel(template_absolute_path, sheet_name=0, engine='openpyxl')
+
+        template_source = template_absolute_path
+        cache_key = None
+        if self.parse_cache is not None:
+            with open(template_absolute_path, "rb") as f:
+                content = f.read()
+            cache_key = self.parse_cache.cache_key(content, PARSER_VERSION)
+            model_data = self.parse_cache.get(cache_key)
+            if model_data is not None:
+                logger.info(f"template {template_absolute_path} served from the parse cache")
+                result.model_data.update(model_data)
+                PcorTemplateParser.assign_identifiers(result)
+                PcorTemplateParser.apply_model_data(result)
+                return
+            template_source = io.BytesIO(content)
+
+        # the cache holds the model data as the template has it, the identifiers generated for blank ids are new for
+        # every parse, cached or not
+        self.parse_template(template_source, result, assign_identifiers=cache_key is None)
+
+        if cache_key is not None:
+            if result.success:
+                self.parse_cache.put(cache_key, result.model_data)
+            PcorTemplateParser.assign_identifiers(result)
+
+    def parse_template(self, template_source, result, assign_identifiers=True):
+        """
+        Parse a spreadsheet template
+        :param template_source: path to the template file, or a file-like object with its contents
+        :param result: PcorTemplateParseResult with the outcome
+        :param assign_identifiers: generate the project and resource identifiers the template leaves blank, if False
+        they are left for assign_identifiers()
+        """
+        # index the sections once and share it across the extractors
+        if self.streaming:
+            template_index = TemplateSectionIndex(PcorTemplateParser.read_template_rows(template_source))
+        else:
+            import pandas as pd
+            df = pd.read_excel(template_source, sheet_name=0, engine='openpyxl')
+            template_index = TemplateSectionIndex.from_dataframe(df)
 
         try:
-            result.model_data["submission"] = self.extract_submission_data(df)
+            result.model_data["submission"] = self.extract_submission_data(template_index)
         except Exception as err:
             logger.error("exception parsing submission: %s" % str(err))
             result.success = False
@@ -53,7 +208,7 @@ class PcorTemplateParser:
 
         try:
 
-            program = self.extract_program_data(df)
+            program = self.extract_program_data(template_index)
             result.model_data["program"] = program
             result.program_name = program.name
 
@@ -66,7 +221,7 @@ class PcorTemplateParser:
             return
 
         try:
-            project = self.extract_project_data(df)
+            project = self.extract_project_data(template_index, assign_identifiers)
             result.model_data["project"] = project
             result.project_guid = project.submitter_id
             result.project_code = project.code
@@ -81,7 +236,7 @@ class PcorTemplateParser:
         result.project_name = result.model_data["project"].name
 
         try:
-            resource = self.extract_resource_data(df)
+            resource = self.extract_resource_data(template_index, assign_identifiers)
             result.model_data["resource"] = resource
             result.resource_guid = resource.submitter_id
             result.resource_name = resource.name
@@ -92,128 +247,186 @@ class PcorTemplateParser:
             result.message = str(err)
             result.traceback = traceback.format_exc()
 
+    @staticmethod
+    def assign_identifiers(result):
+        """
+        Generate the project and resource identifiers left blank in the model data of a result, and set them in the
+        result
+        :param result: PcorTemplateParseResult, parsed without assigning identifiers
+        """
+        project = result.model_data.get("project")
+        if project is not None:
+            PcorTemplateParser.process_project_identifiers(project)
+            result.project_guid = project.submitter_id
+            result.project_code = project.code
+
+        resource = result.model_data.get("resource")
+        if resource is not None:
+            PcorTemplateParser.process_resource_identifiers(resource)
+            result.resource_guid = resource.submitter_id
+
+    @staticmethod
+    def apply_model_data(result):
+        """
+        Set the names and ids in a result from its parsed model data, as parse does while extracting each section
+        :param result: PcorTemplateParseResult with complete model data
+        """
+        result.program_name = result.model_data["program"].name
+        result.project_guid = result.model_data["project"].submitter_id
+        result.project_code = result.model_data["project"].code
+        result.project_name = result.model_data["project"].name
+        result.resource_guid = result.model_data["resource"].submitter_id
+        result.resource_name = result.model_data["resource"].name
+
+    @staticmethod
+    def read_template_rows(template_absolute_path):
+        """
+        Stream the first two columns of the first sheet of a template with openpyxl in read only mode, without
+        loading the sheet into a DataFrame. Cells are read the way pandas.read_excel reads them, the first row is
+        taken as the header and skipped, empty cells and NA text become NaN, and whole number floats become ints
+        :param template_absolute_path: absolute path to the template file, or a file-like object with its contents
+        :return: list of (field name, value) tuples
+        """
+        workbook = openpyxl.load_workbook(template_absolute_path, read_only=True, data_only=True)
+        try:
+            worksheet = workbook.worksheets[0]
+            rows = []
+            for row in worksheet.iter_rows(min_row=2, max_col=2, values_only=True):
+                row = tuple(row) + (None,) * (2 - len(row))
+                rows.append((PcorTemplateParser.convert_cell(row[0]), PcorTemplateParser.convert_cell(row[1])))
+        finally:
+            workbook.close()
+
+        # pandas drops trailing empty rows
+        while rows and rows[-1][0] is math.nan and rows[-1][1] is math.nan:
+            rows.pop()
+        return rows
+
+    @staticmethod
+    def convert_cell(value):
+        """
+        Convert a cell value read by openpyxl to what pandas.read_excel would give for it
+        :param value: cell value
+        :return: converted value
+        """
+        if value is None:
+            return math.nan
+        if isinstance(value, str):
+            return math.nan if value in NA_VALUES else value
+        if isinstance(value, float) and value.is_integer():
+            return int(value)
+        return value
+
     @staticmethod
     def extract_program_data(template_df):
         """
         Given a pandas dataframe with the template date, extract out the program related data
-        :param template_df: pandas df of the spreadsheet
+        :param template_df: pandas df of the spreadsheet, or a TemplateSectionIndex of it
         :return: PcorProgramModel with program data from ss
         """
 
-        # loop thru the template until the marker 'PROGRAM' is found
+        fields = TemplateSectionIndex.of(template_df).section_fields('Program')
+        if fields is None:
+            logger.warning("no program found, return null")
+            return None
 
-        ss_rows = template_df.shape[0]
-        logging.debug("iterate looking for the PROGRAM stanza")
+        logging.debug("found Program")
         program = PcorIntermediateProgramModel()
-        for i in range(ss_rows):
-            if template_df.iat[i, 0] == 'Program':
-                logging.debug("found Program")
-                for j in range(i, ss_rows):
-                    # FixMe:  program id is missing in template!
-                    if template_df.iat[j, 0] == 'program id':
-                        program.dbgap_accession_number = template_df.iat[j, 1]
-                    elif template_df.iat[j, 0] == 'program_name':
-                        program.name = template_df.iat[j, 1]
-                    elif template_df.iat[j, 0] == 'Project':
-                        # validate needed props
-                        # ToDo: what is assignment logic?
-                        if program.dbgap_accession_number == "" or program.dbgap_accession_number is None:
-                            program.dbgap_accession_number = program.name
-                        return program
-
-        logger.warning("no program found, return null")
-        return None
+        # FixMe:  program id is missing in template!
+        if 'program id' in fields:
+            program.dbgap_accession_number = fields['program id']
+        if 'program_name' in fields:
+            program.name = fields['program_name']
+
+        # validate needed props
+        # ToDo: what is assignment logic?
+        if program.dbgap_accession_number == "" or program.dbgap_accession_number is None:
+            program.dbgap_accession_number = program.name
+        return program
 
     @staticmethod
     def extract_submission_data(template_df):
         """
         Given a pandas dataframe with the template date, extract out the submission related data
-        :param template_df: pandas df of the spreadsheet
+        :param template_df: pandas df of the spreadsheet, or a TemplateSectionIndex of it
         :return: PcorProgramModel with program data from ss
         """
 
-        # loop thru the template until the marker 'SUBMITTER' is found
+        fields = TemplateSectionIndex.of(template_df).section_fields('Submitter')
+        if fields is None:
+            logger.warning("no submission found, return null")
+            return None
 
-        ss_rows = template_df.shape[0]
-        logging.debug("iterate looking for the SUBMITTER stanza")
+        logging.debug("found Submitter")
         submission = PcorSubmissionInfoModel()
-        for i in range(ss_rows):
-            if template_df.iat[i, 0] == 'Submitter':
-                logging.debug("found Submitter")
-                for j in range(i, ss_rows):
-                    if template_df.iat[j, 0] == 'submitter_name':
-                        submission.curator_name = PcorTemplateParser.sanitize_column(template_df.iat[j, 1])
-                    elif template_df.iat[j, 0] == 'submitter_email':
-                        submission.curator_email = PcorTemplateParser.sanitize_column(template_df.iat[j, 1])
-                    elif template_df.iat[j, 0] == 'comment':
-                        submission.curation_comment = PcorTemplateParser.sanitize_column(template_df.iat[j, 1])
-                    elif template_df.iat[j, 0] == 'ProjectCode':
-                        submission.project_code = PcorTemplateParser.sanitize_column(template_df.iat[j, 1])
-                    elif template_df.iat[j, 0] == 'Program':
-                        # validate needed props
-                        return submission
-
-        logger.warning("no submission found, return null")
-        return None
+        if 'submitter_name' in fields:
+            submission.curator_name = PcorTemplateParser.sanitize_column(fields['submitter_name'])
+        if 'submitter_email' in fields:
+            submission.curator_email = PcorTemplateParser.sanitize_column(fields['submitter_email'])
+        if 'comment' in fields:
+            submission.curation_comment = PcorTemplateParser.sanitize_column(fields['comment'])
+        if 'ProjectCode' in fields:
+            submission.project_code = PcorTemplateParser.sanitize_column(fields['ProjectCode'])
+        return submission
 
     @staticmethod
-    def extract_project_data(template_df):
+    def extract_project_data(template_df, assign_identifiers=True):
         """
         Given a pandas dataframe with the template date, extract out the project related data
-        :param template_df: pandas df of the spreadsheet
+        :param template_df: pandas df of the spreadsheet, or a TemplateSectionIndex of it
+        :param assign_identifiers: generate the identifiers left blank, see process_project_identifiers
         :return: PcorProjectModel with project data from ss
         """
 
-        # loop thru the template until the marker 'PROGRAM' is found
+        fields = TemplateSectionIndex.of(template_df).section_fields('Project')
+        if fields is None:
+            logger.warning("no program found, return null")
+            return None
 
-        ss_rows = template_df.shape[0]
-        logging.debug("iterate looking for the PROJECT stanza")
+        logging.debug("found Project")
         project = PcorIntermediateProjectModel()
-        for i in range(ss_rows):
-            if template_df.iat[i, 0] == 'Project':
-                logging.debug("found Project")
-                for j in range(i, ss_rows):
-                    logger.info('prop name: %s  value: %s' % (template_df.iat[j, 0], template_df.iat[j, 1]))
-                    if template_df.iat[j, 0] == 'project_GUID':
-                        project.submitter_id = PcorTemplateParser.sanitize_column(template_df.iat[j, 1])
-                    elif template_df.iat[j, 0] == 'project_name':
-                        project.name = PcorTemplateParser.sanitize_column(template_df.iat[j, 1])
-                    elif template_df.iat[j, 0] == 'ProjectCode':
-                        project.code = PcorTemplateParser.sanitize_column(template_df.iat[j, 1])
-                    elif template_df.iat[j, 0] == 'project_short_name':
-                        project.short_name = PcorTemplateParser.sanitize_column(template_df.iat[j, 1])
-                        #if project_short_name is not empty, use it for project.code
-                        #if project.short_name:
-                        #    project.code = project.short_name.replace(' ', '').strip()
-                        #    project.code = project.short_name
-                    elif template_df.iat[j, 0] == 'project_sponsor':
-                        project.project_sponsor = PcorTemplateParser.make_complex_array(template_df.iat[j, 1])
-                    # FixMe: do not collapse 'other' into the main prop
-                    elif template_df.iat[j, 0] == 'project_sponsor_other':
-                        project.project_sponsor_other = PcorTemplateParser.make_complex_array(template_df.iat[j, 1])
-                        #project.project_sponsor = PcorTemplateParser.combine_prop(project.project_sponsor, temp_project_sponsor_other)
-                    elif template_df.iat[j, 0] == 'project_sponsor_type':
-                        project.project_sponsor_type = PcorTemplateParser.make_complex_array(template_df.iat[j, 1])
-                    elif template_df.iat[j, 0] == 'project_sponsor_type_other':
-                        project.project_sponsor_type_other = PcorTemplateParser.make_complex_array(template_df.iat[j, 1])
-                    elif template_df.iat[j, 0] == 'project_url':
-                        project.project_url = PcorTemplateParser.sanitize_column(template_df.iat[j, 1])
-                    elif template_df.iat[j, 0] == 'project_description':
-                        project.description = PcorTemplateParser.sanitize_column(template_df.iat[j, 1])
-                    # FixMe:  following things are missing in template!
-                    elif template_df.iat[j, 0] == 'date collected':
-                        project.date_collected = PcorTemplateParser.sanitize_column(template_df.iat[j, 1])
-                    elif template_df.iat[j, 0] == 'complete':
-                        project.complete = PcorTemplateParser.sanitize_column(template_df.iat[j, 1])
-                    elif template_df.iat[j, 0] == 'availability type':
-                        project.availability_type = PcorTemplateParser.sanitize_column(template_df.iat[j, 1])
-                    elif template_df.iat[j, 0] == 'Resource':
-                        # validate needed props and guid assignment
-                        PcorTemplateParser.process_project_identifiers(project)
-                        return project
-
-        logger.warning("no program found, return null")
-        return None
+        for field_name, value in fields.items():
+            logger.info('prop name: %s  value: %s' % (field_name, value))
+
+        if 'project_GUID' in fields:
+            project.submitter_id = PcorTemplateParser.sanitize_column(fields['project_GUID'])
+        if 'project_name' in fields:
+            project.name = PcorTemplateParser.sanitize_column(fields['project_name'])
+        if 'ProjectCode' in fields:
+            project.code = PcorTemplateParser.sanitize_column(fields['ProjectCode'])
+        if 'project_short_name' in fields:
+            project.short_name = PcorTemplateParser.sanitize_column(fields['project_short_name'])
+            #if project_short_name is not empty, use it for project.code
+            #if project.short_name:
+            #    project.code = project.short_name.replace(' ', '').strip()
+            #    project.code = project.short_name
+        if 'project_sponsor' in fields:
+            project.project_sponsor = PcorTemplateParser.make_complex_array(fields['project_sponsor'])
+        # FixMe: do not collapse 'other' into the main prop
+        if 'project_sponsor_other' in fields:
+            project.project_sponsor_other = PcorTemplateParser.make_complex_array(fields['project_sponsor_other'])
+            #project.project_sponsor = PcorTemplateParser.combine_prop(project.project_sponsor, temp_project_sponsor_other)
+        if 'project_sponsor_type' in fields:
+            project.project_sponsor_type = PcorTemplateParser.make_complex_array(fields['project_sponsor_type'])
+        if 'project_sponsor_type_other' in fields:
+            project.project_sponsor_type_other = PcorTemplateParser.make_complex_array(
+                fields['project_sponsor_type_other'])
+        if 'project_url' in fields:
+            project.project_url = PcorTemplateParser.sanitize_column(fields['project_url'])
+        if 'project_description' in fields:
+            project.description = PcorTemplateParser.sanitize_column(fields['project_description'])
+        # FixMe:  following things are missing in template!
+        if 'date collected' in fields:
+            project.date_collected = PcorTemplateParser.sanitize_column(fields['date collected'])
+        if 'complete' in fields:
+            project.complete = PcorTemplateParser.sanitize_column(fields['complete'])
+        if 'availability type' in fields:
+            project.availability_type = PcorTemplateParser.sanitize_column(fields['availability type'])
+
+        # validate needed props and guid assignment
+        if assign_identifiers:
+            PcorTemplateParser.process_project_identifiers(project)
+        return project
 
     def just_other(parent_array):
         if parent_array == []:
@@ -223,106 +436,105 @@ class PcorTemplateParser:
             return False
 
     @staticmethod
-    def extract_resource_data(template_df):
+    def extract_resource_data(template_df, assign_identifiers=True):
         """
         Given a pandas dataframe with the template date, extract out the resource related data
-        :param template_df: pandas df of the spreadsheet
+        :param template_df: pandas df of the spreadsheet, or a TemplateSectionIndex of it
+        :param assign_identifiers: generate the identifiers left blank, see process_resource_identifiers
         :return: PcorProjectModel with project data from ss
         """
 
-        # loop thru the template until the marker 'PROGRAM' is found
+        fields = TemplateSectionIndex.of(template_df).section_fields('Resource')
+        if fields is None:
+            logger.warning("no resource found, return null")
+            return None
 
-        ss_rows = template_df.shape[0]
-        logging.debug("iterate looking for the Resource stanza")
+        logging.debug("found Resource")
         resource = PcorIntermediateResourceModel()
+        for field_name, value in fields.items():
+            logger.info('prop name: %s  value: %s' % (field_name, value))
+
+        # FixMe:  submitter id is missing in template!
+        if 'resource_GUID' in fields:
+            resource.submitter_id = PcorTemplateParser.sanitize_column(fields['resource_GUID'])
+        if 'resource_name' in fields:
+            resource.name = PcorTemplateParser.sanitize_column(fields['resource_name'])
+        if 'resource_short_name' in fields:
+            resource.short_name = PcorTemplateParser.sanitize_column(fields['resource_short_name'])
+            # cleanup short name and use it as unique resource short name, no special characters or spaces
+            # do not use sanitize_column()
+            #resource.name = str(fields['resource_short_name']).replace(' ', '').strip()
+        if 'resource_type' in fields:
+            resource.resource_type = PcorTemplateParser.sanitize_column(fields['resource_type'])
+        if 'resource_url' in fields:
+            resource.resource_url = PcorTemplateParser.sanitize_column(fields['resource_url'])
+        if 'resource_description' in fields:
+            resource.description = PcorTemplateParser.sanitize_column(fields['resource_description'])
+        if 'domain' in fields:
+            resource.domain = PcorTemplateParser.make_array_and_camel_case(
+                PcorTemplateParser.sanitize_column(fields['domain']))
+        # FixMe: do not collapse 'other' into the main prop
+        if 'domain_other' in fields:
+            resource.domain_other = PcorTemplateParser.make_array_and_camel_case(
+                PcorTemplateParser.sanitize_column(fields['domain_other']))
+        if 'keywords' in fields:
+            resource.keywords = PcorTemplateParser.make_array_and_camel_case(
+                PcorTemplateParser.sanitize_column(fields['keywords']))
+        if 'access_type' in fields:
+            resource.access_type = PcorTemplateParser.make_array_and_camel_case(
+                PcorTemplateParser.sanitize_column(fields['access_type']))
+        if 'payment_required' in fields:
+            resource.payment_required = PcorTemplateParser.sanitize_boolean(fields['payment_required'])
+        if 'date_added' in fields:
+            resource.created_datetime = PcorTemplateParser.sanitize_column(fields['date_added'])
+        if 'date_updated' in fields:
+            resource.updated_datetime = PcorTemplateParser.sanitize_column(fields['date_updated'])
+        if 'date_verified' in fields:
+            resource.verification_datetime = PcorTemplateParser.sanitize_column(fields['date_verified'])
+        if 'resource_reference' in fields:
+            ref = PcorTemplateParser.sanitize_column(fields['resource_reference'])
+            if validators.url(ref):
+                resource.resource_reference = ""
+                resource.resource_reference_link = ref
+            else:
+                resource.resource_reference = ref
+                resource.resource_reference_link = "http://nolink"
+        if 'resource_use_agreement' in fields:
+            resource.resource_use_agreement = PcorTemplateParser.sanitize_column(fields['resource_use_agreement'])
+            if validators.url(resource.resource_use_agreement):
+                resource.resource_use_agreement_link = resource.resource_use_agreement
+                resource.resource_use_agreement = ""
+            else:
+                resource.resource_use_agreement_link = "http://nolink"
+        if 'publications' in fields:
+            resource.publications = PcorTemplateParser.new_make_array(fields['publications'], comma_delim=False)
+        if 'publication_links' in fields:
+            resource.publication_links = PcorTemplateParser.new_make_array(fields['publication_links'],
+                                                                           comma_delim=False)
+        if 'is_static' in fields:
+            resource.is_static = PcorTemplateParser.sanitize_boolean(fields['is_static'])
+
+        # validate needed props and guid assignment
+
+        # process the publication references, if they are a link make them a link
+
+        pub_refs = []
+        pub_links = []
+
+        for pub in resource.publications:
+            if validators.url(pub):
+                pub_refs.append("")
+                pub_links.append(pub)
+            else:
+                pub_refs.append(pub)
+                pub_links.append("http://nolink")
 
-        for i in range(ss_rows):
-            if template_df.iat[i, 0] == 'Resource':
-                logging.debug("found Resource")
-                for j in range(i, ss_rows):
-                    logger.info('prop name: %s  value: %s' % (template_df.iat[j, 0], template_df.iat[j, 1]))
-                    field_name = template_df.iat[j, 0]
-                    if not isinstance(field_name, float):
-                        field_name = field_name.strip()
-                        # FixMe:  submitter id is missing in template!
-                        if field_name == 'resource_GUID':
-                            resource.submitter_id = PcorTemplateParser.sanitize_column(template_df.iat[j, 1])
-                        elif field_name == 'resource_name':
-                            resource.name = PcorTemplateParser.sanitize_column(template_df.iat[j, 1])
-                        elif field_name == 'resource_short_name':
-                            resource.short_name = PcorTemplateParser.sanitize_column(template_df.iat[j, 1])
-                            # cleanup short name and use it as unique resource short name, no special characters or spaces
-                            # do not use sanitize_column()
-                            #resource.name = str(template_df.iat[j, 1]).replace(' ', '').strip()
-                        elif field_name == 'resource_type':
-                            resource.resource_type = PcorTemplateParser.sanitize_column(template_df.iat[j, 1])
-                        elif field_name == 'resource_url':
-                            resource.resource_url = PcorTemplateParser.sanitize_column(template_df.iat[j, 1])
-                        elif field_name == 'resource_description':
-                            resource.description = PcorTemplateParser.sanitize_column(template_df.iat[j, 1])
-                        elif field_name == 'domain':
-                            resource.domain = PcorTemplateParser.make_array_and_camel_case(PcorTemplateParser.sanitize_column(template_df.iat[j, 1]))
-                        # FixMe: do not collapse 'other' into the main prop
-                        elif field_name == 'domain_other':
-                            resource.domain_other = PcorTemplateParser.make_array_and_camel_case(PcorTemplateParser.sanitize_column(template_df.iat[j, 1]))
-                        elif field_name == 'keywords':
-                            resource.keywords = PcorTemplateParser.make_array_and_camel_case(PcorTemplateParser.sanitize_column(template_df.iat[j, 1]))
-                        elif field_name == 'access_type':
-                            resource.access_type = PcorTemplateParser.make_array_and_camel_case(PcorTemplateParser.sanitize_column(template_df.iat[j, 1]))
-                        elif field_name == 'payment_required':
-                            resource.payment_required = PcorTemplateParser.sanitize_boolean(template_df.iat[j, 1])
-                        elif field_name == 'date_added':
-                            resource.created_datetime = PcorTemplateParser.sanitize_column(template_df.iat[j, 1])
-                        elif field_name == 'date_updated':
-                            resource.updated_datetime = PcorTemplateParser.sanitize_column(template_df.iat[j, 1])
-                        elif field_name == 'date_verified':
-                            resource.verification_datetime = PcorTemplateParser.sanitize_column(template_df.iat[j, 1])
-                        elif field_name == 'resource_reference':
-                            ref = PcorTemplateParser.sanitize_column(template_df.iat[j, 1])
-                            if validators.url(ref):
-                                resource.resource_reference = ""
-                                resource.resource_reference_link = ref
-                            else:
-                                resource.resource_reference = ref
-                                resource.resource_reference_link = "http://nolink"
-                        elif field_name == 'resource_use_agreement':
-                            resource.resource_use_agreement = PcorTemplateParser.sanitize_column(template_df.iat[j, 1])
-                            if validators.url(resource.resource_use_agreement):
-                                resource.resource_use_agreement_link = resource.resource_use_agreement
-                                resource.resource_use_agreement = ""
-                            else:
-                                resource.resource_use_agreement_link = "http://nolink"
-                        elif field_name == 'publications':
-                           resource.publications = PcorTemplateParser.new_make_array(template_df.iat[j, 1], comma_delim=False)
-                        elif field_name == 'publication_links':
-                            resource.publication_links = PcorTemplateParser.new_make_array(template_df.iat[j, 1], comma_delim=False)
-                        elif field_name == 'is_static':
-                            resource.is_static = PcorTemplateParser.sanitize_boolean(template_df.iat[j, 1])
-                        elif field_name == 'Data_Resource' or field_name == 'Tool_Resource':
-                            # validate needed props and guid assignment
-
-                            # process the publication references, if they are a link make them a link
-
-                            pub_refs = []
-                            pub_links = []
-
-                            for pub in resource.publications:
-                                if validators.url(pub):
-                                    pub_refs.append("")
-                                    pub_links.append(pub)
-                                else:
-                                    pub_refs.append(pub)
-                                    pub_links.append("http://nolink")
-
-                            resource.publications = pub_refs
-                            resource.publication_links = pub_links
-
-                            if resource.submitter_id is None or resource.submitter_id == '':
-                                resource.submitter_id = str(uuid.uuid4())
-                            return resource
-
-        logger.warning("no resource found, return null")
-        return None
+        resource.publications = pub_refs
+        resource.publication_links = pub_links
+
+        if assign_identifiers:
+            PcorTemplateParser.process_resource_identifiers(resource)
+        return resource
 
     @staticmethod
     def new_make_array(value, comma_delim=False, camel_case=False):
@@ -468,18 +680,9 @@ class PcorTemplateParser:
     @staticmethod
     def sanitize_column(value, escape_new_line=True):
         if isinstance(value, str):
-            if value.lower() == 'none':
-                return None
-            if not value:
-                return None
-            # escape double quotes inside string
-            #value = re.sub(r'\d\.\s+', '', value)
-            value = re.sub(r'[•●]\s+', '', value)
-            if escape_new_line:
-                value = re.sub(r'\n', ' ', value)
-            value = re.sub(r'\t', " ", value) #must escape newlines for strings they are not valid json
-            value = value.replace('\xa0', ' ')
-            return value.strip().replace('"', '')
+            if len(value) <= SANITIZE_MEMO_MAX_LENGTH:
+                return PcorTemplateParser._sanitize_str_memo(value, escape_new_line)
+            return PcorTemplateParser._sanitize_str(value, escape_new_line)
         if isinstance(value, float):
             if math.isnan(value):
                 return None
@@ -487,6 +690,35 @@ class PcorTemplateParser:
                 return str(value)
         return value
 
+    @staticmethod
+    def sanitize_columns(values, escape_new_line=True):
+        """
+        Sanitize a batch of values, see sanitize_column
+        :param values: iterable of values
+        :param escape_new_line: replace newlines with spaces
+        :return: list of sanitized values
+        """
+        sanitize_column = PcorTemplateParser.sanitize_column
+        return [sanitize_column(value, escape_new_line) for value in values]
+
+    @staticmethod
+    def _sanitize_str(value, escape_new_line):
+        if not value or value.lower() == 'none':
+            return None
+        # bullets go first, the whitespace they take with them includes newlines, tabs and nbsp
+        #value = re.sub(r'\d\.\s+', '', value)
+        if '•' in value or '●' in value:
+            value = _bullet_pattern.sub('', value)
+        # must escape newlines for strings they are not valid json
+        value = value.translate(_escape_new_line_table if escape_new_line else _keep_new_line_table)
+        # escape double quotes inside string
+        return value.strip().replace('"', '')
+
+    @staticmethod
+    @functools.lru_cache(maxsize=16384)
+    def _sanitize_str_memo(value, escape_new_line):
+        return PcorTemplateParser._sanitize_str(value, escape_new_line)
+
     @staticmethod
     def camel_case_it(prop):
         """ Make a string camel case, ignore if already all uppercase """
@@ -541,17 +773,69 @@ class PcorTemplateParser:
         if date_str == 'current' or date_str == 'Current':
             return datetime.now().year
 
-        for fmt in ("%Y", "%m/%Y", "%d/%m/%Y"):
+        formatted_date = PcorTemplateParser._format_year(str(date_str))
+        if formatted_date is None:
+            logger.warning(f"Date string {date_str} is not in a recognized format")
+        return formatted_date
+
+    @staticmethod
+    @functools.lru_cache(maxsize=4096)
+    def _format_year(date_str):
+        """
+        The yyyy of a date in one of DATE_FORMATS, memoized, and recognized with a regex where possible rather than
+        by trying each format in turn with strptime. Dates the patterns don't settle (e.g. a leading zero year, or an
+        unusual form of digit) go through strptime as before.
+        """
+        match = _year_pattern.fullmatch(date_str)
+        if match:
+            return match.group(1)
+        match = _month_year_pattern.fullmatch(date_str)
+        if match:
+            return match.group(2)
+        match = _day_month_year_pattern.fullmatch(date_str)
+        if match:
+            year = int(match.group(3))
+            if int(match.group(1)) <= calendar.monthrange(year, int(match.group(2)))[1]:
+                return match.group(3)
+
+        for fmt in DATE_FORMATS:
             try:
-                parsed_date = datetime.strptime(str(date_str), fmt)
+                parsed_date = datetime.strptime(date_str, fmt)
                 formatted_date = str(parsed_date.strftime("%Y"))
                 return formatted_date
             except ValueError:
                 continue
-
-        logger.warning(f"Date string {date_str} is not in a recognized format")
         return None
 
+    @staticmethod
+    def format_date_time_values(values):
+        """
+        Convert a batch of dates to yyyy with format_date_time, as a memoized map rather than a vectorized conversion:
+        each distinct value is converted once and the result reused for its repeats.
+        :param values: pandas Series or iterable of dates
+        :return: Series of yyyy for a Series, otherwise a list of yyyy
+        """
+        if hasattr(values, "map") and hasattr(values, "unique"):
+            converted = {value: PcorTemplateParser.format_date_time(value) for value in values.unique()}
+            return values.map(converted)
+
+        converted = {}
+        results = []
+        for value in values:
+            try:
+                if value not in converted:
+                    converted[value] = PcorTemplateParser.format_date_time(value)
+                results.append(converted[value])
+            except TypeError:
+                # unhashable
+                results.append(PcorTemplateParser.format_date_time(value))
+        return results
+
+    @staticmethod
+    def process_resource_identifiers(resource):
+        if resource.submitter_id is None or resource.submitter_id == '':
+            resource.submitter_id = str(uuid.uuid4())
+
     @staticmethod
     def process_project_identifiers(project):
         if project.submitter_id == "" or project.submitter_id is None:
@@ -16,21 +16,37 @@ from accelerator_core.workflow.crosswalk import Crosswalk
 
 from accelerator_source_cedar.accel_cedar.cedar_resource_reader_1_5_1 import CedarResourceReader_1_5_1
 from accelerator_source_cedar.accel_cedar.cedar_resource_reader_1_5_2 import CedarResourceReader_1_5_2
+from accelerator_source_cedar.accel_cedar.measures_document_index import MeasuresDocumentIndex
+from accelerator_source_cedar.accel_cedar.process_result import ProcessResult
 
+import json
 import logging
+import traceback
 logger = logging.getLogger(__name__)
 
 
 class CedarToAccelCrosswalk(Crosswalk):
     """Abstract superclass for mapping raw data to a structured JSON format."""
 
-    def __init__(self, xcom_props_resolver:XcomPropsResolver):
+    def __init__(self, xcom_props_resolver:XcomPropsResolver, measures_document_index:MeasuresDocumentIndex=None,
+                 dead_letter:bool=False, dead_letter_path:str=None):
         """
         @param: xcom_properties_resolver XcomPropertiesResolver that can access
         handling configuration
+        @param: measures_document_index optional MeasuresDocumentIndex that records the measures each crosswalked
+        document uses, so a change to the measures vocabulary can be limited to the documents it affects
+        @param: dead_letter if True, an item of a payload that fails to crosswalk is recorded in transform_failures
+        and the remaining items are still crosswalked, rather than the exception failing the whole payload
+        @param: dead_letter_path optional file that each failed item, with its error and traceback, is appended to
+        as one line of json (implies dead_letter)
         """
 
         super().__init__(xcom_props_resolver)
+        self.measures_document_index = measures_document_index
+        self.dead_letter = dead_letter or dead_letter_path is not None
+        self.dead_letter_path = dead_letter_path
+        self.transform_succeeded = 0  # number of items crosswalked in the last transform
+        self.transform_failures = []  # ProcessResult for each item that failed in the last transform
 
     def transform(self, ingest_result: IngestPayload) -> IngestPayload:
         """Convert raw data into a standardized format.
@@ -40,24 +56,101 @@ class CedarToAccelCrosswalk(Crosswalk):
         """
 
         output_payload = IngestPayload(ingest_result.ingest_source_descriptor)
+        self.transform_succeeded = 0
+        self.transform_failures = []
 
         payload_len = self.get_payload_length(ingest_result)
         logger.info(f"payload len: {payload_len}")
-        for i in range(payload_len):
-            payload = self.payload_resolve(ingest_result, i)
-            logger.info(f"payload is resolved: {payload}")
-            transformed = self.translate_to_accel_model(ingest_result, payload)
-            self.report_individual(output_payload, ingest_result.ingest_source_descriptor.ingest_item_id, transformed)
+        dead_letter_file = None
+        try:
+            for i in range(payload_len):
+                payload = None
+                try:
+                    payload = self.payload_resolve(ingest_result, i)
+                    logger.info(f"payload is resolved: {payload}")
+                    transformed = self.translate_to_accel_model(ingest_result, payload)
+                except Exception as err:
+                    if not self.dead_letter:
+                        raise
+                    failure = self.failed_item(ingest_result, i, payload, err)
+                    self.transform_failures.append(failure)
+                    if self.dead_letter_path:
+                        if dead_letter_file is None:
+                            dead_letter_file = open(self.dead_letter_path, "a", encoding="utf-8")
+                        dead_letter_file.write(json.dumps({
+                            "id": failure.id,
+                            "index": i,
+                            "message": failure.message,
+                            "traceback": failure.traceback,
+                            "payload": payload,
+                        }) + "\n")
+                        dead_letter_file.flush()
+                    continue
+
+                self.report_individual(output_payload, ingest_result.ingest_source_descriptor.ingest_item_id,
+                                       transformed)
+                self.transform_succeeded += 1
+        finally:
+            if dead_letter_file is not None:
+                dead_letter_file.close()
+
+        if self.dead_letter:
+            output_payload.ingest_successful = not self.transform_failures
+            logger.info(f"transform complete, {self.transform_succeeded} succeeded, "
+                        f"{len(self.transform_failures)} failed")
 
         return output_payload
 
+    @staticmethod
+    def failed_item(ingest_result: IngestPayload, index: int, payload, err: Exception) -> ProcessResult:
+        """
+        :param ingest_result: the payload being transformed
+        :param index: index of the failed item in the payload
+        :param payload: the item's cedar json-ld, or None if it could not be resolved
+        :param err: exception raised for the item
+        :return: ProcessResult describing the failure
+        """
+        item_id = None
+        if isinstance(payload, dict):
+            item_id = payload.get("@id")
+        if not item_id:
+            item_id = f"{ingest_result.ingest_source_descriptor.ingest_item_id}:{index}"
+        logger.error(f"exception crosswalking {item_id}: {err}")
+
+        failure = ProcessResult()
+        failure.success = False
+        failure.id = item_id
+        failure.message = str(err)
+        failure.errors.append(f"error crosswalking {item_id}: {err}")
+        failure.traceback = "".join(traceback.format_exception(type(err), err, err.__traceback__))
+        return failure
+
     def translate_to_accel_model(self,ingest_result: IngestPayload, payload:dict) -> dict:
         """
         :param payload: input dict
         :return: output dict
         """
+        cedar_model = self.read_cedar_model(payload)
+        return self.translate_cedar_model(ingest_result, payload, cedar_model)
+
+    def read_cedar_model(self, payload: dict) -> dict:
+        """
+        Read the intermediate models of a CEDAR document, the first half of translate_to_accel_model
+        :param payload: CEDAR json-ld
+        :return: dict of intermediate models
+        """
         cedar_reader = self.get_cedar_reader(payload)
-        cedar_model = cedar_reader.model_from_json(payload)
+        return cedar_reader.model_from_json(payload)
+
+    def translate_cedar_model(self, ingest_result: IngestPayload, payload: dict, cedar_model: dict) -> dict:
+        """
+        Translate the intermediate models of a CEDAR document into the accelerator model, the second half of
+        translate_to_accel_model
+        :param ingest_result: payload with the ingest source descriptor of the document
+        :param payload: CEDAR json-ld the models were read from
+        :param cedar_model: dict of intermediate models from read_cedar_model
+        :return: output dict
+        """
         logger.info("have cedar_model")
         accel_population_data = None
 
@@ -193,6 +286,10 @@ class CedarToAccelCrosswalk(Crosswalk):
         else:
             raise Exception("unable to process cedar type")
 
+        if self.measures_document_index is not None:
+            self.record_measures(payload.get("@id") or ingest_result.ingest_source_descriptor.ingest_item_id,
+                                 cedar_model, self.get_cedar_reader(payload))
+
         technical = TechnicalMetadataModel()
         technical.original_source = ingest_result.ingest_source_descriptor.ingest_type
         technical.created = ingest_result.ingest_source_descriptor.submit_date
@@ -215,6 +312,22 @@ class CedarToAccelCrosswalk(Crosswalk):
 
         return rendered
 
+    def record_measures(self, document_id, cedar_model, cedar_reader):
+        """
+        Record the measures (including 'other' measures) of a crosswalked document in the measures document index
+        :param document_id: id of the document
+        :param cedar_model: dict of intermediate models from the cedar reader
+        :param cedar_reader: reader used for the document, which holds the measures rollup in use
+        """
+        measures = []
+        for data_type in ("key_dataset", "geospatial_data_resource", "population_data_resource"):
+            if cedar_model.get(data_type) is not None:
+                measures.extend(cedar_model[data_type].measures)
+                measures.extend(cedar_model[data_type].measures_other)
+                break
+        self.measures_document_index.record(document_id, measures,
+                                            cedar_reader.pcor_measures_rollup.index_version)
+
     @staticmethod
     def get_cedar_reader(payload: dict):
         if CedarResourceReader_1_5_2.supports(payload):
@@ -1,14 +1,30 @@
+import copy
 import json
 import logging
-from typing import List
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List
 
 from accelerator_core.utils.xcom_utils import XcomPropsResolver
 from accelerator_core.workflow.accel_data_models import SynchType
 from accelerator_core.workflow.accel_source_ingest import AccelIngestComponent, IngestSourceDescriptor, IngestPayload
 
 from accelerator_source_cedar.accel_cedar.cedar_access import CedarAccess
+from accelerator_source_cedar.accel_cedar.cedar_archive import CedarArchive
+from accelerator_source_cedar.accel_cedar.cedar_mirror import CedarMirror
+from accelerator_source_cedar.accel_cedar.checkpoint_journal import CheckpointJournal
+from accelerator_source_cedar.accel_cedar.jsonl_corpus import JsonLinesCorpus
+from accelerator_source_cedar.accel_cedar.process_result import ProcessResult
 
 CEDAR_API_KEY = "api_key"
+MAX_WORKERS = "MAX_WORKERS"
+DEFAULT_MAX_WORKERS = 8
+PAGE_SIZE = "PAGE_SIZE"
+JSONL = "JSONL"
+CHECKPOINT = "CHECKPOINT"
+MIRROR = "MIRROR"
+ARCHIVE = "ARCHIVE"
 
 logger = logging.getLogger(__name__)
 
@@ -24,6 +40,12 @@ class CedarAccelSource(AccelIngestComponent):
 
     def __init__(self, ingest_source_descriptor:IngestSourceDescriptor,  xcom_props_resolver:XcomPropsResolver):
         super().__init__(ingest_source_descriptor, xcom_props_resolver)
+        # ProcessResult for each identifier that failed in the last ingest_many call
+        self.ingest_failures = []
+        # mirrors, archives, corpora and journals opened for the MIRROR, ARCHIVE, JSONL and CHECKPOINT parameters, by
+        # parameter and path, so their manifest or index is read once rather than for every identifier
+        self._local_sources = {}
+        self._local_sources_lock = threading.Lock()
 
     def reacquire_supported(self) -> bool:
         """
@@ -41,6 +63,17 @@ class CedarAccelSource(AccelIngestComponent):
         For ease in testing, this method allows a file path to be passed in as the identifier with the key/value of
         FILE:True, which will cause this method to load the CEDAR data as a JSON file and skip reading CEDAR API.
 
+        A key of JSONL with the path of a JSON-lines corpus (see jsonl_corpus) will read the CEDAR data with the
+        given identifier from the corpus rather than the CEDAR API.
+
+        A key of MIRROR with the directory of a CEDAR mirror (see cedar_mirror) will read the CEDAR data with the
+        given identifier from the mirror rather than the CEDAR API.
+
+        A key of ARCHIVE with the path of a zip or tar archive of CEDAR instances (see cedar_archive) will read the
+        CEDAR data with the given identifier (the member file name without .json) from the archive. The archive is
+        opened once per path and kept until close(). A zip archive is read by member, a tar archive has no index so the
+        first identifier read from it scans the archive, use cedar_ingest_pipeline to read a whole tar archive.
+
         """
 
         logger.info(f"ingest_single({identifier})")
@@ -50,16 +83,8 @@ class CedarAccelSource(AccelIngestComponent):
         # api_key=xxxxxxx
         # cedar_endpoint=https://resource.metadatacenter.org
 
-        is_file = additional_parameters.get('FILE', False)
-        json_dict = None
-        if is_file:
-            logger.info(f"ingest_single using file direct ({identifier})")
-            with open(identifier) as json_data:
-                json_dict = json.load(json_data)
-        else:
-            cedar_access = CedarAccess(additional_parameters)
-            logger.debug("retrieving from cedar...")
-            json_dict = cedar_access.retrieve_resource(identifier)
+        cedar_access = self.build_cedar_access(additional_parameters)
+        json_dict = self.retrieve_json(identifier, additional_parameters, cedar_access)
 
         logger.debug(f"cedar json returned\n{json_dict}")
 
@@ -68,6 +93,110 @@ class CedarAccelSource(AccelIngestComponent):
         ingestPayload.ingest_successful = True
         return ingestPayload
 
+    def ingest_many(self, identifiers: List[str], additional_parameters: dict) -> List[IngestPayload]:
+        """
+        Ingest a list of CEDAR documents based on their CEDAR IDs. Documents are fetched concurrently by a bounded
+        pool of threads that share a single CedarAccess, and so a single pool of connections.
+
+        :param identifiers: CEDAR document identifiers
+        :param additional_parameters: Additional parameters for this ingest component, as in ingest_single. A key of
+        MAX_WORKERS sets the number of concurrent fetches (default 8)
+        :return: List of IngestPayload, one per identifier and in the same order. A document that could not be
+        retrieved does not abort the others, its payload has ingest_successful of False and a ProcessResult
+        describing the failure is recorded in ingest_failures
+        """
+
+        logger.info(f"ingest_many({len(identifiers)} identifiers)")
+
+        max_workers = int(additional_parameters.get(MAX_WORKERS, DEFAULT_MAX_WORKERS))
+        cedar_access = self.build_cedar_access(additional_parameters, pool_size=max_workers)
+
+        self.ingest_failures = []
+        payloads = []
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(self.retrieve_json, identifier, additional_parameters, cedar_access)
+                       for identifier in identifiers]
+
+            for identifier, future in zip(identifiers, futures):
+                # each payload gets its own descriptor, so a change to one payload's descriptor downstream does not
+                # show up in the others
+                ingestPayload = IngestPayload(copy.copy(self.ingest_source_descriptor))
+                try:
+                    json_dict = future.result()
+                except Exception as err:
+                    logger.error(f"exception ingesting {identifier}: {err}")
+                    failure = ProcessResult()
+                    failure.success = False
+                    failure.id = identifier
+                    failure.message = str(err)
+                    failure.errors.append(f"error ingesting {identifier}: {err}")
+                    failure.traceback = "".join(traceback.format_exception(type(err), err, err.__traceback__))
+                    self.ingest_failures.append(failure)
+                    ingestPayload.ingest_successful = False
+                    payloads.append(ingestPayload)
+                    continue
+
+                self.report_individual(ingestPayload, identifier, json_dict)
+                ingestPayload.ingest_successful = True
+                payloads.append(ingestPayload)
+
+        logger.info(f"ingest_many complete, {len(payloads) - len(self.ingest_failures)} succeeded, "
+                    f"{len(self.ingest_failures)} failed")
+        return payloads
+
+    def build_cedar_access(self, additional_parameters: dict, pool_size: int = DEFAULT_MAX_WORKERS):
+        """
+        Set up the access used to read CEDAR documents, based on the additional parameters. A mirror, archive or
+        corpus is opened once per path and kept for later calls, until close()
+        :param additional_parameters: Additional parameters for this ingest component
+        :param pool_size: number of pooled connections for CedarAccess
+        :return: CedarMirror when MIRROR is given, CedarArchive when ARCHIVE is given, JsonLinesCorpus when JSONL
+        is given, None in FILE mode, otherwise CedarAccess
+        """
+        for key, source_class in ((MIRROR, CedarMirror), (ARCHIVE, CedarArchive), (JSONL, JsonLinesCorpus)):
+            if additional_parameters.get(key):
+                return self._local_source(key, source_class, additional_parameters[key])
+        if additional_parameters.get('FILE', False):
+            return None
+        return CedarAccess(additional_parameters, pool_size=pool_size)
+
+    def _local_source(self, key: str, source_class, path):
+        with self._local_sources_lock:
+            source = self._local_sources.get((key, str(path)))
+            if source is None:
+                source = source_class(path)
+                self._local_sources[(key, str(path))] = source
+            return source
+
+    def close(self):
+        """
+        Close the archives, corpora and journals opened by build_cedar_access and record_complete
+        """
+        with self._local_sources_lock:
+            for source in self._local_sources.values():
+                if hasattr(source, "close"):
+                    source.close()
+            self._local_sources = {}
+
+    @staticmethod
+    def retrieve_json(identifier: str, additional_parameters: dict, cedar_access: CedarAccess = None) -> dict:
+        """
+        Retrieve the CEDAR json for an identifier, either from a file (FILE:True) or from the CEDAR API
+        :param identifier: CEDAR document identifier, or a file path in FILE mode
+        :param additional_parameters: Additional parameters for this ingest component
+        :param cedar_access: CedarAccess (or CedarMirror, CedarArchive, JsonLinesCorpus) used to read the document, not used in
+        FILE mode
+        :return: dict with the CEDAR json-ld
+        """
+        if cedar_access is None:
+            logger.info(f"ingest using file direct ({identifier})")
+            with open(identifier) as json_data:
+                return json.load(json_data)
+
+        logger.debug("retrieving from cedar...")
+        return cedar_access.retrieve_resource(identifier)
+
     def synch(self, synch_type:SynchType, identifier:str, additional_parameters = {}) -> List[IngestPayload]:
         """
         Carry out a synch between a CEDAR folder (by folder id GUID) and acclerator.
@@ -83,30 +212,60 @@ class CedarAccelSource(AccelIngestComponent):
         so that individual documents can be processed individually.
         """
 
-        logger.info(f"synch( synch_type={synch_type}, identifier={identifier}, additional_parameters={additional_parameters} )")
+        return list(self.synch_iter(synch_type, identifier, additional_parameters))
 
-        if synch_type != SynchType.SOURCE.value:
-            raise Exception(f"synch_type={synch_type} not supported")
+    def synch_iter(self, synch_type:SynchType, identifier:str, additional_parameters = {},
+                   chunk_size:int = 1) -> Iterator[IngestPayload]:
+        """
+        Streaming form of synch, payloads are yielded as the folder listing is read page by page, rather than
+        collected into a list, so the first payload is available before the listing completes.
+        :param synch_type: Synch type
+        :param identifier: CEDAR folder identifier
+        :param additional_parameters: dict with any additional parameters, PAGE_SIZE sets the number of items read
+        per folder listing request. A key of CHECKPOINT with the path of a CheckpointJournal resumes an earlier synch,
+        items already in the journal are skipped. The journal is only read here, the step that stores the output of a
+        payload records its items with record_complete once they are stored. A key of MIRROR with the directory of a
+        CEDAR mirror (see cedar_mirror) reads the folder listing from the mirror rather than the CEDAR API
+        :param chunk_size: number of cedar documents grouped into each payload, the default of 1 gives the same
+        one document per payload structure as synch
+        :return: generator of IngestPayload
+        """
 
-        recurse = additional_parameters.get('RECURSE', False)
+        logger.info(f"synch_iter( synch_type={synch_type}, identifier={identifier}, chunk_size={chunk_size} )")
 
-        cedar_access = CedarAccess(params=additional_parameters)
-        folder = cedar_access.retrieve_folder_contents(identifier)
-        logger.debug(f"folder returned\n{folder}")
+        if synch_type != SynchType.SOURCE.value:
+            raise Exception(f"synch_type={synch_type} not supported")
 
-        payloads = []
+        if chunk_size < 1:
+            raise Exception(f"chunk_size={chunk_size} must be at least 1")
 
-        ctr = 0
+        recurse = additional_parameters.get('RECURSE', False)
+        page_size = int(additional_parameters.get(PAGE_SIZE, 100))
 
-        for item in folder.subfolders:
+        if additional_parameters.get(MIRROR):
+            cedar_access = self.build_cedar_access(additional_parameters)
+        else:
+            cedar_access = CedarAccess(params=additional_parameters)
+        completed = {}
+        if additional_parameters.get(CHECKPOINT):
+            completed = self._local_source(CHECKPOINT, CheckpointJournal, additional_parameters[CHECKPOINT])
 
+        ingestPayload = None
+        payload_count = 0
 
-            ingestPayload = IngestPayload(self.ingest_source_descriptor)
-            ingestPayload.payload_inline = True
+        for item in cedar_access.iter_folder_contents(identifier, page_size=page_size):
 
             if item.item_type == "folder":
                 continue
 
+            if CedarAccess.guid_or_identity(item.folder_id) in completed:
+                logger.debug(f"skipping {item.folder_id}, already complete")
+                continue
+
+            if ingestPayload is None:
+                ingestPayload = IngestPayload(copy.copy(self.ingest_source_descriptor))
+                ingestPayload.payload_inline = True
+
             vals = {
                 "name": item.folder_name,
                 "item_type": item.item_type,
@@ -114,8 +273,29 @@ class CedarAccelSource(AccelIngestComponent):
             }
 
             self.report_individual(ingestPayload, item.folder_id, vals)
-            payloads.append(ingestPayload)
+            payload_count += 1
 
-        return payloads
+            if payload_count == chunk_size:
+                yield ingestPayload
+                ingestPayload = None
+                payload_count = 0
+
+        if ingestPayload is not None:
+            yield ingestPayload
 
+    def record_complete(self, item_ids: List[str], location, additional_parameters = {}):
+        """
+        Record items of a synch as complete in the CHECKPOINT journal, called by the step that stores the output of a
+        payload once it is stored, so a resumed synch_iter skips them. Does nothing without a CHECKPOINT parameter.
+        The journal is opened once per path and kept until close(), ids are recorded by their guid so either the guid
+        or the full @id may be given.
+        :param item_ids: ids of the stored cedar documents
+        :param location: where the output of the items was written
+        :param additional_parameters: the additional_parameters given to synch_iter
+        """
+        if not additional_parameters.get(CHECKPOINT):
+            return
 
+        journal = self._local_source(CHECKPOINT, CheckpointJournal, additional_parameters[CHECKPOINT])
+        for item_id in item_ids:
+            journal.record(CedarAccess.guid_or_identity(item_id), location)
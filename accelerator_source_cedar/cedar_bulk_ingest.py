@@ -0,0 +1,285 @@
+"""
+Bulk ingest of CEDAR template instances exported to local disk.
+
+JSON files are discovered under a directory (or by a glob pattern), and each file is decoded, read and crosswalked
+in a pool of worker processes, with the crosswalked document written through the xcom temp file utilities. Files
+are discovered lazily and only a bounded number are in flight at any time, so tens of thousands of files can be
+processed without holding them in memory.
+
+The input may also be a JSON-lines corpus (.jsonl or .jsonl.gz), and the crosswalked documents may be written to a
+single JSON-lines corpus with --output-jsonl rather than to a temp file per document. A zip or tar(.gz) archive of
+exported instances is read in place, with each member decoded straight from the archive stream.
+
+With --checkpoint, each completed document is recorded in a CheckpointJournal, and a run restarted with the same
+journal skips the documents that are already complete.
+
+usage: python -m accelerator_source_cedar.cedar_bulk_ingest <directory, glob, corpus or archive> --temp-dir <dir>
+        [--run-id <id>] [--output-jsonl <corpus>] [--checkpoint <journal>]
+"""
+
+import argparse
+import json
+import logging
+import os
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Iterator
+
+from accelerator_core.utils.xcom_utils import DirectXcomPropsResolver, XcomUtils
+from accelerator_core.workflow.accel_source_ingest import IngestSourceDescriptor, IngestPayload
+
+from accelerator_source_cedar.accel_cedar.cedar_archive import CedarArchive, is_archive_path
+from accelerator_source_cedar.accel_cedar.checkpoint_journal import CheckpointJournal
+from accelerator_source_cedar.accel_cedar.file_discovery import discover_files
+from accelerator_source_cedar.accel_cedar.jsonl_corpus import JsonLinesCorpus, JsonLinesWriter, is_jsonl_path
+from accelerator_source_cedar.accel_cedar.process_result import ProcessResult
+from accelerator_source_cedar.accel_cedar_crosswalk import CedarToAccelCrosswalk
+
+logger = logging.getLogger(__name__)
+
+# per worker process state, set up by init_worker
+_worker_crosswalk = None
+_worker_xcom_utils = None
+_worker_ingest_source_descriptor = None
+_worker_run_id = None
+
+
+class BulkIngestSummary:
+    """
+    Outcome of a bulk ingest, with throughput information
+    """
+
+    def __init__(self):
+        self.total = 0
+        self.succeeded = 0
+        self.skipped = 0  # already complete in the checkpoint journal
+        self.failures = []  # ProcessResult for each file that failed
+        self.elapsed_seconds = 0.0
+
+    @property
+    def documents_per_second(self) -> float:
+        if self.elapsed_seconds <= 0:
+            return 0.0
+        return self.total / self.elapsed_seconds
+
+    def report(self) -> str:
+        lines = [f"processed {self.total} files in {self.elapsed_seconds:.2f}s "
+                 f"({self.documents_per_second:.1f} docs/s), {self.succeeded} succeeded, {len(self.failures)} failed, "
+                 f"{self.skipped} skipped as already complete"]
+        for failure in self.failures:
+            lines.append(f"  failed: {failure.template_source}: {failure.message}")
+        return "\n".join(lines)
+
+
+def discover_json_files(location: str, pattern: str = "*.json") -> Iterator[str]:
+    """
+    Lazily discover CEDAR json files
+    :param location: a directory, which is walked recursively, or a glob pattern (** is supported)
+    :param pattern: file name pattern used when walking a directory
+    :return: generator of file paths
+    """
+    return discover_files(location, pattern)
+
+
+def init_worker(temp_files_location: str, run_id: str, ingest_source_descriptor: IngestSourceDescriptor,
+                log_level: int = logging.WARNING):
+    """
+    Set up the crosswalk and xcom utilities once per worker process
+    """
+    global _worker_crosswalk, _worker_xcom_utils, _worker_ingest_source_descriptor, _worker_run_id
+
+    logging.getLogger().setLevel(log_level)
+    xcom_props_resolver = DirectXcomPropsResolver(temp_files_supported=True,
+                                                  temp_files_location=temp_files_location)
+    _worker_crosswalk = CedarToAccelCrosswalk(xcom_props_resolver)
+    _worker_xcom_utils = XcomUtils(xcom_props_resolver)
+    _worker_ingest_source_descriptor = ingest_source_descriptor
+    _worker_run_id = run_id
+
+
+def crosswalk_file(path: str, return_document: bool = False) -> ProcessResult:
+    """
+    Decode, read and crosswalk one CEDAR json file, storing the result in a temp file
+    :param path: path to the CEDAR json
+    :param return_document: return the crosswalked document in model_data["document"] rather than storing it
+    :return: ProcessResult with the stored location in template_current_location, or the error information
+    """
+    item_id = os.path.splitext(os.path.basename(path))[0]
+    try:
+        with open(path) as json_data:
+            json_dict = json.load(json_data)
+    except Exception as err:
+        return _failed_result(item_id, path, err)
+
+    return crosswalk_document(item_id, json_dict, path, return_document)
+
+
+def crosswalk_document(item_id: str, json_dict: dict, source: str, return_document: bool = False) -> ProcessResult:
+    """
+    Read and crosswalk one CEDAR document, storing the result in a temp file
+    :param item_id: id of the document, used to name the temp file
+    :param json_dict: CEDAR json-ld
+    :param source: where the document came from, recorded in the result
+    :param return_document: return the crosswalked document in model_data["document"] rather than storing it
+    :return: ProcessResult with the stored location in template_current_location, or the error information
+    """
+    result = ProcessResult()
+    result.template_source = source
+    result.id = item_id
+
+    try:
+        _worker_ingest_source_descriptor.ingest_item_id = item_id
+        ingest_result = IngestPayload(_worker_ingest_source_descriptor)
+        transformed = _worker_crosswalk.translate_to_accel_model(ingest_result, json_dict)
+        if return_document:
+            result.model_data["document"] = transformed
+        else:
+            result.template_current_location = _worker_xcom_utils.store_dict_in_temp_file(item_id, transformed,
+                                                                                          _worker_run_id)
+    except Exception as err:
+        return _failed_result(item_id, source, err)
+
+    return result
+
+
+def _failed_result(item_id: str, source: str, err: Exception) -> ProcessResult:
+    result = ProcessResult()
+    result.template_source = source
+    result.id = item_id
+    result.success = False
+    result.message = str(err)
+    result.errors.append(f"error processing {source}: {err}")
+    result.traceback = traceback.format_exc()
+    return result
+
+
+def bulk_ingest(location: str, temp_files_location: str, run_id: str,
+                ingest_source_descriptor: IngestSourceDescriptor, max_workers: int = None,
+                pattern: str = "*.json", log_level: int = logging.WARNING,
+                output_jsonl: str = None, checkpoint: str = None) -> BulkIngestSummary:
+    """
+    Crosswalk every CEDAR json file found at a location across a pool of worker processes
+    :param location: directory or glob pattern of CEDAR json files, a JSON-lines corpus of CEDAR instances, or a zip
+    or tar(.gz) archive of CEDAR json files
+    :param temp_files_location: xcom temp files location that receives the crosswalked documents
+    :param run_id: run id used to group the temp files
+    :param ingest_source_descriptor: descriptor applied to each document, ingest_item_id is set per file
+    :param max_workers: number of worker processes, defaults to the number of cores
+    :param pattern: file name pattern used when location is a directory or an archive
+    :param log_level: logging level in the worker processes
+    :param output_jsonl: path of a JSON-lines corpus that receives the crosswalked documents instead of temp files
+    :param checkpoint: path of a CheckpointJournal, documents already recorded there are skipped, and completed
+    documents are recorded as they finish
+    :return: BulkIngestSummary
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    max_in_flight = max_workers * 4
+    summary = BulkIngestSummary()
+    writer = JsonLinesWriter(output_jsonl) if output_jsonl else None
+    journal = CheckpointJournal(checkpoint) if checkpoint else None
+    return_document = writer is not None
+    start = time.perf_counter()
+
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=init_worker,
+                                 initargs=(temp_files_location, run_id, ingest_source_descriptor,
+                                           log_level)) as executor:
+            in_flight = {}
+            for key, task in _iter_tasks(location, pattern):
+                if journal and journal.is_complete(key):
+                    summary.skipped += 1
+                    continue
+                if len(in_flight) >= max_in_flight:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    _collect(done, in_flight, summary, writer, journal)
+                in_flight[executor.submit(*task, return_document=return_document)] = key
+
+            done, _ = wait(in_flight)
+            _collect(done, in_flight, summary, writer, journal)
+    finally:
+        if writer:
+            writer.close()
+        if journal:
+            journal.close()
+
+    summary.elapsed_seconds = time.perf_counter() - start
+    logger.info(summary.report())
+    return summary
+
+
+def _iter_tasks(location: str, pattern: str):
+    """
+    :return: generator of (checkpoint key, task) where the task is the function and arguments to submit
+    """
+    if is_jsonl_path(location) and os.path.isfile(location):
+        for item_id, json_dict in JsonLinesCorpus(location).items():
+            yield item_id, (crosswalk_document, item_id, json_dict, location)
+    elif is_archive_path(location) and os.path.isfile(location):
+        for item_id, json_dict in CedarArchive(location, pattern).items():
+            yield item_id, (crosswalk_document, item_id, json_dict, location)
+    else:
+        for path in discover_json_files(location, pattern):
+            yield path, (crosswalk_file, path)
+
+
+def _collect(done, in_flight: dict, summary: BulkIngestSummary, writer: JsonLinesWriter = None,
+             journal: CheckpointJournal = None):
+    for future in done:
+        key = in_flight.pop(future)
+        result = future.result()
+        summary.total += 1
+        if result.success:
+            summary.succeeded += 1
+            location = result.template_current_location
+            if writer:
+                writer.write(result.id, result.model_data.pop("document"))
+                location = writer.path
+                if journal:
+                    # the document must be on disk before it is journaled as complete
+                    writer.flush()
+            if journal:
+                journal.record(key, location)
+        else:
+            logger.error(f"failed to process {result.template_source}: {result.message}")
+            summary.failures.append(result)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk crosswalk of CEDAR json files on local disk")
+    parser.add_argument("location", help="directory (walked recursively), glob pattern of CEDAR json files, or a "
+                                         "JSON-lines corpus or zip/tar(.gz) archive of CEDAR instances")
+    parser.add_argument("--temp-dir", required=True, help="xcom temp files location for the crosswalked documents")
+    parser.add_argument("--run-id", default="bulk_ingest", help="run id used to group the temp files")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes (default: cores)")
+    parser.add_argument("--output-jsonl", default=None,
+                        help="write crosswalked documents to this JSON-lines corpus (.gz to compress)")
+    parser.add_argument("--checkpoint", default=None,
+                        help="checkpoint journal, completed documents are recorded and skipped when resuming")
+    parser.add_argument("--pattern", default="*.json", help="file name pattern when walking a directory or archive")
+    parser.add_argument("--ingest-type", default="cedar")
+    parser.add_argument("--schema-version", default="1.0.2")
+    parser.add_argument("--submitter-name", default="")
+    parser.add_argument("--submitter-email", default="")
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args(argv)
+
+    log_level = logging.getLevelName(args.log_level.upper())
+    logging.getLogger().setLevel(log_level)
+
+    ingest_source_descriptor = IngestSourceDescriptor()
+    ingest_source_descriptor.ingest_type = args.ingest_type
+    ingest_source_descriptor.ingest_identifier = args.run_id
+    ingest_source_descriptor.schema_version = args.schema_version
+    ingest_source_descriptor.submitter_name = args.submitter_name
+    ingest_source_descriptor.submitter_email = args.submitter_email
+
+    summary = bulk_ingest(args.location, args.temp_dir, args.run_id, ingest_source_descriptor,
+                          max_workers=args.workers, pattern=args.pattern, log_level=log_level,
+                          output_jsonl=args.output_jsonl, checkpoint=args.checkpoint)
+    print(summary.report())
+    return 0 if not summary.failures else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,365 @@
+"""
+Staged ingest of CEDAR template instances: fetch -> decode -> read -> crosswalk -> store.
+
+Rather than retrieving, reading and crosswalking whole payloads one step after another, each instance moves through
+a StagedPipeline where every step has its own pool of workers and a bounded queue in front of it:
+
+    fetch       the undecoded json-ld from CedarAccess, a CedarMirror, a zip CedarArchive, or a local file (threads)
+    decode      json decode (threads)
+    read        the intermediate models, CedarToAccelCrosswalk.read_cedar_model (threads, or processes)
+    crosswalk   the accelerator model, CedarToAccelCrosswalk.translate_cedar_model (threads, or processes)
+    store       xcom temp file for the document (threads)
+
+A tar archive has no index, and reading its members out of order decompresses it again from the start, so it is read
+in one forward pass and its documents enter the pipeline already decoded, passing through fetch and decode. Requests
+to CEDAR overlap with reading and crosswalking, and only as many instances as the queues hold are in
+memory at once. The summary reports the throughput of each stage along with how long its workers waited for input
+(idle) or for room in the next queue (blocked), which points at the stage that limits the run.
+
+With a checkpoint, each stored document is recorded in a CheckpointJournal, and a run restarted with the same journal
+skips the instances already stored.
+
+usage: python -m accelerator_source_cedar.cedar_ingest_pipeline <folder guid, mirror, archive, directory or glob>
+        --temp-dir <dir> [--run-id <id>] [--checkpoint <journal>]
+"""
+
+import argparse
+import copy
+import json
+import logging
+import os
+import time
+
+from accelerator_core.utils.xcom_utils import DirectXcomPropsResolver, XcomUtils
+from accelerator_core.workflow.accel_source_ingest import IngestSourceDescriptor, IngestPayload
+
+from accelerator_source_cedar.accel_cedar.cedar_access import CedarAccess, base_url
+from accelerator_source_cedar.accel_cedar.cedar_archive import CedarArchive, is_archive_path
+from accelerator_source_cedar.accel_cedar.cedar_mirror import CedarMirror, MANIFEST_FILE
+from accelerator_source_cedar.accel_cedar.checkpoint_journal import CheckpointJournal
+from accelerator_source_cedar.accel_cedar.file_discovery import discover_files
+from accelerator_source_cedar.accel_cedar.process_result import ProcessResult
+from accelerator_source_cedar.accel_cedar.staged_pipeline import Stage, StagedPipeline
+from accelerator_source_cedar.accel_cedar_crosswalk import CedarToAccelCrosswalk
+from accelerator_source_cedar.cedar_bulk_ingest import BulkIngestSummary
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FETCH_WORKERS = 8
+
+# per worker process state for the read and crosswalk stages, set up by init_worker
+_worker_stages = None
+
+
+class IngestItem:
+    """
+    A CEDAR instance moving through the pipeline, each stage fills in its part and releases what is no longer needed
+    """
+
+    def __init__(self, item_id: str, source: str = ""):
+        self.item_id = item_id
+        self.source = source  # where the instance came from, for reporting
+        self.content = None  # undecoded json-ld
+        self.payload = None  # decoded json-ld
+        self.cedar_model = None  # intermediate models
+        self.document = None  # crosswalked document
+        self.location = ""  # where the document was stored
+
+
+class IngestPipelineSummary(BulkIngestSummary):
+    """
+    Outcome of a staged ingest, with the stats of each stage
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.stage_stats = []  # StageStats for each stage of the pipeline
+
+    def report(self) -> str:
+        lines = super().report().split("\n")
+        lines[1:1] = [f"  {stats.report()}" for stats in self.stage_stats]
+        return "\n".join(lines)
+
+
+class CedarIngestStages:
+    """
+    The functions of the stages, with the crosswalk and xcom utilities they share
+    """
+
+    def __init__(self, cedar_access, temp_files_location: str, run_id: str,
+                 ingest_source_descriptor: IngestSourceDescriptor, journal=None):
+        """
+        :param cedar_access: CedarAccess, CedarMirror or CedarArchive the instances are fetched from, or None when
+        the item ids are paths of local json files
+        :param temp_files_location: xcom temp files location that receives the crosswalked documents
+        :param run_id: run id used to group the temp files
+        :param ingest_source_descriptor: descriptor applied to each document, a copy per document gets its id
+        :param journal: optional CheckpointJournal that stored documents are recorded in
+        """
+        self.cedar_access = cedar_access
+        self.temp_files_location = temp_files_location
+        self.run_id = run_id
+        self.ingest_source_descriptor = ingest_source_descriptor
+        self.journal = journal
+        xcom_props_resolver = DirectXcomPropsResolver(temp_files_supported=True,
+                                                      temp_files_location=temp_files_location)
+        self.crosswalk = CedarToAccelCrosswalk(xcom_props_resolver)
+        self.xcom_utils = XcomUtils(xcom_props_resolver)
+
+    def fetch(self, item: IngestItem) -> IngestItem:
+        if item.payload is not None:
+            return item
+        if self.cedar_access is None:
+            with open(item.source, "rb") as json_data:
+                item.content = json_data.read()
+        else:
+            item.content = self.cedar_access.retrieve_resource_content(item.item_id)
+        return item
+
+    @staticmethod
+    def decode(item: IngestItem) -> IngestItem:
+        if item.content is None:
+            return item
+        item.payload = json.loads(item.content)
+        item.content = None
+        return item
+
+    def read(self, item: IngestItem) -> IngestItem:
+        item.cedar_model = self.crosswalk.read_cedar_model(item.payload)
+        return item
+
+    def translate(self, item: IngestItem) -> IngestItem:
+        ingest_source_descriptor = copy.copy(self.ingest_source_descriptor)
+        ingest_source_descriptor.ingest_item_id = item.item_id
+        item.document = self.crosswalk.translate_cedar_model(IngestPayload(ingest_source_descriptor), item.payload,
+                                                             item.cedar_model)
+        item.payload = None
+        item.cedar_model = None
+        return item
+
+    def store(self, item: IngestItem) -> IngestItem:
+        item.location = self.xcom_utils.store_dict_in_temp_file(item.item_id, item.document, self.run_id)
+        item.document = None
+        if self.journal is not None:
+            self.journal.record(item.item_id, item.location)
+        return item
+
+
+def init_worker(temp_files_location: str, run_id: str, ingest_source_descriptor: IngestSourceDescriptor,
+                log_level: int = logging.WARNING):
+    """
+    Set up the crosswalk once per worker process of the read and crosswalk stages
+    """
+    global _worker_stages
+
+    logging.getLogger().setLevel(log_level)
+    _worker_stages = CedarIngestStages(None, temp_files_location, run_id, ingest_source_descriptor)
+
+
+def read_in_worker(item: IngestItem) -> IngestItem:
+    return _worker_stages.read(item)
+
+
+def translate_in_worker(item: IngestItem) -> IngestItem:
+    return _worker_stages.translate(item)
+
+
+def build_pipeline(stages: CedarIngestStages, fetch_workers: int = DEFAULT_FETCH_WORKERS, read_workers: int = 1,
+                   crosswalk_workers: int = 1, store_workers: int = 2, processes: bool = False,
+                   log_level: int = logging.WARNING, queue_size: int = None) -> StagedPipeline:
+    """
+    :param stages: CedarIngestStages with the stage functions
+    :param fetch_workers: number of concurrent fetches
+    :param read_workers: number of read workers
+    :param crosswalk_workers: number of crosswalk workers
+    :param store_workers: number of concurrent stores
+    :param processes: run the read and crosswalk stages in worker processes, so they use more than one core. The
+    intermediate models are then pickled between the two stages, and a measures document index does not apply
+    :param log_level: logging level in the worker processes
+    :param queue_size: size of the queue in front of each stage, defaults to twice the workers of the stage
+    :return: StagedPipeline of IngestItem
+    """
+    if processes:
+        initargs = (stages.temp_files_location, stages.run_id, stages.ingest_source_descriptor, log_level)
+        read = Stage("read", read_in_worker, workers=read_workers, processes=True, initializer=init_worker,
+                     initargs=initargs, queue_size=queue_size)
+        translate = Stage("crosswalk", translate_in_worker, workers=crosswalk_workers, processes=True,
+                          initializer=init_worker, initargs=initargs, queue_size=queue_size)
+    else:
+        read = Stage("read", stages.read, workers=read_workers, queue_size=queue_size)
+        translate = Stage("crosswalk", stages.translate, workers=crosswalk_workers, queue_size=queue_size)
+
+    return StagedPipeline([
+        Stage("fetch", stages.fetch, workers=fetch_workers, queue_size=queue_size),
+        Stage("decode", stages.decode, queue_size=queue_size),
+        read,
+        translate,
+        Stage("store", stages.store, workers=store_workers, queue_size=queue_size),
+    ])
+
+
+def ingest_pipeline(items, cedar_access, temp_files_location: str, run_id: str,
+                    ingest_source_descriptor: IngestSourceDescriptor, fetch_workers: int = DEFAULT_FETCH_WORKERS,
+                    read_workers: int = 1, crosswalk_workers: int = 1, store_workers: int = 2,
+                    processes: bool = False, checkpoint: str = None,
+                    log_level: int = logging.WARNING, queue_size: int = None) -> IngestPipelineSummary:
+    """
+    Fetch, read, crosswalk and store CEDAR instances in a staged pipeline
+    :param items: iterable of instance ids (guids or @ids, or ids in an archive), or of local json file paths when
+    cedar_access is None, or of (id, document) tuples of documents already read, such as CedarArchive.items(). It
+    is read lazily, so it may be a folder listing that is still being paged
+    :param cedar_access: CedarAccess (with a pool_size of at least fetch_workers), CedarMirror or CedarArchive, or
+    None to read local json files
+    :param temp_files_location: xcom temp files location that receives the crosswalked documents
+    :param run_id: run id used to group the temp files
+    :param ingest_source_descriptor: descriptor applied to each document, with the ingest_item_id of the document
+    :param fetch_workers: number of concurrent fetches
+    :param read_workers: number of read workers
+    :param crosswalk_workers: number of crosswalk workers
+    :param store_workers: number of concurrent stores
+    :param processes: run the read and crosswalk stages in worker processes, see build_pipeline
+    :param checkpoint: path of a CheckpointJournal, instances already recorded there are skipped, and stored
+    documents are recorded as they finish
+    :param log_level: logging level in the worker processes
+    :param queue_size: size of the queue in front of each stage, defaults to twice the workers of the stage
+    :return: IngestPipelineSummary
+    """
+    summary = IngestPipelineSummary()
+    journal = CheckpointJournal(checkpoint) if checkpoint else None
+
+    try:
+        stages = CedarIngestStages(cedar_access, temp_files_location, run_id, ingest_source_descriptor, journal=journal)
+        pipeline = build_pipeline(stages, fetch_workers=fetch_workers, read_workers=read_workers,
+                                  crosswalk_workers=crosswalk_workers, store_workers=store_workers,
+                                  processes=processes, log_level=log_level, queue_size=queue_size)
+
+        start = time.perf_counter()
+        for item in pipeline.run(_pending(items, cedar_access, journal, summary)):
+            summary.total += 1
+            summary.succeeded += 1
+        for error in pipeline.errors:
+            summary.total += 1
+            summary.failures.append(_failed_result(error))
+        summary.elapsed_seconds = time.perf_counter() - start
+        summary.stage_stats = pipeline.stats
+    finally:
+        if journal:
+            journal.close()
+
+    logger.info(summary.report())
+    return summary
+
+
+def _pending(items, cedar_access, journal: CheckpointJournal, summary: IngestPipelineSummary):
+    for entry in items:
+        document = None
+        if isinstance(entry, tuple):
+            # a document already read, with its id
+            item_id, document = entry
+        elif cedar_access is None:
+            item_id = os.path.splitext(os.path.basename(entry))[0]
+        elif isinstance(cedar_access, (CedarAccess, CedarMirror)):
+            # folder listings give the @id url, the guid names the stored document
+            item_id = CedarAccess.guid_or_identity(entry)
+        else:
+            # an archive id is the member name, used as is
+            item_id = entry
+        if journal and journal.is_complete(item_id):
+            summary.skipped += 1
+            continue
+        item = IngestItem(item_id, item_id if document is not None else entry)
+        item.payload = document
+        yield item
+
+
+def _failed_result(error) -> ProcessResult:
+    result = ProcessResult()
+    result.id = error.item.item_id
+    result.template_source = error.item.source
+    result.success = False
+    result.message = error.message
+    result.errors.append(f"error in {error.stage} of {error.item.source}: {error.message}")
+    result.traceback = error.traceback
+    return result
+
+
+def open_source(location: str, params: dict = None, pattern: str = "*.json", page_size: int = 100,
+                pool_size: int = DEFAULT_FETCH_WORKERS):
+    """
+    Work out where a location reads instances from
+    :param location: a CEDAR folder guid (when params is given), a CEDAR mirror directory, a zip or tar(.gz)
+    archive, or a directory or glob pattern of json files
+    :param params: CedarAccess params, for a CEDAR folder
+    :param pattern: file name pattern used when location is a directory or an archive
+    :param page_size: folder listing page size, for a CEDAR folder
+    :param pool_size: number of pooled connections, for a CEDAR folder
+    :return: tuple of the CedarAccess, CedarMirror, CedarArchive or None, and an iterable of the items, for a tar
+    archive the (id, document) tuples of a single forward pass through it
+    """
+    if params is not None:
+        cedar_access = CedarAccess(params, pool_size=pool_size)
+        return cedar_access, (item.folder_id for item in cedar_access.iter_folder_contents(location, page_size)
+                              if item.item_type != "folder")
+    if os.path.isfile(os.path.join(location, MANIFEST_FILE)):
+        mirror = CedarMirror(location)
+        # instances that failed to download are listed in the manifest but are not in the mirror
+        return mirror, [instance_guid for instance_guid in mirror.manifest["instances"] if instance_guid in mirror]
+    if is_archive_path(location) and os.path.isfile(location):
+        archive = CedarArchive(location, pattern)
+        return archive, archive.ids() if archive.is_zip else archive.items()
+    return None, discover_files(location, pattern)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Staged ingest of CEDAR instances: fetch, decode, read, "
+                                                 "crosswalk and store")
+    parser.add_argument("location", help="CEDAR folder guid (with --cedar), CEDAR mirror directory, zip or tar(.gz) "
+                                         "archive, or directory (walked recursively) or glob pattern of json files")
+    parser.add_argument("--temp-dir", required=True, help="xcom temp files location for the crosswalked documents")
+    parser.add_argument("--run-id", default="ingest_pipeline", help="run id used to group the temp files")
+    parser.add_argument("--cedar", action="store_true", help="location is a CEDAR folder guid, read with the API")
+    parser.add_argument("--api-key", default=None, help="CEDAR api key, by default read from CEDAR_API_KEY")
+    parser.add_argument("--endpoint", default=base_url)
+    parser.add_argument("--fetch-workers", type=int, default=DEFAULT_FETCH_WORKERS)
+    parser.add_argument("--read-workers", type=int, default=1)
+    parser.add_argument("--crosswalk-workers", type=int, default=1)
+    parser.add_argument("--store-workers", type=int, default=2)
+    parser.add_argument("--processes", action="store_true", help="read and crosswalk in worker processes")
+    parser.add_argument("--checkpoint", default=None,
+                        help="checkpoint journal, stored documents are recorded and skipped when resuming")
+    parser.add_argument("--pattern", default="*.json", help="file name pattern when walking a directory or archive")
+    parser.add_argument("--ingest-type", default="cedar")
+    parser.add_argument("--schema-version", default="1.0.2")
+    parser.add_argument("--submitter-name", default="")
+    parser.add_argument("--submitter-email", default="")
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args(argv)
+
+    log_level = logging.getLevelName(args.log_level.upper())
+    logging.getLogger().setLevel(log_level)
+
+    ingest_source_descriptor = IngestSourceDescriptor()
+    ingest_source_descriptor.ingest_type = args.ingest_type
+    ingest_source_descriptor.ingest_identifier = args.run_id
+    ingest_source_descriptor.schema_version = args.schema_version
+    ingest_source_descriptor.submitter_name = args.submitter_name
+    ingest_source_descriptor.submitter_email = args.submitter_email
+
+    params = None
+    if args.cedar:
+        params = {"cedar_endpoint": args.endpoint}
+        if args.api_key:
+            params["api_key"] = args.api_key
+    cedar_access, items = open_source(args.location, params, args.pattern, pool_size=args.fetch_workers)
+
+    summary = ingest_pipeline(items, cedar_access, args.temp_dir, args.run_id, ingest_source_descriptor,
+                              fetch_workers=args.fetch_workers, read_workers=args.read_workers,
+                              crosswalk_workers=args.crosswalk_workers, store_workers=args.store_workers,
+                              processes=args.processes, checkpoint=args.checkpoint,
+                              log_level=log_level)
+    print(summary.report())
+    return 0 if not summary.failures else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,69 @@
+"""
+Time spent in each layer of the crosswalk of CEDAR 1.5.2 documents: reading the json-ld into the intermediate
+models (read_cedar_model), and translating the intermediate models into the accelerator models and document
+(translate_cedar_model), on the 1.5.2 geoexposure and population test fixtures. A path that skips a layer can at best
+save that layer's share of the time.
+
+usage: python -m benchmarks.benchmark_crosswalk_layers [--documents 2000]
+"""
+
+import argparse
+import copy
+import json
+import tempfile
+import time
+from pathlib import Path
+
+from accelerator_core.utils.xcom_utils import DirectXcomPropsResolver
+from accelerator_core.workflow.accel_data_models import IngestSourceDescriptor, IngestPayload
+
+from accelerator_source_cedar.accel_cedar_crosswalk import CedarToAccelCrosswalk
+
+TEST_RESOURCES_DIR = Path(__file__).resolve().parent.parent / "tests" / "test_resources"
+FIXTURES = ("geoexposure_data_152.json", "pop_data_152.json")
+
+
+def build_documents(count):
+    fixtures = []
+    for fixture in FIXTURES:
+        with open(TEST_RESOURCES_DIR / fixture, 'r') as f:
+            fixtures.append(json.loads(f.read()))
+    return [copy.deepcopy(fixtures[i % len(fixtures)]) for i in range(count)]
+
+
+def layer_seconds(documents):
+    xcom_props_resolver = DirectXcomPropsResolver(temp_files_supported=True,
+                                                  temp_files_location=tempfile.mkdtemp(prefix="cedar-layers-"))
+    crosswalk = CedarToAccelCrosswalk(xcom_props_resolver)
+    ingest_source_descriptor = IngestSourceDescriptor()
+    ingest_source_descriptor.ingest_item_id = "benchmark"
+    ingest_payload = IngestPayload(ingest_source_descriptor)
+
+    read_seconds = translate_seconds = 0.0
+    for document in documents:
+        start = time.perf_counter()
+        cedar_model = crosswalk.read_cedar_model(document)
+        read_end = time.perf_counter()
+        crosswalk.translate_cedar_model(ingest_payload, document, cedar_model)
+        translate_seconds += time.perf_counter() - read_end
+        read_seconds += read_end - start
+    return read_seconds, translate_seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=2000)
+    args = parser.parse_args()
+
+    documents = build_documents(args.documents)
+    read_seconds, translate_seconds = layer_seconds(documents)
+    total = read_seconds + translate_seconds
+
+    print(f"documents:      {len(documents)}")
+    print(f"throughput:     {len(documents) / total:.0f} documents/s")
+    print(f"read:           {read_seconds:.2f}s ({read_seconds / total:.0%})")
+    print(f"translate:      {translate_seconds:.2f}s ({translate_seconds / total:.0%})")
+
+
+if __name__ == "__main__":
+    main()
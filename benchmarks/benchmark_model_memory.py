@@ -0,0 +1,55 @@
+"""
+Memory benchmark of the intermediate models, measuring with tracemalloc the bytes per parsed document (resource,
+project, program, submission and a geospatial, population and key dataset model) for the slotted models, and for
+the same models with a per-instance __dict__ as they were before.
+
+usage: python -m benchmarks.benchmark_model_memory [--documents 10000]
+"""
+
+import argparse
+import gc
+import tracemalloc
+
+from accelerator_source_cedar.accel_cedar.cedar_intermediate_model import PcorIntermediateResourceModel, \
+    PcorIntermediateProjectModel, PcorIntermediateProgramModel, PcorSubmissionInfoModel, \
+    PcorGeospatialDataResourceModel, PcorPopDataResourceModel, PcorKeyDatasetModel
+
+DOCUMENT_MODELS = (PcorIntermediateResourceModel, PcorIntermediateProjectModel, PcorIntermediateProgramModel,
+                   PcorSubmissionInfoModel, PcorGeospatialDataResourceModel, PcorPopDataResourceModel,
+                   PcorKeyDatasetModel)
+
+
+def unslotted(model_class):
+    """
+    :return: a class with the same __init__ as a model, but with a per-instance __dict__
+    """
+    return type(model_class.__name__ + "Dict", (), {"__init__": model_class.__init__})
+
+
+def bytes_per_document(model_classes, documents):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    held = [[model_class() for model_class in model_classes] for _ in range(documents)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del held
+    return (after - before) / documents
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=10000)
+    args = parser.parse_args()
+
+    dict_bytes = bytes_per_document([unslotted(model_class) for model_class in DOCUMENT_MODELS], args.documents)
+    slotted_bytes = bytes_per_document(DOCUMENT_MODELS, args.documents)
+
+    print(f"documents:        {args.documents}")
+    print(f"with __dict__:    {dict_bytes:.0f} bytes/document")
+    print(f"with __slots__:   {slotted_bytes:.0f} bytes/document")
+    print(f"saved:            {1 - slotted_bytes / dict_bytes:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Microbenchmark of PcorTemplateParser.sanitize_column, comparing the single pass sanitizer with the chain of re.sub
+calls it replaced, on a mix of repetitive controlled vocabulary values and longer free text.
+
+usage: python -m benchmarks.benchmark_sanitize_column [--values 200000] [--repeat 5]
+"""
+
+import argparse
+import math
+import random
+import re
+import time
+
+from accelerator_source_cedar.accel_cedar.template_parser import PcorTemplateParser
+
+VOCABULARY = ["Air Quality", "Water Quality", "Social Determinants", "Climate", "Open Access", "none", "Yes", "No",
+              "• Daily", "Annual\t", "County\xa0", "Census Tract", "Other", "Point", "Polygon"]
+
+
+def legacy_sanitize_column(value, escape_new_line=True):
+    """
+    sanitize_column as it was, with a re.sub per substitution
+    """
+    if isinstance(value, str):
+        if value.lower() == 'none':
+            return None
+        if not value:
+            return None
+        value = re.sub(r'[•●]\s+', '', value)
+        if escape_new_line:
+            value = re.sub(r'\n', ' ', value)
+        value = re.sub(r'\t', " ", value)
+        value = value.replace('\xa0', ' ')
+        return value.strip().replace('"', '')
+    if isinstance(value, float):
+        if math.isnan(value):
+            return None
+        else:
+            return str(value)
+    return value
+
+
+def build_values(count):
+    random.seed(42)
+    values = []
+    for i in range(count):
+        if i % 10 == 0:
+            values.append(f"A longer \"description\" of resource {i}\nwith a second line\tand a tab " * 3)
+        else:
+            values.append(random.choice(VOCABULARY))
+    return values
+
+
+def time_it(function, values, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for value in values:
+            function(value)
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--values", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    values = build_values(args.values)
+    legacy = time_it(legacy_sanitize_column, values, args.repeat)
+    single_pass = time_it(PcorTemplateParser.sanitize_column, values, args.repeat)
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        PcorTemplateParser.sanitize_columns(values)
+    batch = (time.perf_counter() - start) / args.repeat
+
+    print(f"values:       {len(values)}")
+    print(f"legacy:       {legacy * 1000:.1f} ms ({legacy / len(values) * 1e9:.0f} ns/value)")
+    print(f"single pass:  {single_pass * 1000:.1f} ms ({single_pass / len(values) * 1e9:.0f} ns/value)")
+    print(f"batch:        {batch * 1000:.1f} ms ({batch / len(values) * 1e9:.0f} ns/value)")
+    print(f"speedup:      {legacy / single_pass:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
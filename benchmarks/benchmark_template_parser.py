@@ -0,0 +1,89 @@
+"""
+Benchmark extracting the sections of a large spreadsheet template, comparing the one pass TemplateSectionIndex with
+the row by row scan (find the marker, then scan with iat until the terminator) that each extractor used to do.
+
+usage: python -m benchmarks.benchmark_template_parser [--filler-rows 5000] [--repeat 5]
+"""
+
+import argparse
+import logging
+import time
+
+import pandas as pd
+
+from accelerator_source_cedar.accel_cedar.template_parser import PcorTemplateParser, SECTION_TERMINATORS, \
+    TemplateSectionIndex
+
+
+def build_template(filler_rows):
+    """
+    A template with the usual sections, each padded with filler rows
+    """
+    sections = [
+        ("Submitter", [("submitter_name", "Jane Curator"), ("submitter_email", "jane@example.com")]),
+        ("Program", [("program_name", "CAFE")]),
+        ("Project", [("project_GUID", "project-guid"), ("project_name", "Project"), ("ProjectCode", "PRJ")]),
+        ("Resource", [("resource_GUID", "resource-guid"), ("resource_name", "Resource"), ("keywords", "a, b")]),
+        ("Data_Resource", [("comments", "data resource")]),
+    ]
+    rows = []
+    for marker, fields in sections:
+        rows.append((marker, None))
+        rows.extend((f"filler_{i}", f"value {i}") for i in range(filler_rows))
+        rows.extend(fields)
+    return pd.DataFrame(rows, columns=["key", "value"])
+
+
+def legacy_scan(template_df):
+    """
+    The scan the extractors did before the section index, once per section
+    """
+    ss_rows = template_df.shape[0]
+    found = {}
+    for section, terminators in SECTION_TERMINATORS.items():
+        fields = {}
+        for i in range(ss_rows):
+            if template_df.iat[i, 0] == section:
+                for j in range(i, ss_rows):
+                    if template_df.iat[j, 0] in terminators:
+                        found[section] = fields
+                        break
+                    fields[template_df.iat[j, 0]] = template_df.iat[j, 1]
+                break
+    return found
+
+
+def indexed_extract(template_df):
+    index = TemplateSectionIndex.from_dataframe(template_df)
+    PcorTemplateParser.extract_submission_data(index)
+    PcorTemplateParser.extract_program_data(index)
+    PcorTemplateParser.extract_project_data(index)
+    PcorTemplateParser.extract_resource_data(index)
+
+
+def time_it(function, template_df, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function(template_df)
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filler-rows", type=int, default=5000, help="filler rows in each section")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    template_df = build_template(args.filler_rows)
+
+    legacy = time_it(legacy_scan, template_df, args.repeat)
+    indexed = time_it(indexed_extract, template_df, args.repeat)
+    print(f"rows: {template_df.shape[0]}")
+    print(f"legacy scan:    {legacy * 1000:.1f} ms")
+    print(f"section index:  {indexed * 1000:.1f} ms")
+    print(f"speedup:        {legacy / indexed:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
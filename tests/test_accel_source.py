@@ -1,11 +1,15 @@
 import os
 import shutil
+import tempfile
 import unittest
 
 from accelerator_core.utils.xcom_utils import DirectXcomPropsResolver
-from accelerator_core.workflow.accel_data_models import IngestSourceDescriptor, IngestPayload
+from accelerator_core.workflow.accel_data_models import IngestSourceDescriptor, IngestPayload, SynchType
 
+from accelerator_source_cedar.accel_cedar.cedar_access import CedarAccess
+from accelerator_source_cedar.accel_cedar.cedar_mirror import CedarMirror
 from accelerator_source_cedar.cedar_accel_source import CedarAccelSource
+from tests.test_cedar_mirror import FolderTreeSession, ROOT_FOLDER, instance_guid
 
 
 class TestCedarAccelSource(unittest.TestCase):
@@ -51,6 +55,120 @@ class TestCedarAccelSource(unittest.TestCase):
         self.assertTrue(actual.ingest_successful)
         self.assertTrue(len(actual.payload) == 1)
 
+    def test_ingest_many(self):
+        temp_dirs_path = "test_resources/temp_dirs"
+        runid = "test_ingest_many"
+        item_id = self.__class__.item_id
+        path = os.path.join(temp_dirs_path, runid)
+
+        if os.path.exists(path):
+            shutil.rmtree(path)
+
+        json_paths = [os.path.join("test_resources", "key_dataset1.json"),
+                      os.path.join("test_resources", "not_there.json"),
+                      os.path.join("test_resources", "pop_data.json")]
+
+        xcom_props_resolver = DirectXcomPropsResolver(temp_files_supported=True, temp_files_location=temp_dirs_path)
+
+        ingestSourceDescriptor = IngestSourceDescriptor()
+        ingestSourceDescriptor.ingest_type = "cedar"
+        ingestSourceDescriptor.ingest_item_id = item_id
+        ingestSourceDescriptor.ingest_identifier = runid
+        ingestSourceDescriptor.submitter_name = "My Name"
+        ingestSourceDescriptor.submitter_email = "email@email.com"
+
+        cedar_accel_source = CedarAccelSource(ingestSourceDescriptor, xcom_props_resolver)
+
+        params = { 'api_key': self.__class__.api_key, 'run_id': runid, 'FILE': True, 'MAX_WORKERS': 2 }
+
+        actual = cedar_accel_source.ingest_many(json_paths, params)
+        self.assertEqual(3, len(actual))
+        self.assertTrue(actual[0].ingest_successful)
+        self.assertFalse(actual[1].ingest_successful)
+        self.assertTrue(actual[2].ingest_successful)
+        self.assertEqual(1, len(cedar_accel_source.ingest_failures))
+        self.assertEqual(json_paths[1], cedar_accel_source.ingest_failures[0].id)
+        # payloads do not share the component's descriptor
+        self.assertIsNot(actual[0].ingest_source_descriptor, actual[2].ingest_source_descriptor)
+        self.assertIsNot(ingestSourceDescriptor, actual[0].ingest_source_descriptor)
+
+    def test_ingest_from_mirror(self):
+        mirror_dir = tempfile.mkdtemp(prefix="cedar-mirror-")
+        cedar_access = CedarAccess({"api_key": self.__class__.api_key,
+                                    "cedar_endpoint": "https://resource.metadatacenter.org"})
+        cedar_access.session = FolderTreeSession()
+        CedarMirror(mirror_dir).mirror(cedar_access, ROOT_FOLDER)
+
+        xcom_props_resolver = DirectXcomPropsResolver(temp_files_supported=False, temp_files_location=None)
+
+        ingestSourceDescriptor = IngestSourceDescriptor()
+        ingestSourceDescriptor.ingest_type = "cedar"
+        ingestSourceDescriptor.ingest_item_id = self.__class__.item_id
+        ingestSourceDescriptor.ingest_identifier = "test_ingest_from_mirror"
+
+        cedar_accel_source = CedarAccelSource(ingestSourceDescriptor, xcom_props_resolver)
+
+        params = {'MIRROR': mirror_dir}
+
+        actual = cedar_accel_source.synch(SynchType.SOURCE.value, ROOT_FOLDER, params)
+        self.assertEqual(3, len(actual))
+        # payloads do not share the component's descriptor
+        self.assertIsNot(actual[0].ingest_source_descriptor, actual[1].ingest_source_descriptor)
+        self.assertIsNot(ingestSourceDescriptor, actual[0].ingest_source_descriptor)
+
+        actual = cedar_accel_source.ingest_single(instance_guid(4), params)
+        self.assertTrue(actual.ingest_successful)
+        self.assertEqual(1, len(actual.payload))
+
+        # the mirror is opened once and reused until the source is closed
+        mirror = cedar_accel_source.build_cedar_access(params)
+        self.assertIsInstance(mirror, CedarMirror)
+        self.assertIs(mirror, cedar_accel_source.build_cedar_access(params))
+        cedar_accel_source.close()
+        self.assertIsNot(mirror, cedar_accel_source.build_cedar_access(params))
+
+    def test_synch_checkpoint(self):
+        mirror_dir = tempfile.mkdtemp(prefix="cedar-mirror-")
+        cedar_access = CedarAccess({"api_key": self.__class__.api_key,
+                                    "cedar_endpoint": "https://resource.metadatacenter.org"})
+        cedar_access.session = FolderTreeSession()
+        CedarMirror(mirror_dir).mirror(cedar_access, ROOT_FOLDER)
+        journal_path = os.path.join(mirror_dir, "synch.journal")
+
+        xcom_props_resolver = DirectXcomPropsResolver(temp_files_supported=False, temp_files_location=None)
+
+        ingestSourceDescriptor = IngestSourceDescriptor()
+        ingestSourceDescriptor.ingest_type = "cedar"
+        ingestSourceDescriptor.ingest_item_id = self.__class__.item_id
+        ingestSourceDescriptor.ingest_identifier = "test_synch_checkpoint"
+
+        cedar_accel_source = CedarAccelSource(ingestSourceDescriptor, xcom_props_resolver)
+
+        params = {'MIRROR': mirror_dir, 'CHECKPOINT': journal_path}
+
+        # listing the folder does not mark anything complete
+        actual = cedar_accel_source.synch(SynchType.SOURCE.value, ROOT_FOLDER, params)
+        self.assertEqual(3, len(actual))
+        actual = cedar_accel_source.synch(SynchType.SOURCE.value, ROOT_FOLDER, params)
+        self.assertEqual(3, len(actual))
+
+        # once the store step records an item, by its full @id or its guid, a resumed synch skips it
+        stored_ids = [actual[0].payload[0]["id"], CedarAccess.guid_or_identity(actual[1].payload[0]["id"])]
+        cedar_accel_source.record_complete(stored_ids[:1], "stored/0.json", params)
+        cedar_accel_source.record_complete(stored_ids[1:], "stored/1.json", params)
+
+        actual = cedar_accel_source.synch(SynchType.SOURCE.value, ROOT_FOLDER, params)
+        self.assertEqual(1, len(actual))
+        self.assertNotIn(CedarAccess.guid_or_identity(actual[0].payload[0]["id"]),
+                         [CedarAccess.guid_or_identity(stored_id) for stored_id in stored_ids])
+
+        # a new source reads the records back from the journal file
+        cedar_accel_source.close()
+        resumed_source = CedarAccelSource(ingestSourceDescriptor, xcom_props_resolver)
+        actual = resumed_source.synch(SynchType.SOURCE.value, ROOT_FOLDER, params)
+        self.assertEqual(1, len(actual))
+        resumed_source.close()
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,60 @@
+import os
+import tempfile
+import unittest
+import zipfile
+from pathlib import Path
+
+from accelerator_core.workflow.accel_data_models import IngestSourceDescriptor
+
+from accelerator_source_cedar.cedar_bulk_ingest import bulk_ingest, discover_json_files
+
+
+class TestBulkIngest(unittest.TestCase):
+    TESTS_DIR = Path(__file__).resolve().parent
+    TEST_RESOURCES_DIR = TESTS_DIR / "test_resources"
+
+    def test_discover_json_files_glob(self):
+        actual = sorted(discover_json_files(str(self.TEST_RESOURCES_DIR / "key_dataset*.json")))
+        self.assertEqual(3, len(actual))
+
+    def test_bulk_ingest(self):
+        temp_dirs_path = tempfile.mkdtemp(prefix="cedar-bulk-ingest-")
+        runid = "test_bulk_ingest"
+
+        ingest_source_descriptor = IngestSourceDescriptor()
+        ingest_source_descriptor.ingest_type = "cedar"
+        ingest_source_descriptor.ingest_identifier = runid
+        ingest_source_descriptor.submitter_name = "submitter name"
+        ingest_source_descriptor.submitter_email = "submitter@email"
+        ingest_source_descriptor.schema_version = "1.0.2"
+
+        location = str(self.TEST_RESOURCES_DIR / "*_152.json")
+        actual = bulk_ingest(location, temp_dirs_path, runid, ingest_source_descriptor, max_workers=2)
+
+        self.assertEqual(2, actual.total)
+        self.assertEqual(2, actual.succeeded)
+        self.assertEqual([], actual.failures)
+        self.assertTrue(os.listdir(os.path.join(temp_dirs_path, runid)))
+
+    def test_bulk_ingest_archive(self):
+        temp_dirs_path = tempfile.mkdtemp(prefix="cedar-bulk-ingest-")
+        runid = "test_bulk_ingest_archive"
+
+        ingest_source_descriptor = IngestSourceDescriptor()
+        ingest_source_descriptor.ingest_type = "cedar"
+        ingest_source_descriptor.ingest_identifier = runid
+        ingest_source_descriptor.schema_version = "1.0.2"
+
+        location = os.path.join(temp_dirs_path, "exports.zip")
+        with zipfile.ZipFile(location, "w") as archive:
+            for name in ("geoexposure_data_152.json", "pop_data_152.json"):
+                archive.write(self.TEST_RESOURCES_DIR / name, name)
+
+        actual = bulk_ingest(location, temp_dirs_path, runid, ingest_source_descriptor, max_workers=2)
+
+        self.assertEqual(2, actual.total)
+        self.assertEqual(2, actual.succeeded)
+
+
+if __name__ == '__main__':
+    unittest.main()
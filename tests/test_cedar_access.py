@@ -0,0 +1,92 @@
+import json
+import unittest
+from urllib.parse import parse_qs, urlparse
+
+from accelerator_source_cedar.accel_cedar.cedar_access import CedarAccess
+
+
+class PagedFolderResponse:
+
+    def __init__(self, json_dict):
+        self.status_code = 200
+        self.json_dict = json_dict
+
+    def json(self):
+        return self.json_dict
+
+    @property
+    def content(self):
+        return json.dumps(self.json_dict).encode("utf-8")
+
+
+class PagedFolderSession:
+    """
+    Stands in for the requests session, serving a folder listing of total_count documents one page at a time
+    """
+
+    def __init__(self, total_count):
+        self.total_count = total_count
+        self.requests = []
+
+    def get(self, api_url, headers=None):
+        query = parse_qs(urlparse(api_url).query)
+        offset = int(query["offset"][0])
+        limit = int(query["limit"][0])
+        self.requests.append((offset, limit))
+        resources = [{"schema:name": f"doc {i}", "@id": f"id-{i}", "resourceType": "instance"}
+                     for i in range(offset, min(offset + limit, self.total_count))]
+        return PagedFolderResponse({"totalCount": self.total_count, "resources": resources,
+                                    "pathInfo": [{"schema:name": "folder", "@id": "folder-id"}]})
+
+
+class TestCedarAccess(unittest.TestCase):
+
+    def test_iter_folder_contents_pages(self):
+        cedar_access = CedarAccess({"api_key": "hithere", "cedar_endpoint": "https://resource.metadatacenter.org"})
+        cedar_access.session = PagedFolderSession(25)
+
+        actual = list(cedar_access.iter_folder_contents("folder-id", page_size=10))
+
+        self.assertEqual(25, len(actual))
+        self.assertEqual("id-24", actual[24].folder_id)
+        self.assertEqual([(0, 10), (10, 10), (20, 10)], cedar_access.session.requests)
+
+    def test_iter_folder_contents_exact_page(self):
+        cedar_access = CedarAccess({"api_key": "hithere", "cedar_endpoint": "https://resource.metadatacenter.org"})
+        cedar_access.session = PagedFolderSession(20)
+
+        actual = list(cedar_access.iter_folder_contents("folder-id", page_size=10))
+
+        self.assertEqual(20, len(actual))
+        self.assertEqual(2, len(cedar_access.session.requests))
+
+    def test_retrieve_resource_content(self):
+        responses = []
+
+        class ResourceSession:
+            def get(self, api_url, headers=None):
+                return responses.pop(0)
+
+        cedar_access = CedarAccess({"api_key": "hithere", "cedar_endpoint": "https://resource.metadatacenter.org"})
+        cedar_access.session = ResourceSession()
+        responses.append(PagedFolderResponse({"@id": "instance-id"}))
+
+        self.assertEqual({"@id": "instance-id"}, json.loads(cedar_access.retrieve_resource_content("instance-id")))
+
+        not_found = PagedFolderResponse({"errorMessage": "not found"})
+        not_found.status_code = 404
+        responses.append(not_found)
+        with self.assertRaisesRegex(Exception, "not found"):
+            cedar_access.retrieve_resource_content("instance-id")
+
+    def test_guid_or_identity(self):
+        guid = "0a1b2c3d-1234-5678-9abc-0123456789ab"
+
+        self.assertEqual(guid, CedarAccess.guid_or_identity(guid))
+        self.assertEqual(guid, CedarAccess.guid_or_identity(
+            f"https://repo.metadatacenter.org/template-instances/{guid}"))
+        self.assertEqual("archive/instance.json", CedarAccess.guid_or_identity("archive/instance.json"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import json
+import os
+import tarfile
+import tempfile
+import unittest
+import zipfile
+from pathlib import Path
+
+from accelerator_source_cedar.accel_cedar.cedar_archive import CedarArchive, is_archive_path
+
+
+class TestCedarArchive(unittest.TestCase):
+    TESTS_DIR = Path(__file__).resolve().parent
+    TEST_RESOURCES_DIR = TESTS_DIR / "test_resources"
+    NAMES = ("key_dataset1", "geospatial1", "pop_data_152")
+
+    @classmethod
+    def setUpClass(cls):
+        cls.documents = {}
+        for name in cls.NAMES:
+            with open(cls.TEST_RESOURCES_DIR / f"{name}.json", 'r') as f:
+                cls.documents[name] = json.load(f)
+
+    def write_archive(self, file_name):
+        archive_path = os.path.join(tempfile.mkdtemp(prefix="cedar-archive-"), file_name)
+        if file_name.endswith(".zip"):
+            with zipfile.ZipFile(archive_path, "w", zipfile.ZIP_DEFLATED) as archive:
+                archive.writestr("export/README.txt", "not an instance")
+                for name in self.NAMES:
+                    archive.write(self.TEST_RESOURCES_DIR / f"{name}.json", f"export/{name}.json")
+        else:
+            with tarfile.open(archive_path, "w:gz") as archive:
+                archive.add(self.TEST_RESOURCES_DIR / "pop_data.json", "export/notes/README.txt")
+                for name in self.NAMES:
+                    archive.add(self.TEST_RESOURCES_DIR / f"{name}.json", f"export/{name}.json")
+        return archive_path
+
+    def test_is_archive_path(self):
+        self.assertTrue(is_archive_path("exports.zip"))
+        self.assertTrue(is_archive_path("exports.tar.gz"))
+        self.assertTrue(is_archive_path("exports.tgz"))
+        self.assertFalse(is_archive_path("exports.jsonl.gz"))
+
+    def test_sequential(self):
+        for file_name in ("exports.zip", "exports.tar.gz"):
+            with self.subTest(file_name=file_name):
+                archive = CedarArchive(self.write_archive(file_name))
+                actual = dict(archive.items())
+                self.assertEqual(self.documents, actual)
+
+    def test_random_access(self):
+        for file_name in ("exports.zip", "exports.tar.gz"):
+            with self.subTest(file_name=file_name):
+                with CedarArchive(self.write_archive(file_name)) as archive:
+                    self.assertEqual(3, len(archive))
+                    self.assertIn("geospatial1", archive)
+                    self.assertNotIn("README", archive)
+                    # out of archive order
+                    for name in reversed(self.NAMES):
+                        self.assertEqual(self.documents[name], archive.retrieve_resource(name))
+                        self.assertEqual(self.documents[name], json.loads(archive.retrieve_resource_content(name)))
+                    with self.assertRaises(KeyError):
+                        archive.get("not_there")
+
+    def test_duplicate_ids(self):
+        archive_path = os.path.join(tempfile.mkdtemp(prefix="cedar-archive-"), "exports.zip")
+        with zipfile.ZipFile(archive_path, "w") as archive:
+            archive.write(self.TEST_RESOURCES_DIR / "geospatial1.json", "a/geospatial1.json")
+            archive.write(self.TEST_RESOURCES_DIR / "key_dataset1.json", "b/geospatial1.json")
+
+        with CedarArchive(archive_path) as archive:
+            with self.assertRaisesRegex(Exception, "more than one instance with id geospatial1"):
+                archive.ids()
+            with self.assertRaisesRegex(Exception, "more than one instance with id geospatial1"):
+                list(archive.items())
+
+
+if __name__ == '__main__':
+    unittest.main()
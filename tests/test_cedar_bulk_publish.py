@@ -0,0 +1,120 @@
+import threading
+import unittest
+from urllib.parse import parse_qs, urlparse
+
+from accelerator_source_cedar.accel_cedar.cedar_access import CedarAccess
+from accelerator_source_cedar.accel_cedar.cedar_bulk_publish import publish_resources
+from accelerator_source_cedar.accel_cedar.process_result import ProcessResult
+from accelerator_source_cedar.accel_cedar.rate_limiter import RateLimiter
+from tests.test_cedar_access import PagedFolderResponse
+from tests.test_cedar_template_processor import make_model_data
+
+POPULATION_TEMPLATE_NAME = "Population_Data_1.5.1_CDC_Behavior_Risk_Factor_Surveillance_Sys_BRFSS"
+
+
+class FailedResponse(PagedFolderResponse):
+
+    def __init__(self, json_dict):
+        super().__init__(json_dict)
+        self.status_code = 400
+
+
+class PublishSession:
+    """
+    Stands in for the requests session, accepting template instance creates and renames
+    """
+
+    def __init__(self, failing_names=()):
+        # instances with these schema:name values are rejected
+        self.failing_names = set(failing_names)
+        self.created = []
+        self.renamed = []
+        self._lock = threading.Lock()
+
+    def post(self, api_url, headers=None, json=None):
+        parsed = urlparse(api_url)
+        with self._lock:
+            if parsed.path.endswith("/template-instances"):
+                if json["schema:name"] in self.failing_names:
+                    return FailedResponse({"errorMessage": "invalid instance"})
+                guid = f"20000000-0000-0000-0000-{len(self.created):012d}"
+                self.created.append((parse_qs(parsed.query)["folder_id"][0], json))
+                return PagedFolderResponse({"@id": f"https://repo.metadatacenter.org/template-instances/{guid}"})
+            self.renamed.append((json["@id"], json["schema:name"]))
+            return PagedFolderResponse({})
+
+
+def make_cedar_access(session):
+    cedar_access = CedarAccess({"api_key": "hithere", "cedar_endpoint": "https://resource.metadatacenter.org"})
+    cedar_access.session = session
+    return cedar_access
+
+
+def parse_result(name, detail_key="geospatial_data_resource"):
+    result = ProcessResult()
+    result.template_source = f"{name}.xlsx"
+    result.model_data = make_model_data(detail_key)
+    result.model_data["resource"].name = name
+    return result
+
+
+class TestCedarBulkPublish(unittest.TestCase):
+
+    def test_publish_resources(self):
+        cedar_access = make_cedar_access(PublishSession())
+        failed_parse = ProcessResult()
+        failed_parse.success = False
+        failed_parse.template_source = "broken.xlsx"
+        parse_results = [parse_result(f"resource {i}") for i in range(10)] + [failed_parse]
+
+        summary = publish_resources(cedar_access, parse_results, "folder-id", max_workers=4,
+                                    requests_per_second=1000)
+
+        self.assertEqual(11, summary.total)
+        self.assertEqual(10, summary.succeeded)
+        self.assertEqual(["broken.xlsx"], [failure.template_source for failure in summary.failures])
+        self.assertEqual(10, len(cedar_access.session.created))
+        self.assertTrue(all(folder_id == "folder-id" for folder_id, _ in cedar_access.session.created))
+        # each created instance is renamed to its resource name
+        renamed = dict(cedar_access.session.renamed)
+        for result in summary.results:
+            if result.success:
+                self.assertEqual(result.resource_name, renamed[result.endpoint])
+
+    def test_publish_failures(self):
+        cedar_access = make_cedar_access(PublishSession(failing_names=[POPULATION_TEMPLATE_NAME]))
+        # no data type specific model, so no template to render
+        no_template = parse_result("resource 1")
+        del no_template.model_data["geospatial_data_resource"]
+        rejected = parse_result("resource 2", "population_data_resource")
+
+        summary = publish_resources(cedar_access, [no_template, rejected, parse_result("resource 3")], "folder-id")
+
+        self.assertEqual(1, summary.succeeded)
+        self.assertEqual(["resource 1.xlsx", "resource 2.xlsx"],
+                         sorted(failure.template_source for failure in summary.failures))
+        self.assertTrue(all(failure.traceback for failure in summary.failures))
+        self.assertEqual(1, len(cedar_access.session.created))
+        self.assertEqual(1, len(cedar_access.session.renamed))
+
+    def test_rate_limiter(self):
+        now = [0.0]
+        waits = []
+
+        def sleep(seconds):
+            waits.append(seconds)
+            now[0] += seconds
+
+        rate_limiter = RateLimiter(2, burst=2, clock=lambda: now[0], sleep=sleep)
+        for _ in range(4):
+            rate_limiter.acquire()
+        # the burst goes through, then calls are spaced half a second apart
+        self.assertEqual([0.5, 0.5], waits)
+
+        now[0] += 10
+        rate_limiter.acquire()
+        self.assertEqual(2, len(waits))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -203,6 +203,48 @@ class TestAccelCrosswalk(unittest.TestCase):
         actual = accel_cedar_crosswalk.transform(ingest_payload)
         self.assertIsNotNone(actual)
 
+    def test_transform_dead_letter(self):
+        temp_dirs_path = self.make_temp_dirs_path()
+        xcom_props_resolver = DirectXcomPropsResolver(temp_files_supported=True, temp_files_location=temp_dirs_path)
+
+        ingest_source_descriptor = IngestSourceDescriptor()
+        ingest_source_descriptor.ingest_identifier = "test_transform_dead_letter"
+        ingest_source_descriptor.ingest_item_id = "test_transform_dead_letter_item"
+        ingest_source_descriptor.submitter_name = "submitter name"
+        ingest_source_descriptor.submitter_email = "submitter@email"
+        ingest_source_descriptor.schema_version = "1.0.2"
+        ingest_payload = IngestPayload(ingest_source_descriptor)
+
+        ingest_payload.payload_inline = True
+
+        for name in ("pop_data_152.json", "geoexposure_data_152.json"):
+            with open(self.resource_path(name), 'r') as f:
+                ingest_payload.payload.append(json.loads(f.read()))
+        # not a cedar document, fails to crosswalk
+        ingest_payload.payload.insert(1, {"@id": "bad-instance", "schema:name": "bad"})
+
+        # by default the failure fails the whole payload
+        with self.assertRaises(Exception):
+            CedarToAccelCrosswalk(xcom_props_resolver).transform(ingest_payload)
+
+        dead_letter_path = os.path.join(temp_dirs_path, "dead_letter.jsonl")
+        accel_cedar_crosswalk = CedarToAccelCrosswalk(xcom_props_resolver, dead_letter_path=dead_letter_path)
+        actual = accel_cedar_crosswalk.transform(ingest_payload)
+
+        self.assertEqual(2, accel_cedar_crosswalk.transform_succeeded)
+        self.assertEqual(1, len(accel_cedar_crosswalk.transform_failures))
+        self.assertFalse(actual.ingest_successful)
+        self.assertEqual("bad-instance", accel_cedar_crosswalk.transform_failures[0].id)
+        self.assertTrue(accel_cedar_crosswalk.transform_failures[0].traceback)
+
+        with open(dead_letter_path, 'r') as f:
+            dead_letters = [json.loads(line) for line in f]
+        self.assertEqual(1, len(dead_letters))
+        self.assertEqual("bad-instance", dead_letters[0]["id"])
+        self.assertEqual(1, dead_letters[0]["index"])
+        self.assertEqual("bad", dead_letters[0]["payload"]["schema:name"])
+        self.assertEqual([os.path.basename(dead_letter_path)], os.listdir(temp_dirs_path))
+
 
 if __name__ == '__main__':
     unittest.main()
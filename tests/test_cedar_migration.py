@@ -0,0 +1,218 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from accelerator_source_cedar.accel_cedar.cedar_access import CedarAccess
+from accelerator_source_cedar.accel_cedar.cedar_migration import migrate_templates
+from accelerator_source_cedar.accel_cedar.checkpoint_journal import CheckpointJournal
+from accelerator_source_cedar.accel_cedar.staged_pipeline import Stage, StagedPipeline
+from tests.test_cedar_template_processor import string_values
+from tests.test_template_parser import TEMPLATE_ROWS, write_template
+
+
+class StubCedarHandler(BaseHTTPRequestHandler):
+    """
+    Accepts template instance creates and renames, like the CEDAR resource server
+    """
+
+    def do_POST(self):
+        server = self.server
+        parsed = urlparse(self.path)
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with server.lock:
+            if parsed.path == "/template-instances" and server.fail_creates:
+                self._respond(400, {"errorMessage": "invalid instance"})
+            elif parsed.path == "/template-instances":
+                guid = f"30000000-0000-0000-0000-{len(server.created):012d}"
+                server.created.append((parse_qs(parsed.query)["folder_id"][0], body))
+                self._respond(201, {"@id": f"https://repo.metadatacenter.org/template-instances/{guid}"})
+            elif parsed.path == "/command/rename-resource" and server.fail_renames:
+                self._respond(500, {"errorMessage": "rename failed"})
+            elif parsed.path == "/command/rename-resource":
+                server.renamed.append((body["@id"], body["schema:name"]))
+                self._respond(200, {})
+            else:
+                self._respond(404, {"errorMessage": f"no such path {parsed.path}"})
+
+    def _respond(self, status, json_dict):
+        content = json.dumps(json_dict).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubCedarServer(ThreadingHTTPServer):
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), StubCedarHandler)
+        self.lock = threading.Lock()
+        self.created = []
+        self.renamed = []
+        self.fail_creates = False
+        self.fail_renames = False
+
+    @property
+    def endpoint(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class TestCedarMigration(unittest.TestCase):
+
+    def setUp(self):
+        self.server = StubCedarServer()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.cedar_access = CedarAccess({"api_key": "hithere", "cedar_endpoint": self.server.endpoint}, pool_size=8)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_migrate_templates(self):
+        template_dir = tempfile.mkdtemp(prefix="cedar-migration-")
+        for i in range(4):
+            os.replace(write_template(TEMPLATE_ROWS), os.path.join(template_dir, f"template{i}.xlsx"))
+        with open(os.path.join(template_dir, "broken.xlsx"), "w") as f:
+            f.write("not a spreadsheet")
+        journal_path = os.path.join(tempfile.mkdtemp(prefix="cedar-migration-journal-"), "journal.jsonl")
+
+        summary = migrate_templates(self.cedar_access, template_dir, "folder-id", journal_path=journal_path,
+                                    parse_workers=2, publish_workers=4, requests_per_second=1000,
+                                    detail_key="geospatial_data_resource")
+
+        self.assertEqual(5, summary.total)
+        self.assertEqual(4, summary.succeeded)
+        self.assertEqual(["broken.xlsx"], [os.path.basename(failure.template_source) for failure in summary.failures])
+        self.assertEqual(["parse", "render", "create", "rename"], [stats.name for stats in summary.stage_stats])
+        self.assertEqual(5, summary.stage_stats[0].items_in)
+        self.assertEqual(4, len(self.server.created))
+        self.assertTrue(all(folder_id == "folder-id" for folder_id, _ in self.server.created))
+        self.assertEqual({"Later Resource Name"}, {name for _, name in self.server.renamed})
+        self.assertIn("Later Resource Name", set(string_values(self.server.created[0][1])))
+
+        with CheckpointJournal(journal_path) as journal:
+            self.assertEqual(4, len(journal))
+            created_ids = {instance_id for instance_id, _ in self.server.renamed}
+            self.assertEqual(created_ids, {entry["@id"] for entry in journal.completed.values()})
+            self.assertTrue(all(entry["renamed"] for entry in journal.completed.values()))
+
+        # a second run only retries the template that failed
+        resumed = migrate_templates(self.cedar_access, template_dir, "folder-id", journal_path=journal_path,
+                                    parse_workers=1, requests_per_second=1000, detail_key="geospatial_data_resource")
+
+        self.assertEqual(4, resumed.skipped)
+        self.assertEqual(1, resumed.total)
+        self.assertEqual(4, len(self.server.created))
+
+    def test_create_failure(self):
+        template = write_template(TEMPLATE_ROWS)
+
+        summary = migrate_templates(self.cedar_access, [template], "folder-id", parse_workers=1,
+                                    detail_key="key_dataset", requests_per_second=1000)
+        self.assertEqual(1, summary.succeeded)
+
+        self.server.fail_creates = True
+        summary = migrate_templates(self.cedar_access, [template], "folder-id", parse_workers=1,
+                                    detail_key="key_dataset", requests_per_second=1000)
+        self.assertEqual(1, len(summary.failures))
+        self.assertEqual("invalid instance", summary.failures[0].message)
+        self.assertIn("creating", summary.failures[0].errors[0])
+        self.assertEqual(1, len(self.server.renamed))
+
+
+    def test_no_resource_type(self):
+        template = write_template(TEMPLATE_ROWS)
+
+        summary = migrate_templates(self.cedar_access, [template], "folder-id", parse_workers=1,
+                                    requests_per_second=1000)
+
+        self.assertEqual(1, len(summary.failures))
+        self.assertIn("no data type section", summary.failures[0].message)
+        self.assertIn("rendering", summary.failures[0].errors[0])
+        self.assertEqual([], self.server.created)
+
+    def test_resume_rename(self):
+        template = write_template(TEMPLATE_ROWS)
+        journal_path = os.path.join(tempfile.mkdtemp(prefix="cedar-migration-journal-"), "journal.jsonl")
+
+        self.server.fail_renames = True
+        summary = migrate_templates(self.cedar_access, [template], "folder-id", journal_path=journal_path,
+                                    parse_workers=1, requests_per_second=1000, detail_key="key_dataset")
+        self.assertEqual(1, len(summary.failures))
+        self.assertIn("renaming", summary.failures[0].errors[0])
+        self.assertEqual(1, len(self.server.created))
+
+        with CheckpointJournal(journal_path) as journal:
+            entry = journal.location(template)
+            self.assertFalse(entry["renamed"])
+            self.assertEqual("Later Resource Name", entry["name"])
+
+        # the second run renames the instance created by the first, without creating another
+        self.server.fail_renames = False
+        resumed = migrate_templates(self.cedar_access, [template], "folder-id", journal_path=journal_path,
+                                    parse_workers=1, requests_per_second=1000, detail_key="key_dataset")
+        self.assertEqual(1, resumed.resumed)
+        self.assertEqual(1, resumed.succeeded)
+        self.assertEqual(1, len(self.server.created))
+        self.assertEqual([(entry["@id"], "Later Resource Name")], self.server.renamed)
+
+        with CheckpointJournal(journal_path) as journal:
+            self.assertTrue(journal.location(template)["renamed"])
+
+
+def double(value):
+    return value * 2
+
+
+class TestStagedPipeline(unittest.TestCase):
+
+    def test_run(self):
+        errors = []
+
+        def check(value):
+            if value == 6:
+                raise Exception("no sixes")
+            return None if value == 8 else value
+
+        pipeline = StagedPipeline([
+            Stage("double", double, workers=2, processes=True),
+            Stage("check", check, workers=3, queue_size=1),
+        ], on_error=errors.append)
+
+        actual = sorted(pipeline.run(range(10)))
+
+        self.assertEqual([0, 2, 4, 10, 12, 14, 16, 18], actual)
+        self.assertEqual(["check"], [error.stage for error in errors])
+        self.assertEqual(6, errors[0].item)
+        self.assertEqual([10, 10], [stats.items_in for stats in pipeline.stats])
+        self.assertEqual([10, 8], [stats.items_out for stats in pipeline.stats])
+        self.assertEqual([0, 1], [stats.failed for stats in pipeline.stats])
+        self.assertIn("check: 10 in, 8 out, 1 failed", pipeline.report())
+
+    def test_close_early(self):
+        pipeline = StagedPipeline([Stage("double", double)])
+        results = pipeline.run(iter(range(1000000)))
+
+        self.assertEqual(0, next(results))
+        results.close()
+        self.assertLess(pipeline.stats[0].items_in, 1000000)
+
+    def test_source_failure(self):
+        def items():
+            yield 1
+            raise Exception("lost the items")
+
+        with self.assertRaises(Exception):
+            list(StagedPipeline([Stage("double", double)]).run(items()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+from urllib.parse import parse_qs, unquote, urlparse
+
+from accelerator_source_cedar.accel_cedar.cedar_access import CedarAccess
+from accelerator_source_cedar.accel_cedar.cedar_mirror import CedarMirror
+from tests.test_cedar_access import PagedFolderResponse
+
+ROOT_FOLDER = "00000000-0000-0000-0000-000000000000"
+SUB_FOLDER = "00000000-0000-0000-0000-000000000001"
+
+
+def instance_guid(i):
+    return f"10000000-0000-0000-0000-{i:012d}"
+
+
+class FolderTreeSession:
+    """
+    Stands in for the requests session, serving a root folder of three instances and a subfolder, and a subfolder of
+    two instances
+    """
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.instance_requests = []
+        self._lock = threading.Lock()
+        self.folders = {
+            ROOT_FOLDER: [self.resource(i) for i in range(3)] + [
+                {"schema:name": "subfolder", "@id": f"https://repo.metadatacenter.org/folders/{SUB_FOLDER}",
+                 "resourceType": "folder"}],
+            SUB_FOLDER: [self.resource(i) for i in range(3, 5)],
+        }
+
+    @staticmethod
+    def resource(i):
+        return {"schema:name": f"doc {i}",
+                "@id": f"https://repo.metadatacenter.org/template-instances/{instance_guid(i)}",
+                "resourceType": "instance"}
+
+    def get(self, api_url, headers=None):
+        parsed = urlparse(api_url)
+        if "/template-instances/" in parsed.path:
+            guid = CedarAccess.guid_or_identity(unquote(parsed.path))
+            with self._lock:
+                self.instance_requests.append(guid)
+            if guid in self.failing:
+                return PagedFolderResponse({"statusCode": 500, "errorMessage": "server error"})
+            return PagedFolderResponse({"@id": guid, "schema:name": f"instance {guid}"})
+
+        folder_guid = CedarAccess.guid_or_identity(unquote(parsed.path))
+        query = parse_qs(parsed.query)
+        offset = int(query["offset"][0])
+        limit = int(query["limit"][0])
+        resources = self.folders[folder_guid]
+        return PagedFolderResponse({"totalCount": len(resources), "resources": resources[offset:offset + limit],
+                                    "pathInfo": [{"schema:name": "folder", "@id": folder_guid}]})
+
+
+class TestCedarMirror(unittest.TestCase):
+
+    def make_cedar_access(self, session):
+        cedar_access = CedarAccess({"api_key": "hithere", "cedar_endpoint": "https://resource.metadatacenter.org"})
+        cedar_access.session = session
+        return cedar_access
+
+    def test_mirror_and_read(self):
+        mirror_dir = tempfile.mkdtemp(prefix="cedar-mirror-")
+        session = FolderTreeSession()
+        summary = CedarMirror(mirror_dir).mirror(self.make_cedar_access(session), ROOT_FOLDER, max_workers=4,
+                                                 page_size=2)
+
+        self.assertEqual(2, summary.folders)
+        self.assertEqual(5, summary.total)
+        self.assertEqual(5, summary.downloaded)
+        self.assertEqual(0, len(summary.failures))
+
+        # read back from a fresh mirror object, as a later run would
+        mirror = CedarMirror(mirror_dir)
+        self.assertEqual(5, len(mirror))
+        items = list(mirror.iter_folder_contents(ROOT_FOLDER))
+        self.assertEqual(4, len(items))
+        self.assertEqual("folder", items[3].item_type)
+        self.assertEqual(2, len(mirror.retrieve_folder_contents(SUB_FOLDER).subfolders))
+        # by guid or by the full @id
+        self.assertEqual(instance_guid(4), mirror.retrieve_resource(instance_guid(4))["@id"])
+        self.assertEqual(instance_guid(0), mirror.retrieve_resource(items[0].folder_id)["@id"])
+        self.assertEqual(mirror.retrieve_resource(instance_guid(4)),
+                         json.loads(mirror.retrieve_resource_content(instance_guid(4))))
+        with self.assertRaises(Exception):
+            mirror.retrieve_resource(instance_guid(9))
+
+    def test_no_recurse(self):
+        mirror_dir = tempfile.mkdtemp(prefix="cedar-mirror-")
+        summary = CedarMirror(mirror_dir).mirror(self.make_cedar_access(FolderTreeSession()), ROOT_FOLDER,
+                                                 recurse=False)
+        self.assertEqual(1, summary.folders)
+        self.assertEqual(3, summary.total)
+
+    def test_resume(self):
+        mirror_dir = tempfile.mkdtemp(prefix="cedar-mirror-")
+        session = FolderTreeSession(failing=[instance_guid(1)])
+        summary = CedarMirror(mirror_dir).mirror(self.make_cedar_access(session), ROOT_FOLDER)
+        self.assertEqual(4, summary.downloaded)
+        self.assertEqual([instance_guid(1)], [failure.id for failure in summary.failures])
+        self.assertFalse(os.path.exists(os.path.join(mirror_dir, "instances", f"{instance_guid(1)}.json")))
+        # the failed instance is listed in the manifest but is not in the mirror
+        mirror = CedarMirror(mirror_dir)
+        self.assertEqual(4, len(mirror))
+        self.assertNotIn(instance_guid(1), mirror)
+        self.assertIn(instance_guid(2), mirror)
+        self.assertFalse(mirror.manifest["instances"][instance_guid(1)]["downloaded"])
+        with self.assertRaisesRegex(Exception, "is not in the CEDAR mirror"):
+            mirror.retrieve_resource(instance_guid(1))
+
+        # the second run only downloads the instance that failed
+        session = FolderTreeSession()
+        summary = CedarMirror(mirror_dir).mirror(self.make_cedar_access(session), ROOT_FOLDER)
+        self.assertEqual(1, summary.downloaded)
+        self.assertEqual(4, summary.skipped)
+        self.assertEqual([instance_guid(1)], session.instance_requests)
+
+        with open(os.path.join(mirror_dir, "manifest.json")) as manifest_file:
+            manifest = json.load(manifest_file)
+        self.assertEqual(ROOT_FOLDER, manifest["root_folder_id"])
+        self.assertEqual(SUB_FOLDER, manifest["instances"][instance_guid(3)]["folder_id"])
+        self.assertTrue(manifest["instances"][instance_guid(1)]["downloaded"])
+        self.assertIn(instance_guid(1), CedarMirror(mirror_dir))
+
+
+if __name__ == '__main__':
+    unittest.main()
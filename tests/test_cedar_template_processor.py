@@ -0,0 +1,75 @@
+import json
+import unittest
+
+from accelerator_source_cedar.accel_cedar.cedar_intermediate_model import PcorSubmissionInfoModel, \
+    PcorIntermediateProgramModel, PcorIntermediateProjectModel, PcorIntermediateResourceModel, PcorKeyDatasetModel, \
+    PcorGeospatialDataResourceModel, PcorGeoToolModel, PcorPopDataResourceModel
+from accelerator_source_cedar.accel_cedar.cedar_template_processor import CedarTemplateProcessor, build_environment, \
+    TEMPLATES_DIR
+
+DETAIL_MODELS = {
+    "key_dataset": PcorKeyDatasetModel,
+    "geospatial_data_resource": PcorGeospatialDataResourceModel,
+    "geospatial_tool_resource": PcorGeoToolModel,
+    "population_data_resource": PcorPopDataResourceModel,
+}
+
+
+def make_model_data(detail_key):
+    resource = PcorIntermediateResourceModel()
+    resource.name = "Air \"Quality\" C:\\data\nsecond line"
+    resource.short_name = "AQ"
+    resource.keywords = ["air", "quality"]
+    resource.domain = ["Air Quality"]
+    project = PcorIntermediateProjectModel()
+    project.name = "project name"
+    project.project_sponsor = ["NIEHS", "EPA"]
+    return {
+        "submission": PcorSubmissionInfoModel(),
+        "program": PcorIntermediateProgramModel(),
+        "project": project,
+        "resource": resource,
+        detail_key: DETAIL_MODELS[detail_key](),
+    }
+
+
+def string_values(json_value):
+    if isinstance(json_value, dict):
+        for value in json_value.values():
+            yield from string_values(value)
+    elif isinstance(json_value, list):
+        for value in json_value:
+            yield from string_values(value)
+    elif isinstance(json_value, str):
+        yield json_value
+
+
+class TestCedarTemplateProcessor(unittest.TestCase):
+
+    def test_produce_resource(self):
+        processor = CedarTemplateProcessor()
+        for detail_key in DETAIL_MODELS:
+            with self.subTest(detail_key=detail_key):
+                model_data = make_model_data(detail_key)
+                actual = json.loads(processor.produce_resource(model_data))
+                self.assertIn("@context", actual)
+                # values are escaped into the json, not just pasted in
+                self.assertIn(model_data["resource"].name, set(string_values(actual)))
+
+    def test_template_for(self):
+        self.assertEqual("key_dataset_1_5_1.jinja", CedarTemplateProcessor.template_for(make_model_data("key_dataset")))
+        with self.assertRaises(Exception):
+            CedarTemplateProcessor.template_for({"resource": PcorIntermediateResourceModel()})
+
+    def test_produce_rename_resource(self):
+        actual = json.loads(CedarTemplateProcessor().produce_rename_resource("abc-123", "a \"new\" name"))
+        self.assertEqual("https://repo.metadatacenter.org/template-instances/abc-123", actual["@id"])
+        self.assertEqual("a \"new\" name", actual["schema:name"])
+
+    def test_environment_shared(self):
+        self.assertIs(CedarTemplateProcessor().environment, CedarTemplateProcessor().environment)
+        self.assertIs(build_environment(TEMPLATES_DIR + "/"), CedarTemplateProcessor().environment)
+
+
+if __name__ == '__main__':
+    unittest.main()
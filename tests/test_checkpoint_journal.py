@@ -0,0 +1,48 @@
+import os
+import tempfile
+import unittest
+
+from accelerator_source_cedar.accel_cedar.checkpoint_journal import CheckpointJournal
+
+
+class TestCheckpointJournal(unittest.TestCase):
+
+    def make_journal_path(self):
+        return os.path.join(tempfile.mkdtemp(prefix="cedar-journal-"), "journal.jsonl")
+
+    def test_resume(self):
+        journal_path = self.make_journal_path()
+
+        with CheckpointJournal(journal_path) as journal:
+            journal.record("item1", "/tmp/item1.json")
+            journal.record("item2")
+
+        with CheckpointJournal(journal_path) as journal:
+            self.assertTrue(journal.is_complete("item1"))
+            self.assertTrue("item2" in journal)
+            self.assertFalse(journal.is_complete("item3"))
+            self.assertEqual("/tmp/item1.json", journal.location("item1"))
+            self.assertEqual(2, len(journal))
+
+    def test_partial_record_ignored(self):
+        journal_path = self.make_journal_path()
+
+        with CheckpointJournal(journal_path) as journal:
+            journal.record("item1")
+
+        # simulate a run that died part way through writing a record
+        with open(journal_path, "a") as f:
+            f.write('{"id": "item2", "loca')
+
+        with CheckpointJournal(journal_path) as journal:
+            self.assertEqual(1, len(journal))
+            journal.record("item3")
+
+        with CheckpointJournal(journal_path) as journal:
+            self.assertTrue(journal.is_complete("item1"))
+            self.assertFalse(journal.is_complete("item2"))
+            self.assertTrue(journal.is_complete("item3"))
+
+
+if __name__ == '__main__':
+    unittest.main()
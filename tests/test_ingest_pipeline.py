@@ -0,0 +1,137 @@
+import os
+import tarfile
+import tempfile
+import unittest
+import zipfile
+from pathlib import Path
+
+from accelerator_core.workflow.accel_data_models import IngestSourceDescriptor
+
+from accelerator_source_cedar.accel_cedar.cedar_archive import CedarArchive
+from accelerator_source_cedar.accel_cedar.checkpoint_journal import CheckpointJournal
+from accelerator_source_cedar.cedar_ingest_pipeline import ingest_pipeline, open_source
+
+
+class TestIngestPipeline(unittest.TestCase):
+    TESTS_DIR = Path(__file__).resolve().parent
+    TEST_RESOURCES_DIR = TESTS_DIR / "test_resources"
+
+    def setUp(self):
+        self.temp_dirs_path = tempfile.mkdtemp(prefix="cedar-ingest-pipeline-")
+        self.runid = "test_ingest_pipeline"
+        self.ingest_source_descriptor = IngestSourceDescriptor()
+        self.ingest_source_descriptor.ingest_type = "cedar"
+        self.ingest_source_descriptor.ingest_identifier = self.runid
+        self.ingest_source_descriptor.submitter_name = "submitter name"
+        self.ingest_source_descriptor.submitter_email = "submitter@email"
+        self.ingest_source_descriptor.schema_version = "1.0.2"
+
+    def test_ingest_files(self):
+        cedar_access, items = open_source(str(self.TEST_RESOURCES_DIR / "*.json"))
+        self.assertIsNone(cedar_access)
+        checkpoint = os.path.join(self.temp_dirs_path, "journal.jsonl")
+
+        actual = ingest_pipeline(items, cedar_access, self.temp_dirs_path, self.runid,
+                                 self.ingest_source_descriptor, fetch_workers=2, crosswalk_workers=2,
+                                 checkpoint=checkpoint)
+
+        self.assertEqual(7, actual.total)
+        self.assertEqual(7, actual.succeeded)
+        self.assertEqual([], actual.failures)
+        self.assertEqual(["fetch", "decode", "read", "crosswalk", "store"],
+                         [stats.name for stats in actual.stage_stats])
+        self.assertEqual([7] * 5, [stats.items_out for stats in actual.stage_stats])
+        self.assertEqual(7, len(os.listdir(os.path.join(self.temp_dirs_path, self.runid))))
+        with CheckpointJournal(checkpoint) as journal:
+            self.assertIn("pop_data_152", journal)
+
+        resumed = ingest_pipeline(open_source(str(self.TEST_RESOURCES_DIR / "*.json"))[1], None,
+                                  self.temp_dirs_path, self.runid, self.ingest_source_descriptor,
+                                  checkpoint=checkpoint)
+        self.assertEqual(7, resumed.skipped)
+        self.assertEqual(0, resumed.total)
+
+    def test_ingest_archive_processes(self):
+        archive_path = os.path.join(self.temp_dirs_path, "exports.zip")
+        with zipfile.ZipFile(archive_path, "w") as archive:
+            for name in ("key_dataset1.json", "geospatial1.json", "pop_data_152.json"):
+                archive.write(self.TEST_RESOURCES_DIR / name, name)
+            # an archive id holding a guid is not cut down to the guid
+            archive.write(self.TEST_RESOURCES_DIR / "geospatial1.json",
+                          "0a1b2c3d-1234-5678-9abc-0123456789ab-revised.json")
+
+        cedar_access, items = open_source(archive_path)
+        self.assertIsInstance(cedar_access, CedarArchive)
+        actual = ingest_pipeline(items, cedar_access, self.temp_dirs_path, self.runid,
+                                 self.ingest_source_descriptor, processes=True, read_workers=2)
+
+        self.assertEqual(4, actual.total)
+        self.assertEqual(4, actual.succeeded)
+
+    def test_ingest_tar_archive(self):
+        archive_path = os.path.join(self.temp_dirs_path, "exports.tar.gz")
+        with tarfile.open(archive_path, "w:gz") as archive:
+            for name in ("key_dataset1.json", "geospatial1.json", "pop_data_152.json"):
+                archive.add(self.TEST_RESOURCES_DIR / name, f"export/{name}")
+
+        cedar_access, items = open_source(archive_path)
+        self.assertIsInstance(cedar_access, CedarArchive)
+        actual = ingest_pipeline(items, cedar_access, self.temp_dirs_path, self.runid,
+                                 self.ingest_source_descriptor, fetch_workers=8)
+
+        self.assertEqual(3, actual.succeeded)
+        self.assertEqual([], actual.failures)
+        # read in one pass, the members were never looked up by id
+        self.assertIsNone(cedar_access._index)
+
+    def test_ingest_failure(self):
+        broken = os.path.join(self.temp_dirs_path, "broken.json")
+        with open(broken, "w") as f:
+            f.write("{not json")
+        items = [broken, str(self.TEST_RESOURCES_DIR / "pop_data_152.json")]
+
+        actual = ingest_pipeline(items, None, self.temp_dirs_path, self.runid, self.ingest_source_descriptor)
+
+        self.assertEqual(2, actual.total)
+        self.assertEqual(1, actual.succeeded)
+        self.assertEqual("broken", actual.failures[0].id)
+        self.assertIn("error in decode", actual.failures[0].errors[0])
+        self.assertIn("decode: 2 in, 1 out, 1 failed", actual.report())
+
+    def test_checkpoint_resume(self):
+        broken = os.path.join(self.temp_dirs_path, "broken.json")
+        with open(broken, "w") as f:
+            f.write("{not json")
+        items = [broken, str(self.TEST_RESOURCES_DIR / "pop_data_152.json"),
+                 str(self.TEST_RESOURCES_DIR / "key_dataset1.json")]
+        checkpoint = os.path.join(self.temp_dirs_path, "journal.jsonl")
+
+        actual = ingest_pipeline(items, None, self.temp_dirs_path, self.runid, self.ingest_source_descriptor,
+                                 checkpoint=checkpoint)
+        self.assertEqual(2, actual.succeeded)
+        self.assertEqual(1, len(actual.failures))
+        with CheckpointJournal(checkpoint) as journal:
+            self.assertEqual({"pop_data_152", "key_dataset1"}, set(journal.completed))
+            self.assertTrue(os.path.exists(journal.location("pop_data_152")))
+
+        # the stored items are skipped, the failed item is tried again
+        resumed = ingest_pipeline(items, None, self.temp_dirs_path, self.runid, self.ingest_source_descriptor,
+                                  checkpoint=checkpoint)
+        self.assertEqual(2, resumed.skipped)
+        self.assertEqual(1, resumed.total)
+        self.assertEqual("broken", resumed.failures[0].id)
+        self.assertEqual(1, resumed.stage_stats[0].items_in)
+
+        with open(broken, "w") as f:
+            with open(self.TEST_RESOURCES_DIR / "geospatial1.json") as source:
+                f.write(source.read())
+        resumed = ingest_pipeline(items, None, self.temp_dirs_path, self.runid, self.ingest_source_descriptor,
+                                  checkpoint=checkpoint)
+        self.assertEqual(2, resumed.skipped)
+        self.assertEqual(1, resumed.succeeded)
+        with CheckpointJournal(checkpoint) as journal:
+            self.assertEqual(3, len(journal))
+
+
+if __name__ == '__main__':
+    unittest.main()
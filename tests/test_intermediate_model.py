@@ -0,0 +1,31 @@
+import pickle
+import unittest
+
+from accelerator_source_cedar.accel_cedar.cedar_intermediate_model import PcorIntermediateResourceModel, \
+    PcorKeyDatasetModel
+
+
+class TestIntermediateModel(unittest.TestCase):
+
+    def test_slotted_model(self):
+        resource = PcorIntermediateResourceModel()
+        resource.name = "resource"
+        resource.resource_guid = "guid"
+
+        self.assertFalse(hasattr(resource, "__dict__"))
+        with self.assertRaises(AttributeError):
+            resource.not_an_attribute = "value"
+
+        copy = pickle.loads(pickle.dumps(resource))
+        self.assertEqual(resource.as_dict(), copy.as_dict())
+        self.assertEqual("guid", copy.as_dict()["resource_guid"])
+
+    def test_as_dict(self):
+        key_dataset = PcorKeyDatasetModel()
+        actual = key_dataset.as_dict()
+        self.assertEqual([], actual["measures"])
+        self.assertIsNone(actual["time_extent_start_yyyy"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+import gzip
+import json
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from accelerator_source_cedar.accel_cedar.jsonl_corpus import JsonLinesCorpus, JsonLinesWriter, index_path_for
+
+
+class TestJsonLinesCorpus(unittest.TestCase):
+    TESTS_DIR = Path(__file__).resolve().parent
+    TEST_RESOURCES_DIR = TESTS_DIR / "test_resources"
+
+    @classmethod
+    def setUpClass(cls):
+        cls.documents = {}
+        for name in ("key_dataset1.json", "geospatial1.json", "pop_data_152.json"):
+            with open(cls.TEST_RESOURCES_DIR / name, 'r') as f:
+                cls.documents[name] = json.load(f)
+
+    def write_corpus(self, file_name):
+        corpus_path = os.path.join(tempfile.mkdtemp(prefix="cedar-jsonl-"), file_name)
+        with JsonLinesWriter(corpus_path) as writer:
+            for name, document in self.documents.items():
+                writer.write(name, document)
+        return corpus_path
+
+    def test_round_trip(self):
+        corpus_path = self.write_corpus("corpus.jsonl")
+        corpus = JsonLinesCorpus(corpus_path)
+
+        actual = list(corpus.items())
+        self.assertEqual(list(self.documents.keys()), [item_id for item_id, document in actual])
+        self.assertEqual(self.documents["geospatial1.json"], actual[1][1])
+
+    def test_random_access_compressed(self):
+        corpus_path = self.write_corpus("corpus.jsonl.gz")
+
+        # still a valid gzip stream for sequential readers
+        with gzip.open(corpus_path, "rt") as f:
+            self.assertEqual(3, len(f.readlines()))
+
+        with JsonLinesCorpus(corpus_path) as corpus:
+            self.assertEqual(3, len(corpus))
+            self.assertEqual(self.documents["pop_data_152.json"], corpus.get("pop_data_152.json"))
+            self.assertEqual(self.documents["key_dataset1.json"], corpus.retrieve_resource("key_dataset1.json"))
+            with self.assertRaises(KeyError):
+                corpus.get("not_there")
+
+    def test_build_index(self):
+        corpus_path = self.write_corpus("corpus.jsonl")
+        os.remove(index_path_for(corpus_path))
+
+        corpus = JsonLinesCorpus(corpus_path)
+        corpus.build_index()
+
+        document = self.documents["key_dataset1.json"]
+        self.assertEqual(document, corpus.get(document["@id"]))
+
+    def test_corpus_past_index(self):
+        for file_name in ("corpus.jsonl", "corpus.jsonl.gz"):
+            with self.subTest(file_name=file_name):
+                corpus_path = self.write_corpus(file_name)
+                # a writer that died after flushing the corpus but before writing the index
+                with open(index_path_for(corpus_path), "r") as f:
+                    index_lines = f.readlines()
+                with open(index_path_for(corpus_path), "w") as f:
+                    f.writelines(index_lines[:2])
+
+                actual = list(JsonLinesCorpus(corpus_path).items())
+
+                self.assertEqual(["key_dataset1.json", "geospatial1.json", self.documents["pop_data_152.json"]["@id"]],
+                                 [item_id for item_id, document in actual])
+                self.assertEqual(self.documents["pop_data_152.json"], actual[2][1])
+
+    def test_index_mismatch(self):
+        corpus_path = self.write_corpus("corpus.jsonl")
+        with open(index_path_for(corpus_path), "r") as f:
+            index_lines = f.readlines()
+        # the index has an entry for a document the corpus does not have
+        with open(index_path_for(corpus_path), "a") as f:
+            f.write(index_lines[-1].replace("pop_data_152.json", "lost.json"))
+
+        with self.assertRaises(Exception):
+            list(JsonLinesCorpus(corpus_path).items())
+
+    def test_index_written_after_corpus(self):
+        corpus_path = os.path.join(tempfile.mkdtemp(prefix="cedar-jsonl-"), "corpus.jsonl")
+        writer = JsonLinesWriter(corpus_path)
+        writer.write("key_dataset1.json", self.documents["key_dataset1.json"])
+        self.assertEqual(0, os.path.getsize(index_path_for(corpus_path)))
+        writer.flush()
+        self.assertEqual(1, len(JsonLinesCorpus(corpus_path)))
+        writer.close()
+
+    def test_append_after_crash(self):
+        for file_name in ("corpus.jsonl", "corpus.jsonl.gz"):
+            with self.subTest(file_name=file_name):
+                corpus_path = os.path.join(tempfile.mkdtemp(prefix="cedar-jsonl-"), file_name)
+                names = list(self.documents.keys())
+
+                # a writer that died with the last two documents flushed to the corpus but not to the index, part
+                # way through writing another
+                writer = JsonLinesWriter(corpus_path)
+                writer.write(names[0], self.documents[names[0]])
+                writer.flush()
+                writer.write(names[1], self.documents[names[1]])
+                writer.write(names[2], self.documents[names[2]])
+                writer._file.close()
+                writer._index.close()
+                with open(corpus_path, "ab") as f:
+                    f.write(gzip.compress(b'{"@id": "torn"}\n')[:10] if writer.compress else b'{"@id": "to')
+
+                with JsonLinesWriter(corpus_path) as writer:
+                    writer.write("appended", {"@id": "appended"})
+
+                with JsonLinesCorpus(corpus_path) as corpus:
+                    actual = list(corpus.items())
+                    self.assertEqual([names[0], self.documents[names[1]]["@id"], self.documents[names[2]]["@id"],
+                                      "appended"], [item_id for item_id, document in actual])
+                    self.assertEqual(self.documents[names[2]], corpus.get(self.documents[names[2]]["@id"]))
+                    self.assertEqual({"@id": "appended"}, corpus.get("appended"))
+                    self.assertNotIn("torn", corpus)
+
+
+if __name__ == '__main__':
+    unittest.main()
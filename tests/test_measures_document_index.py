@@ -0,0 +1,58 @@
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+from accelerator_source_cedar.accel_cedar.measures_document_index import MeasuresDocumentIndex
+from accelerator_source_cedar.accel_cedar.measures_rollup import MeasuresRollup
+
+
+class TestMeasuresDocumentIndex(unittest.TestCase):
+
+    @staticmethod
+    def write_measures_file(measures_file, terms, parents, mtime):
+        pd.DataFrame({"Category": parents, "SubCategory 1": ["Health Data"] * len(terms),
+                      "SubCategory 2": ["Health Data"] * len(terms), "Term": terms}).to_excel(
+            measures_file, sheet_name="Measures", index=False, engine="openpyxl")
+        os.utime(measures_file, (mtime, mtime))
+
+    def test_documents_for_measures(self):
+        db_path = os.path.join(tempfile.mkdtemp(prefix="cedar-measures-index-"), "measures.db")
+        with MeasuresDocumentIndex(db_path) as index:
+            index.record("doc1", ["Claims Data", "Nutrition"])
+            index.record("doc2", ["nutrition", "Air Quality"])
+            index.record("doc3", ["Air Quality"])
+            index.record("doc3", ["Noise"])
+
+            self.assertEqual({"doc1", "doc2"}, index.documents_for_measures(["Nutrition"]))
+            self.assertEqual({"doc2"}, index.documents_for_measures(["air quality"]))
+            self.assertEqual({"Noise"}, index.measures_for_document("doc3"))
+
+        with MeasuresDocumentIndex(db_path) as index:
+            self.assertEqual(3, index.document_count())
+            index.remove("doc1")
+            self.assertEqual({"doc2"}, index.documents_for_measures(["Nutrition", "Claims Data"]))
+
+    def test_documents_to_recompute(self):
+        measures_file = os.path.join(tempfile.mkdtemp(prefix="cedar-measures-"), "measures.xlsx")
+        self.write_measures_file(measures_file, ["Claims Data", "Nutrition"], ["Health", "Health"], 1000000)
+        measures_rollup = MeasuresRollup(measures_file)
+        old_index = measures_rollup.index
+
+        index = MeasuresDocumentIndex()
+        index.record("doc1", ["Claims Data"], old_index.version)
+        index.record("doc2", ["Nutrition"], old_index.version)
+        index.record("doc3", ["Noise"], old_index.version)
+        index.record("doc4", ["Claims Data", "Smoking"], old_index.version)
+
+        self.write_measures_file(measures_file, ["Claims Data", "Nutrition", "Noise"],
+                                 ["Health", "Lifestyle", "Environment"], 2000000)
+        self.assertTrue(measures_rollup.reload_if_changed())
+
+        actual = index.documents_to_recompute(old_index, measures_rollup.index)
+        self.assertEqual({"doc2", "doc3"}, actual)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,162 @@
+import importlib.resources as pkg_resources
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+from accelerator_source_cedar.accel_cedar.measures_rollup import MeasuresLookupStats, MeasuresRollup
+
+
+class TestMeasuresRollup(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        resources_path = pkg_resources.files("accelerator_source_cedar.accel_cedar") / 'resources'
+        cls.measures_rollup = MeasuresRollup(resources_path.joinpath("MeasuresTermsv4.xlsx"))
+
+    def test_process_measures(self):
+        actual = self.measures_rollup.process_measures(
+            ["Claims Data", "Nutrition", "Claims Data", "not a measure"])
+
+        self.assertEqual(["Claims Data", "Nutrition", "not a measure"], actual.measures)
+        self.assertEqual(["Health", "Other"], actual.measures_parents)
+        self.assertEqual(["Health Data", "Other"], actual.measures_subcategories_major)
+        self.assertEqual(["Health Data", "Other"], actual.measures_subcategories_minor)
+
+    def test_process_measures_batch(self):
+        measures_lists = [["Claims Data", "Nutrition"], [], ["not a measure", "Claims Data"]]
+
+        actual = self.measures_rollup.process_measures_batch(measures_lists)
+
+        self.assertEqual(3, len(actual))
+        for measures, measures_arrays in zip(measures_lists, actual):
+            expected = self.measures_rollup.process_measures(measures)
+            self.assertEqual(expected.measures, measures_arrays.measures)
+            self.assertEqual(expected.measures_parents, measures_arrays.measures_parents)
+        self.assertEqual([], actual[1].measures)
+        self.assertEqual(["Other", "Health"], actual[2].measures_parents)
+
+    def test_lookup_measure_normalized(self):
+        actual = self.measures_rollup.lookup_measure("  • reproductive / BIRTH ")
+        self.assertEqual("Reproductive/Birth", actual.measure)
+        self.assertEqual("Health", actual.parent)
+
+        actual = self.measures_rollup.lookup_measure("not a measure")
+        self.assertEqual("Other", actual.parent)
+
+    def test_process_measures_batch_stats(self):
+        stats = MeasuresLookupStats()
+
+        actual = self.measures_rollup.process_measures_batch(
+            [["Claims Data", "claims  data", "Nutrition."], ["not a measure"]], stats)
+
+        self.assertEqual(["Claims Data", "Nutrition"], actual[0].measures)
+        self.assertEqual(["Health"], actual[0].measures_parents)
+        self.assertEqual(1, stats.exact_hits)
+        self.assertEqual(2, stats.normalized_hits)
+        self.assertEqual(1, stats.misses)
+        self.assertEqual(0.75, stats.hit_ratio)
+
+    def test_rollup_measures_frame(self):
+        measures_lists = {"doc1": ["Claims Data", "Nutrition", "claims data"],
+                          "doc2": ["not a measure", "Nutrition"]}
+        measures_df = pd.DataFrame([(document_id, measure) for document_id, measures in measures_lists.items()
+                                    for measure in measures], columns=["document_id", "measure"])
+
+        actual = self.measures_rollup.rollup_measures_frame(measures_df)
+
+        self.assertEqual(["doc1", "doc2"], list(actual.keys()))
+        for document_id, measures in measures_lists.items():
+            expected = self.measures_rollup.process_measures(measures)
+            self.assertEqual(expected.measures, actual[document_id].measures)
+            self.assertEqual(expected.measures_parents, actual[document_id].measures_parents)
+            self.assertEqual(expected.measures_subcategories_major,
+                             actual[document_id].measures_subcategories_major)
+            self.assertEqual(expected.measures_subcategories_minor,
+                             actual[document_id].measures_subcategories_minor)
+
+        actual_df = self.measures_rollup.rollup_measures_frame(measures_df, as_dataframe=True)
+        self.assertEqual(5, len(actual_df))
+        self.assertEqual("Other", actual_df.iloc[3]["parent"])
+
+    def test_synonyms_sheet(self):
+        measures_file = os.path.join(tempfile.mkdtemp(prefix="cedar-measures-"), "measures.xlsx")
+        with pd.ExcelWriter(measures_file, engine="openpyxl") as writer:
+            pd.DataFrame({"Category": ["Health"], "SubCategory 1": ["Health Data"],
+                          "SubCategory 2": ["Health Data"], "Term": ["Claims Data"]}).to_excel(
+                writer, sheet_name="Measures", index=False)
+            pd.DataFrame({"Synonym": ["Insurance Claims"], "Term": ["Claims Data"]}).to_excel(
+                writer, sheet_name="Synonyms", index=False)
+
+        measures_rollup = MeasuresRollup(measures_file)
+
+        actual = measures_rollup.process_measures(["insurance claims"])
+        self.assertEqual(["Claims Data"], actual.measures)
+        self.assertEqual(["Health"], actual.measures_parents)
+
+    @staticmethod
+    def write_measures_file(measures_file, terms, mtime):
+        pd.DataFrame({"Category": ["Health"] * len(terms), "SubCategory 1": ["Health Data"] * len(terms),
+                      "SubCategory 2": ["Health Data"] * len(terms), "Term": terms}).to_excel(
+            measures_file, sheet_name="Measures", index=False, engine="openpyxl")
+        os.utime(measures_file, (mtime, mtime))
+
+    def test_reload_if_changed(self):
+        measures_file = os.path.join(tempfile.mkdtemp(prefix="cedar-measures-"), "measures.xlsx")
+        self.write_measures_file(measures_file, ["Claims Data"], 1000000)
+        measures_rollup = MeasuresRollup(measures_file)
+        version = measures_rollup.index_version
+        old_index = measures_rollup.index
+
+        self.assertFalse(measures_rollup.reload_if_changed())
+        self.assertEqual("Other", measures_rollup.lookup_measure("Nutrition").parent)
+
+        # same bytes with a new mtime keeps the version
+        with open(measures_file, "rb") as f:
+            content = f.read()
+        with open(measures_file, "wb") as f:
+            f.write(content)
+        os.utime(measures_file, (2000000, 2000000))
+        self.assertFalse(measures_rollup.reload_if_changed())
+        self.assertEqual(version, measures_rollup.index_version)
+
+        self.write_measures_file(measures_file, ["Claims Data", "Nutrition"], 3000000)
+        self.assertTrue(measures_rollup.reload_if_changed())
+        self.assertNotEqual(version, measures_rollup.index_version)
+        self.assertEqual("Health", measures_rollup.lookup_measure("Nutrition").parent)
+        self.assertEqual({"Nutrition", "nutrition"}, measures_rollup.index.diff(old_index))
+
+        # the old snapshot is untouched by the reload
+        self.assertNotIn("Nutrition", old_index.rollup_table)
+
+        # a broken file keeps the current index
+        with open(measures_file, "wb") as f:
+            f.write(b"not a spreadsheet")
+        os.utime(measures_file, (4000000, 4000000))
+        self.assertFalse(measures_rollup.reload_if_changed())
+        self.assertEqual("Health", measures_rollup.lookup_measure("Nutrition").parent)
+
+    def test_maybe_reload_does_not_wait(self):
+        measures_file = os.path.join(tempfile.mkdtemp(prefix="cedar-measures-"), "measures.xlsx")
+        self.write_measures_file(measures_file, ["Claims Data"], 1000000)
+        measures_rollup = MeasuresRollup(measures_file, check_interval=0)
+        version = measures_rollup.index_version
+        self.write_measures_file(measures_file, ["Claims Data", "Nutrition"], 2000000)
+
+        # while another thread holds the reload, readers carry on with the current index
+        with measures_rollup._reload_lock:
+            self.assertEqual("Other", measures_rollup.lookup_measure("Nutrition").parent)
+            self.assertEqual(version, measures_rollup.index_version)
+
+        self.assertEqual("Health", measures_rollup.lookup_measure("Nutrition").parent)
+
+    def test_shared(self):
+        measures_file = os.path.join(tempfile.mkdtemp(prefix="cedar-measures-"), "measures.xlsx")
+        self.write_measures_file(measures_file, ["Claims Data"], 1000000)
+
+        self.assertIs(MeasuresRollup.shared(measures_file), MeasuresRollup.shared(measures_file))
+
+
+if __name__ == '__main__':
+    unittest.main()
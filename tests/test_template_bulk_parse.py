@@ -0,0 +1,42 @@
+import os
+import tempfile
+import unittest
+
+from accelerator_source_cedar.accel_cedar.template_bulk_parse import parse_templates, iter_parse_templates, \
+    TemplateParseSummary
+from tests.test_template_parser import TEMPLATE_ROWS, write_template
+
+
+class TestTemplateBulkParse(unittest.TestCase):
+
+    def test_parse_templates(self):
+        template_dir = tempfile.mkdtemp(prefix="cedar-templates-")
+        for i in range(3):
+            os.replace(write_template(TEMPLATE_ROWS), os.path.join(template_dir, f"template{i}.xlsx"))
+        with open(os.path.join(template_dir, "broken.xlsx"), "w") as f:
+            f.write("not a spreadsheet")
+
+        summary = parse_templates(template_dir, max_workers=2)
+
+        self.assertEqual(4, summary.total)
+        self.assertEqual(3, summary.succeeded)
+        self.assertEqual(1, len(summary.failures))
+        self.assertEqual("broken", summary.failures[0].id)
+        self.assertTrue(summary.failures[0].traceback)
+        self.assertGreater(summary.elapsed_seconds, 0)
+        for result in summary.results:
+            if result.success:
+                self.assertEqual("Later Resource Name", result.model_data["resource"].name)
+
+    def test_iter_parse_templates(self):
+        paths = [write_template(TEMPLATE_ROWS) for _ in range(2)]
+        summary = TemplateParseSummary()
+
+        results = list(iter_parse_templates(paths, max_workers=1, summary=summary))
+
+        self.assertEqual(sorted(paths), sorted(result.template_source for result in results))
+        self.assertEqual(2, summary.succeeded)
+
+
+if __name__ == '__main__':
+    unittest.main()
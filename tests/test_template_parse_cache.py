@@ -0,0 +1,82 @@
+import os
+import tempfile
+import unittest
+
+from accelerator_source_cedar.accel_cedar.process_result import ProcessResult
+from accelerator_source_cedar.accel_cedar.template_parse_cache import TemplateParseCache
+from accelerator_source_cedar.accel_cedar.template_parser import PcorTemplateParser
+from tests.test_template_parser import TEMPLATE_ROWS, write_template
+
+
+class TestTemplateParseCache(unittest.TestCase):
+
+    def test_parse_cached(self):
+        parse_cache = TemplateParseCache(tempfile.mkdtemp(prefix="cedar-parse-cache-"))
+        parser = PcorTemplateParser(None, parse_cache=parse_cache)
+        template_file = write_template(TEMPLATE_ROWS)
+
+        first = ProcessResult()
+        parser.parse(template_file, first)
+        self.assertEqual(0, parse_cache.hits)
+
+        # a re-submission of the same contents under another name is served from the cache
+        resubmitted = os.path.join(os.path.dirname(template_file), "resubmitted.xlsx")
+        with open(template_file, "rb") as source, open(resubmitted, "wb") as target:
+            target.write(source.read())
+        second = ProcessResult()
+        parser.parse(resubmitted, second)
+
+        self.assertEqual(1, parse_cache.hits)
+        self.assertTrue(second.success)
+        self.assertEqual("Later Resource Name", second.resource_name)
+        self.assertEqual("project-guid", second.project_guid)
+        for key in ("submission", "program", "project", "resource"):
+            self.assertEqual(first.model_data[key].as_dict(), second.model_data[key].as_dict())
+
+    def test_generated_identifiers_not_cached(self):
+        parse_cache = TemplateParseCache(tempfile.mkdtemp(prefix="cedar-parse-cache-"))
+        parser = PcorTemplateParser(None, parse_cache=parse_cache)
+        # no project guid, project code or resource guid, so they are generated
+        rows = [row for row in TEMPLATE_ROWS if row[0] not in ("project_GUID", "ProjectCode", "resource_GUID")]
+        template_file = write_template(rows)
+
+        results = []
+        for _ in range(2):
+            result = ProcessResult()
+            parser.parse(template_file, result)
+            self.assertTrue(result.success)
+            results.append(result)
+        self.assertEqual(1, parse_cache.hits)
+
+        first, second = results
+        for result in results:
+            self.assertTrue(result.project_guid)
+            self.assertTrue(result.project_code)
+            self.assertTrue(result.resource_guid)
+            self.assertEqual(result.project_guid, result.model_data["project"].submitter_id)
+            self.assertEqual(result.resource_guid, result.model_data["resource"].submitter_id)
+        self.assertNotEqual(first.project_guid, second.project_guid)
+        self.assertNotEqual(first.project_code, second.project_code)
+        self.assertNotEqual(first.resource_guid, second.resource_guid)
+
+    def test_cache_key(self):
+        self.assertNotEqual(TemplateParseCache.cache_key(b"template", "1"),
+                            TemplateParseCache.cache_key(b"template", "2"))
+        self.assertEqual(TemplateParseCache.cache_key(b"template", "1"),
+                         TemplateParseCache.cache_key(b"template", "1"))
+
+    def test_failed_parse_not_cached(self):
+        parse_cache = TemplateParseCache(tempfile.mkdtemp(prefix="cedar-parse-cache-"))
+        parser = PcorTemplateParser(None, parse_cache=parse_cache)
+        # no terminator for the resource section
+        template_file = write_template(TEMPLATE_ROWS[:19])
+
+        for _ in range(2):
+            result = ProcessResult()
+            parser.parse(template_file, result)
+            self.assertFalse(result.success)
+        self.assertEqual(0, parse_cache.hits)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+import math
+import os
+import tempfile
+import unittest
+
+import openpyxl
+import pandas as pd
+
+from accelerator_source_cedar.accel_cedar.process_result import ProcessResult
+from accelerator_source_cedar.accel_cedar.template_parser import PcorTemplateParser, TemplateSectionIndex
+
+TEMPLATE_ROWS = [
+    ("Submitter", None),
+    ("submitter_name", "Jane Curator"),
+    ("submitter_email", "jane@example.com"),
+    ("comment", "a \"quoted\" comment"),
+    ("Program", None),
+    ("program_name", "CAFE"),
+    (float("nan"), float("nan")),
+    ("Project", None),
+    ("project_GUID", "project-guid"),
+    ("project_name", "Project Name"),
+    ("ProjectCode", "PRJ"),
+    ("project_sponsor", "NIEHS, EPA"),
+    ("project_url", "https://example.com/project"),
+    ("Resource", None),
+    ("resource_GUID", "resource-guid"),
+    ("  resource_name  ", "Resource Name"),
+    ("keywords", "air, water"),
+    ("payment_required", "no"),
+    ("resource_name", "Later Resource Name"),
+    ("publications", "Some citation\nhttps://example.com/paper"),
+    ("Data_Resource", None),
+    ("resource_name", "outside the section"),
+]
+
+
+def template_dataframe(rows):
+    return pd.DataFrame(rows, columns=["key", "value"])
+
+
+def write_template(rows):
+    template_file = os.path.join(tempfile.mkdtemp(prefix="cedar-template-"), "template.xlsx")
+    workbook = openpyxl.Workbook()
+    worksheet = workbook.active
+    worksheet.append(["key", "value"])
+    for key, value in rows:
+        worksheet.append([None if key != key else key, None if value != value else value])
+    workbook.save(template_file)
+    return template_file
+
+
+class TestTemplateParser(unittest.TestCase):
+
+    def test_section_index(self):
+        index = TemplateSectionIndex.from_dataframe(template_dataframe(TEMPLATE_ROWS))
+
+        self.assertEqual((0, 4), index.section_ranges["Submitter"])
+        self.assertEqual((13, 20), index.section_ranges["Resource"])
+        self.assertEqual("Later Resource Name", index.section_fields("Resource")["resource_name"])
+        self.assertEqual("CAFE", index.section_fields("Program")["program_name"])
+
+        unterminated = TemplateSectionIndex.from_dataframe(template_dataframe(TEMPLATE_ROWS[:19]))
+        self.assertFalse(unterminated.has_section("Resource"))
+        self.assertIsNone(PcorTemplateParser.extract_resource_data(unterminated))
+
+    def test_extract_data(self):
+        template_df = template_dataframe(TEMPLATE_ROWS)
+        index = TemplateSectionIndex.from_dataframe(template_df)
+
+        for template in (template_df, index):
+            submission = PcorTemplateParser.extract_submission_data(template)
+            self.assertEqual("Jane Curator", submission.curator_name)
+            self.assertEqual("a quoted comment", submission.curation_comment)
+
+            program = PcorTemplateParser.extract_program_data(template)
+            self.assertEqual("CAFE", program.name)
+            self.assertEqual("CAFE", program.dbgap_accession_number)
+
+            project = PcorTemplateParser.extract_project_data(template)
+            self.assertEqual("project-guid", project.submitter_id)
+            self.assertEqual("PRJ", project.code)
+            self.assertEqual(["NIEHS", "EPA"], project.project_sponsor)
+
+            resource = PcorTemplateParser.extract_resource_data(template)
+            self.assertEqual("resource-guid", resource.submitter_id)
+            self.assertEqual("Later Resource Name", resource.name)
+            self.assertEqual(["Air", "Water"], resource.keywords)
+            self.assertFalse(resource.payment_required)
+            self.assertEqual(["Some citation", ""], resource.publications)
+            self.assertEqual(["http://nolink", "https://example.com/paper"], resource.publication_links)
+
+    def test_sanitize_column(self):
+        self.assertIsNone(PcorTemplateParser.sanitize_column("None"))
+        self.assertIsNone(PcorTemplateParser.sanitize_column(""))
+        self.assertIsNone(PcorTemplateParser.sanitize_column(float("nan")))
+        self.assertEqual("1.5", PcorTemplateParser.sanitize_column(1.5))
+        self.assertEqual("Daily", PcorTemplateParser.sanitize_column("•\n\tDaily"))
+        self.assertEqual("a b  c", PcorTemplateParser.sanitize_column(" a\tb\xa0\nc "))
+        self.assertEqual("a\nb", PcorTemplateParser.sanitize_column("a\n\"b\"", False))
+        self.assertEqual(' x', PcorTemplateParser.sanitize_column('" x"'))
+        long_value = "• text\n" * 100
+        self.assertEqual(" ".join(["text"] * 100), PcorTemplateParser.sanitize_column(long_value))
+
+        self.assertEqual(["Daily", None, "a\nb"],
+                         PcorTemplateParser.sanitize_columns(["• Daily", "none", "a\nb"], escape_new_line=False))
+
+    def test_format_date_time(self):
+        self.assertEqual("2020", PcorTemplateParser.format_date_time("2020"))
+        self.assertEqual("2020", PcorTemplateParser.format_date_time(2020))
+        self.assertEqual("2019", PcorTemplateParser.format_date_time("07/2019"))
+        self.assertEqual("2020", PcorTemplateParser.format_date_time("29/02/2020"))
+        self.assertIsNone(PcorTemplateParser.format_date_time("29/02/2019"))
+        self.assertIsNone(PcorTemplateParser.format_date_time("13/2019"))
+        self.assertIsNone(PcorTemplateParser.format_date_time("sometime"))
+        self.assertIsNone(PcorTemplateParser.format_date_time(None))
+        self.assertIsInstance(PcorTemplateParser.format_date_time("current"), int)
+
+        self.assertEqual(["2020", "2019", None, "2020"],
+                         PcorTemplateParser.format_date_time_values(["2020", "1/2019", "sometime", "2020"]))
+        actual = PcorTemplateParser.format_date_time_values(pd.Series(["2020", "1/1/2019", "2020"]))
+        self.assertEqual(["2020", "2019", "2020"], actual.tolist())
+
+    def test_parse_streaming(self):
+        template_file = write_template(TEMPLATE_ROWS + [("program id", 12.0), ("date_added", "NA")])
+
+        rows = PcorTemplateParser.read_template_rows(template_file)
+        self.assertEqual(("Submitter", ), rows[0][:1])
+        self.assertTrue(math.isnan(rows[0][1]))
+        self.assertEqual(("program id", 12), rows[-2])
+        self.assertTrue(math.isnan(rows[-1][1]))
+
+        streamed = ProcessResult()
+        PcorTemplateParser(None).parse(template_file, streamed)
+        read = ProcessResult()
+        PcorTemplateParser(None, streaming=False).parse(template_file, read)
+
+        self.assertTrue(streamed.success)
+        self.assertEqual(read.model_data.keys(), streamed.model_data.keys())
+        for key in ("submission", "program", "project", "resource"):
+            self.assertEqual(read.model_data[key].as_dict(), streamed.model_data[key].as_dict())
+
+
+if __name__ == '__main__':
+    unittest.main()